@@ -3,16 +3,23 @@ Sistema Integral de Manejo de Urgencias
 Aplicación principal Streamlit
 """
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 from datetime import datetime, timedelta
 
 # Importar módulos locales
 import config
+# Las librerías pesadas (pandas, plotly, Prophet, scikit-learn, genai) se
+# importan solo al usar la función que las necesita
 from modules.protocol_loader import ProtocolLoader
 from modules.med_engine import get_med_engine
-from modules.forecaster import get_forecaster, create_sample_historical_data
+from modules.shared_resources import (
+    create_session_forecaster,
+    current_snapshot_version,
+    get_protocol_snapshot,
+    get_symptom_router,
+    get_visit_store,
+    preload_resources
+)
+from modules.metrics import METRICS, start_exporters
 from utils.helpers import (
     format_triage_badge,
     format_alarm_signs,
@@ -38,6 +45,14 @@ if not is_valid:
     st.info("Por favor, configura el archivo .env con las credenciales necesarias")
     st.stop()
 
+# Endpoint /metrics y volcado periódico (una sola vez por proceso)
+start_exporters()
+
+# Recursos pesados compartidos por todas las sesiones (se cargan una vez por proceso)
+if config.PRELOAD_RESOURCES:
+    preload_resources()
+med_engine = get_med_engine()
+
 # ============================================================================
 # ESTADO DE LA SESIÓN
 # ============================================================================
@@ -46,16 +61,76 @@ if "protocols_loaded" not in st.session_state:
     st.session_state.protocols_loaded = False
     st.session_state.protocols = {}
     st.session_state.protocol_loader = ProtocolLoader()
+    st.session_state.symptom_router = None
 
 if "historical_loaded" not in st.session_state:
     st.session_state.historical_loaded = False
     st.session_state.historical_data = None
 
 if "forecaster" not in st.session_state:
-    st.session_state.forecaster = get_forecaster()
+    st.session_state.forecaster = None
+
 
-if "med_engine" not in st.session_state:
-    st.session_state.med_engine = get_med_engine()
+def session_forecaster():
+    """
+    Forecaster propio de la sesión (el modelo entrenado no se comparte entre
+    usuarios); se crea al usarlo por primera vez porque importa pandas
+    """
+    if st.session_state.forecaster is None:
+        st.session_state.forecaster = create_session_forecaster()
+    return st.session_state.forecaster
+
+
+def session_symptom_router():
+    """Router de síntomas de la sesión; el del snapshot se ajusta al primer uso"""
+    if st.session_state.protocol_source == "snapshot":
+        return get_symptom_router(st.session_state.protocol_loader.snapshot_version)
+    return st.session_state.symptom_router
+
+
+def activate_protocols(loader: ProtocolLoader, origen: str):
+    """
+    Activa en la sesión los protocolos de un loader y precompila signos y reglas
+    de triage en el motor compartido (compilación indexada por contenido y
+    acotada a PROTOCOL_COMPILED_MAX_ENTRIES: los protocolos que ninguna sesión
+    usa se descartan y se recompilan si vuelven a usarse)
+    """
+    st.session_state.protocol_loader = loader
+    st.session_state.protocols = loader.protocols
+    st.session_state.protocols_loaded = True
+    st.session_state.protocol_source = origen
+    for protocolo in loader.protocols.values():
+        med_engine.alarm_matcher.register_protocol(protocolo)
+    if med_engine.rule_engine is not None:
+        med_engine.rule_engine.compile_protocols(loader.protocols)
+    st.session_state.symptom_router = None
+    if origen != "snapshot" and config.SYMPTOM_ROUTER_ENABLED:
+        from modules.symptom_router import SymptomRouter, load_past_cases
+        
+        st.session_state.symptom_router = SymptomRouter().fit(loader.protocols, load_past_cases())
+
+
+def activate_snapshot(version: str) -> bool:
+    """Activa el snapshot publicado (loader compartido entre sesiones)"""
+    loader = get_protocol_snapshot(version)
+    if not loader.protocols:
+        return False
+    activate_protocols(loader, "snapshot")
+    return True
+
+
+# Protocolos compilados: se cargan al iniciar la sesión y se recargan
+# automáticamente cuando se publica una versión nueva
+if "protocol_source" not in st.session_state:
+    st.session_state.protocol_source = None
+    version_publicada = current_snapshot_version()
+    if version_publicada:
+        activate_snapshot(version_publicada)
+elif st.session_state.protocol_source == "snapshot":
+    version_publicada = current_snapshot_version()
+    if version_publicada and version_publicada != st.session_state.protocol_loader.snapshot_version:
+        if activate_snapshot(version_publicada):
+            show_info_message(f"Protocolos actualizados a la versión {version_publicada}")
 
 # ============================================================================
 # SIDEBAR - CARGA DE DATOS
@@ -71,13 +146,18 @@ protocol_file = st.sidebar.file_uploader(
     help="Excel con pestañas por síntoma (Dolor Torácico, Trauma, etc.)"
 )
 
+if st.session_state.protocol_loader.snapshot_version:
+    st.sidebar.caption(f"Versión publicada: {st.session_state.protocol_loader.snapshot_version}")
+
 if protocol_file is not None:
-    if not st.session_state.protocols_loaded:
+    origen_excel = f"excel:{protocol_file.name}:{protocol_file.size}"
+    if st.session_state.protocol_source != origen_excel:
         with st.spinner("Cargando protocolos..."):
-            protocols = st.session_state.protocol_loader.load_from_excel(protocol_file)
+            # Loader propio de la sesión (el del snapshot es compartido)
+            excel_loader = ProtocolLoader()
+            protocols = excel_loader.load_from_excel(protocol_file)
             if protocols:
-                st.session_state.protocols = protocols
-                st.session_state.protocols_loaded = True
+                activate_protocols(excel_loader, origen_excel)
                 show_success_message(f"Protocolos cargados: {len(protocols)} síntomas")
 
 # Uploader de datos históricos
@@ -91,17 +171,37 @@ historical_file = st.sidebar.file_uploader(
 if historical_file is not None:
     if not st.session_state.historical_loaded:
         with st.spinner("Cargando datos históricos..."):
-            df = st.session_state.forecaster.load_historical_data(historical_file)
+            df = session_forecaster().load_historical_data(historical_file)
             if not df.empty:
                 st.session_state.historical_data = df
                 st.session_state.historical_loaded = True
                 show_success_message(f"Datos cargados: {len(df)} días")
 
+# Series ya ingeridas en el almacén de consultas (sin volver a parsear el CSV);
+# solo con acumulación activada, porque el almacén mezcla los archivos de todas las sesiones
+visit_store = get_visit_store() if config.VISIT_STORE_ACCUMULATE else None
+if not st.session_state.historical_loaded and visit_store is not None:
+    archivos_ingeridos = visit_store.ingested_files()
+    if archivos_ingeridos:
+        st.sidebar.caption(f"Almacén de consultas: {len(archivos_ingeridos)} archivo(s) ingerido(s)")
+        if st.sidebar.button("📦 Cargar desde Almacén"):
+            df = session_forecaster().load_from_store()
+            if not df.empty:
+                st.session_state.historical_data = df
+                st.session_state.historical_loaded = True
+                show_success_message(
+                    f"Datos cargados: {len(df)} días "
+                    f"({df['fecha'].min():%Y-%m-%d} a {df['fecha'].max():%Y-%m-%d})"
+                )
+
 # Opción para generar datos de demostración
 if not st.session_state.historical_loaded:
     if st.sidebar.button("🎲 Generar Datos Demo"):
         with st.spinner("Generando datos sintéticos..."):
+            from modules.forecaster import create_sample_historical_data, create_sample_hourly_data
+            
             demo_data = create_sample_historical_data(days=365*5)
+            session_forecaster().historical_hourly = create_sample_hourly_data(demo_data)
             st.session_state.historical_data = demo_data
             st.session_state.historical_loaded = True
             show_success_message("Datos demo generados (5 años)")
@@ -118,10 +218,11 @@ st.divider()
 # TABS PRINCIPALES
 # ============================================================================
 
-tab1, tab2, tab3, tab4 = st.tabs([
+tab1, tab2, tab3, tab4, tab5 = st.tabs([
     "🩺 Simulación de Triage",
     "📊 Predicción de Demanda",
     "📋 Protocolos",
+    "⚙️ Operaciones",
     "ℹ️ Información"
 ])
 
@@ -138,14 +239,6 @@ with tab1:
         col1, col2 = st.columns([2, 1])
         
         with col1:
-            # Selector de síntoma principal
-            sintomas_disponibles = st.session_state.protocol_loader.get_all_symptoms()
-            sintoma_seleccionado = st.selectbox(
-                "Síntoma Principal",
-                sintomas_disponibles,
-                help="Selecciona el síntoma principal del paciente"
-            )
-            
             # Área de texto para caso clínico
             caso_clinico = st.text_area(
                 "Descripción del Caso Clínico",
@@ -154,24 +247,80 @@ with tab1:
                 help="Describe los síntomas, signos y contexto del paciente"
             )
             
+            # Protocolos sugeridos a partir del caso
+            sintomas_disponibles = st.session_state.protocol_loader.get_all_symptoms()
+            sugerencias = []
+            symptom_router = session_symptom_router() if caso_clinico.strip() else None
+            if symptom_router is not None:
+                sugerencias = symptom_router.rank(caso_clinico)
+            if sugerencias:
+                st.caption("Sugeridos: " + ", ".join(
+                    f"{s['sintoma']} ({s['score']:.2f})" for s in sugerencias
+                ))
+            
+            # Selector de síntoma principal: la mejor sugerencia se preselecciona
+            # solo mientras el usuario no haya elegido uno para este caso (los reruns
+            # no pisan su elección, pero un caso nuevo vuelve a la sugerencia)
+            if st.session_state.get("ultimo_caso") != caso_clinico:
+                st.session_state.ultimo_caso = caso_clinico
+                st.session_state.sintoma_elegido = False
+            if st.session_state.get("sintoma_principal") not in sintomas_disponibles:
+                st.session_state.sintoma_elegido = False
+            if sintomas_disponibles and not st.session_state.get("sintoma_elegido"):
+                st.session_state.sintoma_principal = (
+                    sugerencias[0]["sintoma"] if sugerencias else sintomas_disponibles[0]
+                )
+            sintoma_seleccionado = st.selectbox(
+                "Síntoma Principal",
+                sintomas_disponibles,
+                key="sintoma_principal",
+                on_change=lambda: st.session_state.update(sintoma_elegido=True),
+                help="Selecciona el síntoma principal del paciente"
+            )
+            
             # Botón de clasificación
             if st.button("🔍 Clasificar Triage", type="primary", use_container_width=True):
                 if not caso_clinico.strip():
                     show_error_message("Por favor, ingresa la descripción del caso clínico")
                 else:
-                    with st.spinner("Analizando caso con IA..."):
-                        # Obtener protocolo
-                        protocolo = st.session_state.protocol_loader.get_protocol(sintoma_seleccionado)
+                    # Obtener protocolo
+                    protocolo = st.session_state.protocol_loader.get_protocol(sintoma_seleccionado)
+                    
+                    if config.TRIAGE_STREAMING_ENABLED:
+                        # Mostrar el nivel y el texto a medida que llegan
+                        nivel_placeholder = st.empty()
+                        texto_placeholder = st.empty()
+                        texto_placeholder.caption("Analizando caso con IA...")
                         
-                        # Clasificar
-                        resultado = st.session_state.med_engine.classify_triage(
+                        for evento in med_engine.classify_triage_stream(
                             caso_clinico,
                             sintoma_seleccionado,
                             protocolo
-                        )
+                        ):
+                            if evento["tipo"] == "nivel" and evento["nivel_triage"] in config.TRIAGE_LEVELS:
+                                info = config.TRIAGE_LEVELS[evento["nivel_triage"]]
+                                nivel_placeholder.markdown(
+                                    format_triage_badge(evento["nivel_triage"], info["nombre"], info["color"]),
+                                    unsafe_allow_html=True
+                                )
+                            elif evento["tipo"] == "parcial":
+                                texto_placeholder.text(evento["texto"])
+                            elif evento["tipo"] == "final":
+                                resultado = evento["resultado"]
                         
-                        # Guardar en session state
-                        st.session_state.ultimo_resultado = resultado
+                        # El resultado completo se muestra más abajo
+                        nivel_placeholder.empty()
+                        texto_placeholder.empty()
+                    else:
+                        with st.spinner("Analizando caso con IA..."):
+                            resultado = med_engine.classify_triage(
+                                caso_clinico,
+                                sintoma_seleccionado,
+                                protocolo
+                            )
+                    
+                    # Guardar en session state
+                    st.session_state.ultimo_resultado = resultado
         
         with col2:
             # Mostrar protocolo relevante
@@ -260,6 +409,22 @@ with tab2:
                 value=7,
                 help="Horizonte de predicción"
             )
+            resolucion = st.radio(
+                "Resolución",
+                ["Diaria", "Horaria (personal por turno)"],
+                horizontal=True,
+                help="Horaria: curva de llegadas por hora y médicos por turno de "
+                     f"{config.HORAS_POR_TURNO} horas (requiere CSV con fecha_hora)"
+            )
+            horaria = resolucion.startswith("Horaria")
+            nivel_servicio = st.slider(
+                "Nivel de Servicio (%)",
+                min_value=50,
+                max_value=99,
+                value=int(config.STAFFING_SERVICE_LEVEL * 100),
+                help="Porcentaje de pacientes que debe empezar a ser atendido dentro del tiempo "
+                     "objetivo de su nivel de triage; el personal se recalcula al instante"
+            ) / 100
         
         with col2:
             st.subheader("Distribución de Triage")
@@ -294,39 +459,232 @@ with tab2:
             if st.button("Agregar Evento"):
                 show_success_message(f"Evento agregado para {evento_fecha}")
         
+        # Predicción por nivel de triage (un modelo por nivel/sede en paralelo)
+        tiene_niveles = all(nivel in st.session_state.historical_data.columns for nivel in config.TRIAGE_LEVELS)
+        por_nivel = st.checkbox(
+            "Predecir por nivel de triage",
+            value=False,
+            disabled=not tiene_niveles,
+            help="Entrena un modelo por nivel (y por sede) en paralelo; la distribución de triage se toma de la predicción"
+        )
+        
         # Botón de predicción
         if st.button("🔮 Generar Predicción", type="primary", use_container_width=True):
             with st.spinner("Entrenando modelo y generando predicciones..."):
-                # Entrenar modelo
-                success = st.session_state.forecaster.train(
-                    st.session_state.historical_data,
-                    target_col="pacientes_total"
-                )
-                
-                if success:
-                    # Generar predicciones
-                    forecast = st.session_state.forecaster.predict(horizon_days=horizon_days)
-                    
-                    # Calcular necesidades de personal
-                    forecast_with_staff = st.session_state.forecaster.calculate_staff_needs(
-                        forecast,
-                        triage_dist
+                if horaria:
+                    forecast_hourly = session_forecaster().forecast_hourly(
+                        horizon_days=horizon_days,
+                        por_nivel=por_nivel
+                    )
+                    success = False
+                    if not forecast_hourly.empty:
+                        st.session_state.forecast_hourly = forecast_hourly
+                        show_success_message("Predicción horaria generada exitosamente")
+                elif por_nivel:
+                    forecast = session_forecaster().forecast_by_level(
+                        None if session_forecaster().historical_by_site is not None
+                        else st.session_state.historical_data,
+                        horizon_days=horizon_days
+                    )
+                    success = not forecast.empty
+                else:
+                    # Entrenar modelo
+                    success = session_forecaster().train(
+                        st.session_state.historical_data,
+                        target_col="pacientes_total"
                     )
                     
-                    # Guardar en session state
-                    st.session_state.forecast = forecast_with_staff
+                    if success:
+                        # Generar predicciones
+                        forecast = session_forecaster().predict(horizon_days=horizon_days)
+                
+                if success:
+                    # Guardar en session state (el personal se calcula al mostrar)
+                    st.session_state.forecast = forecast
                     show_success_message("Predicción generada exitosamente")
         
+        # Mostrar resultados de predicción horaria
+        if horaria and "forecast_hourly" in st.session_state:
+            st.divider()
+            forecast_hourly = st.session_state.forecast_hourly
+            # Erlang C sobre todas las horas: milisegundos, se recalcula con cada ajuste
+            shift_staff = session_forecaster().calculate_shift_staff_needs(
+                forecast_hourly,
+                triage_dist,
+                nivel_servicio
+            )
+            hora_pico = forecast_hourly.loc[forecast_hourly["yhat"].idxmax()]
+            
+            st.subheader("📈 Resumen de Predicción Horaria")
+            
+            col1, col2, col3, col4 = st.columns(4)
+            
+            with col1:
+                st.markdown(
+                    create_metric_card(
+                        "Pacientes en el Periodo",
+                        f"{forecast_hourly['yhat'].sum():.0f}",
+                        color="#1f77b4"
+                    ),
+                    unsafe_allow_html=True
+                )
+            
+            with col2:
+                st.markdown(
+                    create_metric_card(
+                        "Hora de Mayor Demanda",
+                        f"{hora_pico['yhat']:.1f}/h",
+                        hora_pico["ds"].strftime("%d/%m %H:%M"),
+                        color="#ff7f0e"
+                    ),
+                    unsafe_allow_html=True
+                )
+            
+            with col3:
+                st.markdown(
+                    create_metric_card(
+                        "Promedio Médicos/Turno",
+                        f"{shift_staff['medicos_necesarios'].mean():.1f}",
+                        color="#2ca02c"
+                    ),
+                    unsafe_allow_html=True
+                )
+            
+            with col4:
+                st.markdown(
+                    create_metric_card(
+                        "Máximo Médicos/Turno",
+                        f"{shift_staff['medicos_necesarios'].max():.0f}",
+                        color="#d62728"
+                    ),
+                    unsafe_allow_html=True
+                )
+            
+            import pandas as pd
+            import plotly.graph_objects as go
+            
+            # Curva de llegadas: por nivel si hay predicción por nivel
+            st.subheader("📊 Curva de Llegadas por Hora")
+            fig_rate = go.Figure()
+            columnas_nivel = [
+                f"yhat_{nivel}" for nivel in config.TRIAGE_LEVELS if f"yhat_{nivel}" in forecast_hourly.columns
+            ]
+            if columnas_nivel:
+                for columna in columnas_nivel:
+                    nivel = columna[len("yhat_"):]
+                    fig_rate.add_trace(go.Scatter(
+                        x=forecast_hourly["ds"],
+                        y=forecast_hourly[columna],
+                        mode="lines",
+                        stackgroup="niveles",
+                        name=f"{nivel} - {config.TRIAGE_LEVELS[nivel]['nombre']}",
+                        line=dict(color=config.TRIAGE_LEVELS[nivel]["color"], width=1)
+                    ))
+            else:
+                fig_rate.add_trace(go.Scatter(
+                    x=forecast_hourly["ds"],
+                    y=forecast_hourly["yhat_upper"],
+                    mode="lines",
+                    line=dict(width=0),
+                    showlegend=False
+                ))
+                fig_rate.add_trace(go.Scatter(
+                    x=forecast_hourly["ds"],
+                    y=forecast_hourly["yhat_lower"],
+                    mode="lines",
+                    line=dict(width=0),
+                    fillcolor="rgba(31, 119, 180, 0.2)",
+                    fill="tonexty",
+                    showlegend=False
+                ))
+                fig_rate.add_trace(go.Scatter(
+                    x=forecast_hourly["ds"],
+                    y=forecast_hourly["yhat"],
+                    mode="lines",
+                    name="Llegadas/hora",
+                    line=dict(color="#1f77b4", width=2)
+                ))
+            fig_rate.update_layout(
+                xaxis_title="Hora",
+                yaxis_title="Pacientes por Hora",
+                hovermode="x unified"
+            )
+            st.plotly_chart(fig_rate, use_container_width=True)
+            
+            # Médicos por turno (hora más exigente del turno según Erlang C)
+            st.subheader("👨‍⚕️ Médicos por Turno")
+            fig_shift = go.Figure()
+            fig_shift.add_trace(go.Bar(
+                x=shift_staff["turno_inicio"],
+                y=shift_staff["medicos_necesarios"],
+                name=f"Médicos (nivel de servicio {nivel_servicio:.0%})",
+                marker_color="#d62728"
+            ))
+            fig_shift.add_trace(go.Scatter(
+                x=shift_staff["turno_inicio"],
+                y=shift_staff["medicos_promedio"],
+                mode="markers",
+                name=f"Horas médico / {config.HORAS_POR_TURNO}",
+                marker=dict(color="#1f77b4", symbol="line-ew-open", size=14)
+            ))
+            fig_shift.update_layout(xaxis_title="Inicio del Turno", yaxis_title="Médicos")
+            st.plotly_chart(fig_shift, use_container_width=True)
+            
+            # Tabla por turno
+            st.subheader("📋 Detalle por Turno")
+            fin_turno = shift_staff["turno_inicio"] + timedelta(hours=config.HORAS_POR_TURNO)
+            tabla_turnos = pd.DataFrame({
+                "Turno": (
+                    shift_staff["turno_inicio"].dt.strftime("%d/%m/%Y %H:%M") + " - " + fin_turno.dt.strftime("%H:%M")
+                ),
+                "Pacientes Estimados": shift_staff["pacientes"].round(0).astype(int),
+                "Horas Médico": shift_staff["horas_medico"].round(1),
+                "Carga Pico (médicos ocupados)": shift_staff["carga_pico"].round(2),
+                "Médicos Necesarios": shift_staff["medicos_necesarios"],
+                "Nivel de Servicio (%)": (shift_staff["nivel_servicio"] * 100).round(1),
+                "Espera Media (min)": shift_staff["espera_media_min"].round(1)
+            })
+            st.dataframe(tabla_turnos, use_container_width=True, hide_index=True)
+            
+            # Validación del plan con simulación de eventos discretos
+            if st.checkbox(
+                "Validar con simulación",
+                help=f"{config.STAFFING_SIMULATION_REPLICAS} corridas con llegadas aleatorias y atención "
+                     "por prioridad de triage con el personal de cada turno"
+            ):
+                simulacion = session_forecaster().simulate_shift_staff(forecast_hourly, shift_staff, triage_dist)
+                st.dataframe(
+                    pd.DataFrame({
+                        "Nivel": simulacion["nivel"] + " - " + simulacion["nivel"].map(
+                            lambda nivel: config.TRIAGE_LEVELS[nivel]["nombre"]
+                        ),
+                        "Pacientes": simulacion["pacientes"].round(0).astype(int),
+                        "Objetivo (min)": simulacion["objetivo_min"].astype(int),
+                        "Atendidos a Tiempo (%)": (simulacion["nivel_servicio"] * 100).round(1),
+                        "Espera Media (min)": simulacion["espera_media_min"].round(1),
+                        "Espera P90 (min)": simulacion["espera_p90_min"].round(1)
+                    }),
+                    use_container_width=True,
+                    hide_index=True
+                )
+            
+            export_to_csv(tabla_turnos, f"personal_por_turno_{datetime.now().strftime('%Y%m%d')}.csv")
+        
         # Mostrar resultados de predicción
-        if "forecast" in st.session_state:
+        elif not horaria and "forecast" in st.session_state:
             st.divider()
-            forecast = st.session_state.forecast
+            # Calcular necesidades de personal
+            forecast = session_forecaster().calculate_staff_needs(
+                st.session_state.forecast.copy(),
+                triage_dist,
+                nivel_servicio
+            )
             
             # Filtrar solo predicciones futuras
             future_forecast = forecast.tail(horizon_days)
             
             # Resumen
-            summary = st.session_state.forecaster.get_forecast_summary(forecast, horizon_days)
+            summary = session_forecaster().get_forecast_summary(forecast, horizon_days)
             
             st.subheader("📈 Resumen de Predicción")
             
@@ -376,6 +734,9 @@ with tab2:
             # Gráfico de predicción de pacientes
             st.subheader("📊 Predicción de Volumen de Pacientes")
             
+            import plotly.express as px
+            import plotly.graph_objects as go
+            
             fig_patients = go.Figure()
             
             fig_patients.add_trace(go.Scatter(
@@ -468,20 +829,100 @@ with tab3:
         
         st.divider()
         
+        # Búsqueda de texto completo (ordena el selector por relevancia)
+        busqueda = st.text_input(
+            "Buscar en protocolos",
+            placeholder="Ej: dolor precordial, disnea, fiebre..."
+        )
+        opciones = stats["sintomas"]
+        if busqueda.strip():
+            resultados = st.session_state.protocol_loader.search(busqueda, limit=20)
+            if resultados:
+                for resultado in resultados[:5]:
+                    st.caption(f"**{resultado['sintoma']}** — coincide en: {', '.join(resultado['campos'])}")
+                opciones = [resultado["sintoma"] for resultado in resultados]
+            else:
+                show_info_message("Sin resultados para la búsqueda")
+        
         # Selector de protocolo
         sintoma = st.selectbox(
             "Seleccionar Protocolo",
-            stats["sintomas"]
+            opciones
         )
         
         if sintoma:
             st.markdown(st.session_state.protocol_loader.get_protocol_summary(sintoma))
 
 # ============================================================================
-# TAB 4: INFORMACIÓN
+# TAB 4: OPERACIONES
 # ============================================================================
 
 with tab4:
+    st.header("Latencia y Throughput")
+    st.caption("Métricas del proceso del servidor (compartidas por todas las sesiones)")
+    
+    filas = METRICS.summary()
+    if not filas:
+        show_info_message("Aún no hay métricas: clasifica casos o genera predicciones")
+    else:
+        import pandas as pd
+        
+        metricas_df = pd.DataFrame(filas)
+        
+        histogramas = metricas_df[metricas_df["tipo"] == "histogram"].copy()
+        if not histogramas.empty:
+            st.subheader("⏱️ Latencias (ms) y tokens")
+            es_duracion = histogramas["metrica"].str.endswith("_seconds")
+            for columna in ["media", "p50", "p95", "p99"]:
+                histogramas.loc[es_duracion, columna] = histogramas.loc[es_duracion, columna] * 1000
+            st.dataframe(
+                histogramas[["metrica", "etiquetas", "n", "media", "p50", "p95", "p99"]].round(2),
+                use_container_width=True,
+                hide_index=True
+            )
+        
+        contadores = metricas_df[metricas_df["tipo"] == "counter"]
+        if not contadores.empty:
+            st.subheader("🔢 Contadores")
+            st.dataframe(
+                contadores[["metrica", "etiquetas", "valor"]],
+                use_container_width=True,
+                hide_index=True
+            )
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        if med_engine.cache is not None:
+            st.subheader("🗄️ Caché de triage")
+            st.json(med_engine.cache.get_stats())
+    with col2:
+        if hasattr(med_engine.model, "get_stats"):
+            st.subheader("🛡️ Modelo")
+            st.json(med_engine.model.get_stats())
+    
+    st.divider()
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("💾 Exportar métricas a archivo"):
+            try:
+                show_success_message(f"Métricas escritas en {METRICS.write_file()}")
+            except OSError as e:
+                show_error_message(f"No se pudieron escribir las métricas: {str(e)}")
+    with col2:
+        st.download_button(
+            label="📥 Descargar (formato Prometheus)",
+            data=METRICS.render_prometheus(),
+            file_name="metrics.prom",
+            mime="text/plain"
+        )
+    if config.METRICS_PROMETHEUS_PORT > 0:
+        st.caption(f"Endpoint de Prometheus: http://<servidor>:{config.METRICS_PROMETHEUS_PORT}/metrics")
+
+# ============================================================================
+# TAB 5: INFORMACIÓN
+# ============================================================================
+
+with tab5:
     st.header("Información del Sistema")
     
     st.markdown("""
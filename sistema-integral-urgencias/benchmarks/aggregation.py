@@ -0,0 +1,65 @@
+"""
+Agregación de consultas en memoria: método anterior (columna de objetos date,
+dos groupby y join) vs agregación vectorizada por hora, turno y día
+
+Uso:
+    python -m benchmarks.aggregation --filas 5000000
+"""
+import argparse
+import statistics
+import time
+import numpy as np
+import pandas as pd
+from benchmarks.historical_ingest import NIVELES, PROBABILIDADES, SEDES, aggregate_previous
+from modules.historical_ingest import aggregate_visits
+
+
+def generate_visits(filas: int, dias: int = 365 * 4, seed: int = 0) -> pd.DataFrame:
+    """Consultas sintéticas con fecha_hora, triage_asignado y sede"""
+    rng = np.random.default_rng(seed)
+    segundos = np.sort(rng.integers(0, dias * 86400, filas))
+    return pd.DataFrame({
+        "fecha_hora": np.datetime64("2021-01-01T00:00:00") + segundos.astype("timedelta64[s]"),
+        "triage_asignado": rng.choice(NIVELES, filas, p=PROBABILIDADES),
+        "sede": rng.choice(SEDES, filas)
+    })
+
+
+def _medir(func, repeticiones: int) -> tuple:
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = func()
+        tiempos.append(time.perf_counter() - inicio)
+    return round(statistics.median(tiempos) * 1000, 1), resultado
+
+
+def run(filas: int, repeticiones: int = 3) -> dict:
+    """
+    Mide cada agregación sobre las mismas consultas
+
+    Returns:
+        Diccionario con ms e intervalos de cada método y si los totales diarios coinciden
+    """
+    df = generate_visits(filas)
+    resultados = {}
+    anterior_ms, anterior = _medir(lambda: aggregate_previous(df), repeticiones)
+    resultados["anterior_dia"] = {"ms": anterior_ms, "intervalos": len(anterior)}
+    for frecuencia in ("dia", "turno", "hora"):
+        ms, serie = _medir(lambda: aggregate_visits(df, frecuencia), repeticiones)
+        resultados[f"vectorizada_{frecuencia}"] = {"ms": ms, "intervalos": len(serie)}
+        if frecuencia == "dia":
+            resultados["mismos_totales"] = bool(
+                (serie["pacientes_total"].to_numpy() == anterior["pacientes_total"].to_numpy()).all()
+            )
+    return resultados
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--filas", type=int, default=5_000_000)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    args = parser.parse_args()
+
+    for clave, valor in run(args.filas, args.repeticiones).items():
+        print(f"{clave}: {valor}")
@@ -0,0 +1,65 @@
+"""
+Backtesting de origen móvil de los backends de predicción
+
+Genera un reporte JSON con MAE/MAPE/cobertura por horizonte y tiempos y
+memoria por backend, para comparar antes de cambiar PROPHET_PARAMS.
+
+Uso:
+    python -m benchmarks.backtest --csv historico.csv --salida reportes/backtest.json
+    python -m benchmarks.backtest --backends ridge holt_winters --folds 12
+"""
+import argparse
+import json
+import config
+from modules.backtesting import backtest, save_report
+from modules.forecaster import Forecaster, create_sample_historical_data
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--csv", help="CSV histórico (por defecto datos sintéticos de 5 años)")
+    parser.add_argument("--backends", nargs="+", default=["prophet", "ridge", "holt_winters", "naive_estacional"])
+    parser.add_argument(
+        "--prophet-params",
+        action="append",
+        default=[],
+        help="JSON con parámetros de Prophet a evaluar (se combina con config.PROPHET_PARAMS); repetible"
+    )
+    parser.add_argument("--horizonte", type=int, default=7)
+    parser.add_argument("--folds", type=int, default=8)
+    parser.add_argument("--paso", type=int, default=7)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--salida", default="reportes/backtest.json")
+    args = parser.parse_args()
+
+    if args.csv:
+        df = Forecaster().load_historical_data(args.csv)
+    else:
+        df = create_sample_historical_data()
+
+    candidatos = []
+    for backend in args.backends:
+        if backend == "prophet" and args.prophet_params:
+            for params in args.prophet_params:
+                candidatos.append((backend, {**config.PROPHET_PARAMS, **json.loads(params)}))
+        else:
+            candidatos.append((backend, None))
+
+    report = backtest(
+        df,
+        candidatos,
+        horizon=args.horizonte,
+        n_folds=args.folds,
+        step=args.paso,
+        max_workers=args.workers
+    )
+    save_report(report, args.salida)
+
+    for resultado in report["resultados"]:
+        print(
+            f"{resultado['backend']:<18} MAE={resultado['mae']:<8} MAPE={resultado['mape']:<8}% "
+            f"cobertura={resultado['cobertura']:<6} fit={resultado['fit_s_medio']}s "
+            f"predict={resultado['predict_s_medio']}s memoria={resultado['pico_memoria_mb']}MB "
+            f"hijos={resultado['pico_memoria_hijos_mb']}MB"
+        )
+    print(f"Reporte guardado en {args.salida}")
@@ -0,0 +1,75 @@
+"""
+Benchmark de throughput de MedEngine.batch_classify usando el modelo stub local
+
+Uso:
+    python -m benchmarks.batch_triage --casos 200 --latencia 0.2 --concurrencia 16
+"""
+import argparse
+import time
+from modules.med_engine import MedEngine
+from modules.stub_model import StubModel
+
+
+CASOS_BASE = [
+    ("Dolor Torácico", "Dolor torácico opresivo con palidez, diaforesis y náuseas"),
+    ("Dolor Torácico", "Dolor punzante en hemitórax derecho al respirar, sin otros síntomas"),
+    ("Dolor Abdominal", "Epigastralgia de 2 horas con vómito"),
+    ("Disnea", "Disnea de medianos esfuerzos de una semana de evolución"),
+    ("Trauma", "Caída desde su altura con dolor en muñeca izquierda"),
+]
+
+
+def build_cases(n: int) -> list:
+    """Genera n casos sintéticos a partir de CASOS_BASE"""
+    casos = []
+    for i in range(n):
+        sintoma, texto = CASOS_BASE[i % len(CASOS_BASE)]
+        casos.append({
+            "caso_clinico": f"Paciente {i}: {texto}",
+            "sintoma_principal": sintoma,
+            "protocolo": {"sintoma": sintoma}
+        })
+    return casos
+
+
+def run(n_casos: int, latencia: float, concurrencia: int, fallos: float) -> dict:
+    """
+    Ejecuta el batch secuencial (concurrencia 1) y el concurrente y mide tiempos
+
+    Returns:
+        Diccionario con los tiempos y el speedup
+    """
+    casos = build_cases(n_casos)
+    resultados = {}
+
+    for nombre, n in [("secuencial", 1), ("concurrente", concurrencia)]:
+        engine = MedEngine(model=StubModel(latency_s=latencia, failure_rate=fallos, seed=0))
+        inicio = time.perf_counter()
+        salida = engine.batch_classify(casos, max_concurrency=n)
+        duracion = time.perf_counter() - inicio
+        errores = sum(1 for r in salida if r["confianza"] == 0.0)
+        stats_modelo = getattr(engine.model, "stats", {})
+        resultados[nombre] = {
+            "segundos": round(duracion, 3),
+            "casos_por_segundo": round(n_casos / duracion, 1),
+            "errores": errores,
+            "fallos_modelo": stats_modelo.get("fallos", 0),
+            "llamadas_modelo": engine.model.calls
+        }
+
+    resultados["speedup"] = round(
+        resultados["secuencial"]["segundos"] / resultados["concurrente"]["segundos"], 1
+    )
+    return resultados
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--casos", type=int, default=200)
+    parser.add_argument("--latencia", type=float, default=0.05)
+    parser.add_argument("--concurrencia", type=int, default=16)
+    parser.add_argument("--fallos", type=float, default=0.0, help="Tasa de errores simulados")
+    args = parser.parse_args()
+
+    for clave, valor in run(args.casos, args.latencia, args.concurrencia, args.fallos).items():
+        print(f"{clave}: {valor}")
@@ -0,0 +1,138 @@
+"""
+Servidor local compatible con OpenAI (/v1/chat/completions) para pruebas sin red
+Responde con el texto de StubModel e inyecta latencia, respuestas lentas (cola
+de latencia) y errores HTTP 503.
+
+Uso:
+    python -m benchmarks.fake_llm_server --puerto 8080 --latencia 0.3 --fallos 0.1
+    LLM_BACKEND=openai OPENAI_COMPAT_BASE_URL=http://localhost:8080/v1 streamlit run app.py
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Tuple
+from modules.stub_model import StubModel
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    """Atiende /v1/chat/completions con o sin streaming (SSE)"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "Ruta no encontrada"}})
+            return
+
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        prompt = body.get("messages", [{}])[-1].get("content", "")
+        delay, fail = self.server.next_behavior()
+
+        time.sleep(delay)
+        if fail:
+            self._send_json(503, {"error": {"message": "Error simulado por el servidor de pruebas"}})
+            return
+
+        texto = self.server.model.render(prompt)
+        if body.get("stream"):
+            self._send_stream(texto, body.get("model", ""))
+        else:
+            self._send_json(200, {
+                "object": "chat.completion",
+                "model": body.get("model", ""),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": texto}, "finish_reason": "stop"}]
+            })
+
+    def _send_json(self, status: int, payload: dict):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_stream(self, texto: str, model: str):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        for linea in texto.splitlines(keepends=True):
+            chunk = {"object": "chat.completion.chunk", "model": model,
+                     "choices": [{"index": 0, "delta": {"content": linea}}]}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeLLMServer(ThreadingHTTPServer):
+    """Servidor con latencia y fallos configurables (modificables en caliente)"""
+
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], latency_s: float = 0.1, jitter_s: float = 0.0,
+                 failure_rate: float = 0.0, slow_rate: float = 0.0, slow_latency_s: float = 2.0,
+                 seed: Optional[int] = 0):
+        super().__init__(address, FakeLLMHandler)
+        self.model = StubModel(latency_s=0.0)
+        self.latency_s = latency_s
+        self.jitter_s = jitter_s
+        self.failure_rate = failure_rate
+        self.slow_rate = slow_rate
+        self.slow_latency_s = slow_latency_s
+        self.requests = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def next_behavior(self) -> Tuple[float, bool]:
+        """Latencia y fallo de la próxima solicitud (deterministas con la semilla)"""
+        with self._lock:
+            self.requests += 1
+            delay = self.latency_s + self._rng.uniform(0, self.jitter_s)
+            if self._rng.random() < self.slow_rate:
+                delay = self.slow_latency_s
+            return delay, self._rng.random() < self.failure_rate
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+
+def start_server(port: int = 0, **kwargs) -> FakeLLMServer:
+    """
+    Inicia el servidor en un thread de fondo
+
+    Args:
+        port: Puerto (0 = uno libre)
+        **kwargs: latency_s, jitter_s, failure_rate, slow_rate, slow_latency_s, seed
+
+    Returns:
+        Servidor en ejecución (usar server.base_url y server.shutdown())
+    """
+    server = FakeLLMServer(("127.0.0.1", port), **kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--puerto", type=int, default=8080)
+    parser.add_argument("--latencia", type=float, default=0.3)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--fallos", type=float, default=0.0, help="Tasa de errores 503")
+    parser.add_argument("--lentas", type=float, default=0.0, help="Tasa de respuestas lentas")
+    parser.add_argument("--latencia-lenta", type=float, default=2.0)
+    args = parser.parse_args()
+
+    server = FakeLLMServer(("127.0.0.1", args.puerto), latency_s=args.latencia,
+                           jitter_s=args.jitter, failure_rate=args.fallos,
+                           slow_rate=args.lentas, slow_latency_s=args.latencia_lenta)
+    print(f"Servidor de pruebas en {server.base_url}")
+    server.serve_forever()
@@ -0,0 +1,146 @@
+"""
+Ingesta de un CSV histórico grande: lectura completa (método anterior) vs
+lectura por bloques con usecols, tipos fijos y formato de fecha explícito
+
+Genera un CSV sintético de consultas (varias sedes, niveles de triage y
+columnas que la predicción no usa) y mide tiempo y memoria pico de cada
+método en un proceso separado.
+
+Uso:
+    python -m benchmarks.historical_ingest --filas 10000000
+    python -m benchmarks.historical_ingest --filas 10000000 --sin-anterior
+"""
+import argparse
+import os
+import resource
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+import numpy as np
+import pandas as pd
+
+
+SEDES = ["Central", "Norte", "Sur", "Occidente"]
+NIVELES = ["1", "2", "3", "7"]
+PROBABILIDADES = [0.1, 0.2, 0.5, 0.2]
+
+
+def generate_csv(path: str, filas: int, dias: int = 365 * 4, bloque: int = 1_000_000, seed: int = 0):
+    """
+    Escribe un CSV de consultas con fecha_hora, triage_asignado, sede y
+    columnas extra (edad, motivo, observaciones)
+    """
+    rng = np.random.default_rng(seed)
+    inicio = np.datetime64("2021-01-01T00:00:00")
+    escritas = 0
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        while escritas < filas:
+            n = min(bloque, filas - escritas)
+            segundos = np.sort(rng.integers(0, dias * 86400, n))
+            pd.DataFrame({
+                "fecha_hora": inicio + segundos.astype("timedelta64[s]"),
+                "triage_asignado": rng.choice(NIVELES, n, p=PROBABILIDADES),
+                "sede": rng.choice(SEDES, n),
+                "edad": rng.integers(0, 95, n),
+                "motivo": rng.choice(["dolor", "fiebre", "trauma", "disnea"], n),
+                "observaciones": "sin observaciones"
+            }).to_csv(f, index=False, header=escritas == 0, date_format="%Y-%m-%d %H:%M:%S")
+            escritas += n
+
+
+def aggregate_previous(df: pd.DataFrame) -> pd.DataFrame:
+    """Forecaster._aggregate_daily antes de la agregación vectorizada"""
+    df = df.copy()
+    df["fecha"] = df["fecha_hora"].dt.date
+    daily = df.groupby("fecha").agg({"fecha_hora": "count"}).rename(columns={"fecha_hora": "pacientes_total"})
+    triage_counts = df.groupby(["fecha", "triage_asignado"]).size().unstack(fill_value=0)
+    daily = daily.join(triage_counts, how="left").reset_index()
+    daily["fecha"] = pd.to_datetime(daily["fecha"])
+    return daily
+
+
+def _peak_mb() -> float:
+    # ru_maxrss está en KB en Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _load_previous(path: str) -> dict:
+    """Método anterior: read_csv completo, to_datetime sin formato y agregación en memoria"""
+    inicio = time.perf_counter()
+    df = pd.read_csv(path)
+    df["fecha_hora"] = pd.to_datetime(df["fecha_hora"])
+    daily = aggregate_previous(df)
+    por_sede = pd.concat(
+        [
+            aggregate_previous(df_sede).assign(sede=sede)
+            for sede, df_sede in df.groupby("sede")
+        ],
+        ignore_index=True
+    )
+    return {
+        "segundos": round(time.perf_counter() - inicio, 2),
+        "memoria_pico_mb": round(_peak_mb()),
+        "dias": len(daily),
+        "pacientes": int(daily["pacientes_total"].sum()),
+        "filas_por_sede": len(por_sede)
+    }
+
+
+def _load_streaming(path: str, chunk_size: int) -> dict:
+    """Método por bloques (Forecaster.load_historical_data)"""
+    from modules.forecaster import Forecaster
+
+    inicio = time.perf_counter()
+    forecaster = Forecaster(model_store=None)
+    daily = forecaster.load_historical_data(path, chunk_size=chunk_size)
+    return {
+        "segundos": round(time.perf_counter() - inicio, 2),
+        "memoria_pico_mb": round(_peak_mb()),
+        "dias": len(daily),
+        "pacientes": int(daily["pacientes_total"].sum()),
+        "filas_por_sede": len(forecaster.historical_by_site)
+    }
+
+
+def _in_new_process(func, *args) -> dict:
+    """Ejecuta en un proceso nuevo para medir su memoria pico por separado"""
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as executor:
+        return executor.submit(func, *args).result()
+
+
+def run(filas: int, chunk_size: int, anterior: bool = True, path: str = None) -> dict:
+    """
+    Genera el CSV (si no existe) y carga con cada método
+
+    Returns:
+        Diccionario con tiempo, memoria pico y totales de cada método
+    """
+    path = path or os.path.join(tempfile.gettempdir(), f"historico_{filas}.csv")
+    resultados = {}
+    if not os.path.exists(path):
+        inicio = time.perf_counter()
+        generate_csv(path, filas)
+        resultados["generacion_s"] = round(time.perf_counter() - inicio, 1)
+    resultados["archivo_mb"] = round(os.path.getsize(path) / 2**20)
+
+    resultados["por_bloques"] = _in_new_process(_load_streaming, path, chunk_size)
+    if anterior:
+        resultados["anterior"] = _in_new_process(_load_previous, path)
+        resultados["mismos_totales"] = all(
+            resultados["anterior"][clave] == resultados["por_bloques"][clave]
+            for clave in ("dias", "pacientes", "filas_por_sede")
+        )
+    return resultados
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--filas", type=int, default=10_000_000)
+    parser.add_argument("--bloque", type=int, default=500_000, help="Filas por bloque")
+    parser.add_argument("--csv", default=None, help="Ruta del CSV (se genera si no existe)")
+    parser.add_argument("--sin-anterior", action="store_true", help="No medir el método anterior")
+    args = parser.parse_args()
+
+    for clave, valor in run(args.filas, args.bloque, not args.sin_anterior, args.csv).items():
+        print(f"{clave}: {valor}")
@@ -0,0 +1,93 @@
+"""
+Predicción horaria: tiempo de ajuste y error de cada backend sobre varios
+años de conteos por hora, y costo de daily_seasonality en el modelo diario
+
+Usa los datos demo repartidos en horas (create_sample_hourly_data) y deja
+fuera los últimos días como validación. Prophet se mide con la historia
+acotada a FORECAST_HOURLY_HISTORY_DAYS y, opcionalmente, completa.
+
+Uso:
+    python -m benchmarks.hourly_forecast --dias 1460 --horizonte 7
+    python -m benchmarks.hourly_forecast --prophet-completo
+"""
+import argparse
+import logging
+import time
+import numpy as np
+import config
+from modules.forecaster import Forecaster, create_sample_historical_data, create_sample_hourly_data
+
+
+BACKENDS = ["ridge", "holt_winters", "naive_estacional", "prophet"]
+
+
+def _evaluate(backend: str, entrenamiento, validacion, horizonte: int, historia_dias: int) -> dict:
+    """Ajusta con el backend horario y mide el error sobre las horas de validación"""
+    config.FORECAST_HOURLY_HISTORY_DAYS = historia_dias
+    forecaster = Forecaster(model_store=None, hourly_backend=backend)
+    inicio = time.perf_counter()
+    forecast = forecaster.forecast_hourly(entrenamiento, horizon_days=horizonte)
+    segundos = time.perf_counter() - inicio
+
+    real = validacion["pacientes_total"].to_numpy(dtype=float)
+    yhat = forecast["yhat"].to_numpy()
+    turnos_real = real.reshape(-1, config.HORAS_POR_TURNO).sum(axis=1)
+    turnos_pred = yhat.reshape(-1, config.HORAS_POR_TURNO).sum(axis=1)
+    return {
+        "segundos": round(segundos, 2),
+        "historia_dias": historia_dias if backend == "prophet" and historia_dias else len(entrenamiento) // 24,
+        "mae_hora": round(float(np.mean(np.abs(yhat - real))), 2),
+        "mae_turno": round(float(np.mean(np.abs(turnos_pred - turnos_real))), 2)
+    }
+
+
+def _prophet_daily(daily, daily_seasonality: bool) -> float:
+    """Segundos de ajuste de Prophet sobre totales diarios"""
+    from modules.forecast_backends import ProphetBackend
+
+    backend = ProphetBackend(params={**config.PROPHET_PARAMS, "daily_seasonality": daily_seasonality})
+    prophet_df = daily.rename(columns={"fecha": "ds", "pacientes_total": "y"})[["ds", "y"]]
+    inicio = time.perf_counter()
+    backend.fit(prophet_df, [])
+    return round(time.perf_counter() - inicio, 2)
+
+
+def run(dias: int, horizonte: int, backends=None, prophet_completo: bool = False) -> dict:
+    """
+    Evalúa cada backend horario y el modelo diario con y sin daily_seasonality
+
+    Returns:
+        Diccionario {backend: {segundos, historia_dias, mae_hora, mae_turno}}
+    """
+    logging.getLogger("cmdstanpy").disabled = True
+    daily = create_sample_historical_data(days=dias)
+    hourly = create_sample_hourly_data(daily)
+    corte = len(hourly) - horizonte * 24
+    entrenamiento, validacion = hourly.iloc[:corte], hourly.iloc[corte:]
+
+    resultados = {}
+    historia = config.FORECAST_HOURLY_HISTORY_DAYS
+    for backend in backends or BACKENDS:
+        resultados[backend] = _evaluate(backend, entrenamiento, validacion, horizonte, historia)
+        if backend == "prophet" and prophet_completo:
+            resultados["prophet_historia_completa"] = _evaluate(backend, entrenamiento, validacion, horizonte, 0)
+    config.FORECAST_HOURLY_HISTORY_DAYS = historia
+
+    if "prophet" in (backends or BACKENDS):
+        resultados["prophet_diario_s"] = {
+            "daily_seasonality=False": _prophet_daily(daily, False),
+            "daily_seasonality=True": _prophet_daily(daily, True)
+        }
+    return resultados
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--dias", type=int, default=365 * 4, help="Días de historia")
+    parser.add_argument("--horizonte", type=int, default=7, help="Días de validación")
+    parser.add_argument("--backends", nargs="+", default=None, choices=BACKENDS)
+    parser.add_argument("--prophet-completo", action="store_true", help="Medir también Prophet con toda la historia")
+    args = parser.parse_args()
+
+    for clave, valor in run(args.dias, args.horizonte, args.backends, args.prophet_completo).items():
+        print(f"{clave}: {valor}")
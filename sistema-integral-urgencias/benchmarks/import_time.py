@@ -0,0 +1,133 @@
+"""
+Costo de importación por módulo y del primer render de app.py
+Cada medición corre en un proceso nuevo (arranque en frío): tiempo de import,
+importaciones directas más costosas según python -X importtime y librerías
+pesadas que quedaron cargadas.
+
+Uso:
+    python -m benchmarks.import_time --repeticiones 3
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+
+MODULOS = [
+    "config",
+    "modules.protocol_loader",
+    "modules.med_engine",
+    "modules.shared_resources",
+    "modules.metrics",
+    "modules.forecaster",
+    "modules.symptom_router",
+    "utils.helpers",
+]
+
+# Dependencias cuya carga se difiere hasta usar la función que las necesita
+PESADAS = ["pandas", "numpy", "plotly.express", "prophet", "google.generativeai", "sklearn", "scipy"]
+
+_MEDIR_IMPORT = """
+import json, sys, time
+inicio = time.perf_counter()
+import {modulo}
+segundos = time.perf_counter() - inicio
+print(json.dumps({{"segundos": segundos, "pesadas": [m for m in {pesadas!r} if m in sys.modules]}}))
+"""
+
+_MEDIR_RENDER = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+inicio = time.perf_counter()
+app = AppTest.from_file("app.py", default_timeout=300).run()
+segundos = time.perf_counter() - inicio
+print(json.dumps({{
+    "segundos": segundos,
+    "errores": len(app.exception),
+    "pesadas": [m for m in {pesadas!r} if m in sys.modules]
+}}))
+"""
+
+
+def _run(codigo: str, importtime: bool = False) -> tuple:
+    """Ejecuta el código en un intérprete nuevo; retorna (resultado JSON, stderr)"""
+    env = dict(os.environ)
+    env.setdefault("LLM_BACKEND", "stub")
+    comando = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", codigo]
+    proceso = subprocess.run(comando, capture_output=True, text=True, env=env, check=True)
+    return json.loads(proceso.stdout.strip().splitlines()[-1]), proceso.stderr
+
+
+def _top_imports(stderr: str, modulo: str, n: int = 5) -> list:
+    """Importaciones directas del módulo con mayor tiempo acumulado (ms)"""
+    directas = []
+    for linea in stderr.splitlines():
+        if not linea.startswith("import time:") or "cumulative" in linea:
+            continue
+        _, acumulado, nombre = linea[len("import time:"):].split("|")
+        profundidad = (len(nombre) - len(nombre.lstrip())) // 2
+        if profundidad == 1:
+            directas.append((nombre.strip(), int(acumulado) / 1000))
+        elif profundidad == 0:
+            # Los hijos se listan antes que el padre: al cerrar el módulo medido se termina
+            if nombre.strip() == modulo:
+                break
+            directas = []
+    directas.sort(key=lambda c: c[1], reverse=True)
+    return [{"modulo": nombre, "ms": round(ms, 1)} for nombre, ms in directas[:n]]
+
+
+def medir_modulo(modulo: str, repeticiones: int) -> dict:
+    tiempos = []
+    for _ in range(repeticiones):
+        resultado, _ = _run(_MEDIR_IMPORT.format(modulo=modulo, pesadas=PESADAS))
+        tiempos.append(resultado["segundos"])
+    _, stderr = _run(_MEDIR_IMPORT.format(modulo=modulo, pesadas=PESADAS), importtime=True)
+    return {
+        "ms": round(statistics.median(tiempos) * 1000, 1),
+        "pesadas_cargadas": resultado["pesadas"],
+        "mas_costosos": _top_imports(stderr, modulo)
+    }
+
+
+def medir_render(repeticiones: int) -> dict:
+    tiempos = []
+    for _ in range(repeticiones):
+        resultado, _ = _run(_MEDIR_RENDER.format(pesadas=PESADAS))
+        tiempos.append(resultado["segundos"])
+    return {
+        "ms": round(statistics.median(tiempos) * 1000, 1),
+        "errores": resultado["errores"],
+        "pesadas_cargadas": resultado["pesadas"]
+    }
+
+
+def run(repeticiones: int, render: bool = True) -> dict:
+    """
+    Mide cada módulo y, opcionalmente, el primer render de la aplicación
+
+    Returns:
+        Diccionario {modulo: {ms, pesadas_cargadas, mas_costosos}} y "app_primer_render"
+    """
+    resultados = {modulo: medir_modulo(modulo, repeticiones) for modulo in MODULOS}
+    if render:
+        resultados["app_primer_render"] = medir_render(repeticiones)
+    return resultados
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--sin-render", action="store_true", help="No medir el primer render de app.py")
+    parser.add_argument("--salida", default=None, help="Guardar el resultado en JSON")
+    args = parser.parse_args()
+
+    resultados = run(args.repeticiones, render=not args.sin_render)
+    for clave, valor in resultados.items():
+        print(f"{clave}: {valor}")
+    if args.salida:
+        os.makedirs(os.path.dirname(args.salida) or ".", exist_ok=True)
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
@@ -0,0 +1,63 @@
+"""
+Benchmark offline de los backends de modelo: stub en proceso y endpoint HTTP
+compatible con OpenAI servido localmente, con y sin modelo alternativo
+
+Uso:
+    python -m benchmarks.llm_backends --casos 100 --latencia 0.1 --fallos 0.2
+"""
+import argparse
+import time
+from benchmarks.batch_triage import build_cases
+from benchmarks.fake_llm_server import start_server
+from modules.llm_backends import OpenAICompatibleBackend, StubBackend
+from modules.med_engine import MedEngine
+from modules.triage_cache import TriageCache
+
+
+def _run_batch(engine: MedEngine, casos: list, concurrencia: int) -> dict:
+    inicio = time.perf_counter()
+    salida = engine.batch_classify(casos, max_concurrency=concurrencia, max_retries=0)
+    duracion = time.perf_counter() - inicio
+    return {
+        "segundos": round(duracion, 3),
+        "casos_por_segundo": round(len(casos) / duracion, 1),
+        "errores": sum(1 for r in salida if r["confianza"] == 0.0)
+    }
+
+
+def run(n_casos: int, latencia: float, concurrencia: int, fallos: float) -> dict:
+    """
+    Clasifica el mismo lote con cada backend (sin caché para medir el modelo)
+
+    Returns:
+        Diccionario con throughput y errores por escenario
+    """
+    casos = build_cases(n_casos)
+    sin_cache = TriageCache(max_entries=0)
+    server = start_server(latency_s=latencia, failure_rate=fallos, seed=0)
+    try:
+        http = OpenAICompatibleBackend(base_url=server.base_url, max_concurrency=concurrencia)
+        escenarios = {
+            "stub": MedEngine(model=StubBackend(latency_s=latencia, failure_rate=fallos), cache=sin_cache),
+            "openai_local": MedEngine(model=http, cache=sin_cache),
+            "openai_local_con_alternativo": MedEngine(
+                model=http, cache=sin_cache, fallback_model=StubBackend(latency_s=0.0)
+            )
+        }
+        resultados = {nombre: _run_batch(engine, casos, concurrencia) for nombre, engine in escenarios.items()}
+        resultados["solicitudes_http"] = server.requests
+        return resultados
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--casos", type=int, default=100)
+    parser.add_argument("--latencia", type=float, default=0.1)
+    parser.add_argument("--concurrencia", type=int, default=16)
+    parser.add_argument("--fallos", type=float, default=0.2, help="Tasa de errores simulados")
+    args = parser.parse_args()
+
+    for clave, valor in run(args.casos, args.latencia, args.concurrencia, args.fallos).items():
+        print(f"{clave}: {valor}")
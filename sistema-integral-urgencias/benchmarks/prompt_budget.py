@@ -0,0 +1,78 @@
+"""
+Benchmark del tamaño del prompt: protocolo completo (to_string) vs filas seleccionadas
+
+Uso:
+    python -m benchmarks.prompt_budget --filas 120 --presupuesto 600
+"""
+import argparse
+import time
+import pandas as pd
+import config
+from modules.prompt_builder import PromptBuilder, count_tokens
+from modules.protocol_loader import ProtocolLoader
+
+
+CASO = (
+    "Paciente masculino de 55 años con dolor torácico opresivo de 30 minutos, "
+    "palidez, diaforesis profusa y náuseas. Antecedente de diabetes."
+)
+
+FILAS_BASE = [
+    ("¿El dolor es opresivo o irradiado al brazo?", "Dolor opresivo", "01 - Dolor torácico con diaforesis"),
+    ("¿Tiene antecedentes de diabetes o HTA?", "Palidez", "07 - Riesgo coronario / DM"),
+    ("¿Presenta dificultad para respirar?", "Disnea", "02 - Dolor torácico con disnea"),
+    ("¿Hace cuánto comenzó el dolor?", "Síncope", "02 - Síncope asociado"),
+    ("¿El dolor cambia con la posición?", "", "03 - Dolor osteomuscular"),
+    ("¿Tuvo un traumatismo reciente?", "", "03 - Dolor a la palpación"),
+]
+
+
+def build_protocol(n_filas: int):
+    """Protocolo sintético de n_filas con el parseo real de ProtocolLoader"""
+    filas = [FILAS_BASE[i % len(FILAS_BASE)] for i in range(n_filas)]
+    df = pd.DataFrame(filas, columns=["Preguntas", "Signos de Alarma", "Criterio de Triage"])
+    df["Observaciones"] = [f"Registro {i}" if i % 3 == 0 else None for i in range(n_filas)]
+    return ProtocolLoader()._parse_protocol("Dolor Torácico", df)
+
+
+def run(n_filas: int, presupuesto: int) -> dict:
+    """
+    Compara el prompt anterior (tabla completa) con el del PromptBuilder
+
+    Returns:
+        Diccionario con tokens estimados y tiempos de armado
+    """
+    protocolo = build_protocol(n_filas)
+    builder = PromptBuilder(max_protocol_tokens=presupuesto)
+
+    inicio = time.perf_counter()
+    anterior = (
+        f"{config.TRIAGE_SYSTEM_PROMPT}\n\nPROTOCOLO APLICABLE: Dolor Torácico\n"
+        f"{protocolo['contenido_completo']}\n\nCASO CLÍNICO:\n{CASO}\n"
+    )
+    anterior_ms = (time.perf_counter() - inicio) * 1000
+
+    inicio = time.perf_counter()
+    nuevo = builder.build(CASO, protocolo, "Dolor Torácico")
+    nuevo_ms = (time.perf_counter() - inicio) * 1000
+
+    tokens_anterior = count_tokens(anterior)
+    tokens_nuevo = count_tokens(nuevo)
+    return {
+        "tokens_prefijo": builder.prefix_tokens,
+        "tokens_prompt_anterior": tokens_anterior,
+        "tokens_prompt_nuevo": tokens_nuevo,
+        "reduccion": f"{(1 - tokens_nuevo / tokens_anterior) * 100:.1f}%",
+        "armado_anterior_ms": round(anterior_ms, 2),
+        "armado_nuevo_ms": round(nuevo_ms, 2)
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--filas", type=int, default=120)
+    parser.add_argument("--presupuesto", type=int, default=config.TRIAGE_PROMPT_MAX_PROTOCOL_TOKENS)
+    args = parser.parse_args()
+
+    for clave, valor in run(args.filas, args.presupuesto).items():
+        print(f"{clave}: {valor}")
@@ -0,0 +1,122 @@
+"""
+Escenarios de resiliencia contra el servidor local compatible con OpenAI
+    - cola_latencia: 10% de respuestas lentas, con y sin hedging (p50/p95/p99)
+    - caida: el servidor responde 503 siempre; el circuito se abre y se usa la clasificación local
+    - bloqueo: el servidor tarda más que el plazo; la llamada se corta en TRIAGE_DEADLINE_S
+
+Cada escenario verifica su comportamiento esperado; el proceso termina con
+código 1 si alguna verificación falla.
+
+Uso:
+    python -m benchmarks.resilience --casos 200
+"""
+import argparse
+import sys
+import time
+import numpy as np
+from benchmarks.fake_llm_server import start_server
+from modules.llm_backends import OpenAICompatibleBackend
+from modules.med_engine import MedEngine
+from modules.resilience import CircuitBreaker, ResilientModel
+from modules.triage_cache import TriageCache
+
+
+PROTOCOLO = {"sintoma": "Cefalea"}
+
+
+def _engine(server, **kwargs) -> MedEngine:
+    """MedEngine sin caché ni fast-path sobre el servidor local"""
+    backend = OpenAICompatibleBackend(base_url=server.base_url, max_concurrency=32)
+    engine = MedEngine(model=backend, cache=TriageCache(max_entries=0))
+    engine.rule_engine = None
+    engine.model = ResilientModel(backend, **kwargs)
+    return engine
+
+
+def _latencias(engine: MedEngine, n: int) -> np.ndarray:
+    tiempos = []
+    for i in range(n):
+        inicio = time.perf_counter()
+        engine.classify_triage(f"Caso {i}: cefalea leve sin otros síntomas", "Cefalea", PROTOCOLO)
+        tiempos.append(time.perf_counter() - inicio)
+    return np.array(tiempos)
+
+
+def escenario_cola_latencia(n: int) -> dict:
+    resultados = {}
+    for nombre, hedge in [("sin_hedging", False), ("con_hedging", True)]:
+        server = start_server(latency_s=0.05, jitter_s=0.02, slow_rate=0.1, slow_latency_s=1.0, seed=1)
+        try:
+            engine = _engine(server, hedge_enabled=hedge, deadline_s=5)
+            tiempos = _latencias(engine, n)
+            resultados[nombre] = {
+                "p50_s": round(float(np.percentile(tiempos, 50)), 3),
+                "p95_s": round(float(np.percentile(tiempos, 95)), 3),
+                "p99_s": round(float(np.percentile(tiempos, 99)), 3),
+                "duplicadas": engine.model.stats["duplicadas"],
+                "solicitudes_http": server.requests
+            }
+        finally:
+            server.shutdown()
+    resultados["ok"] = resultados["con_hedging"]["p95_s"] < resultados["sin_hedging"]["p95_s"]
+    return resultados
+
+
+def escenario_caida(n: int) -> dict:
+    server = start_server(latency_s=0.05, failure_rate=1.0)
+    try:
+        engine = _engine(server, breaker=CircuitBreaker(failure_threshold=5, reset_timeout_s=60))
+        inicio = time.perf_counter()
+        resultados = [
+            engine.classify_triage("Cefalea intensa con vómito y palidez", "Cefalea", PROTOCOLO)
+            for _ in range(n)
+        ]
+        duracion = time.perf_counter() - inicio
+        stats = engine.model.get_stats()
+        return {
+            "segundos": round(duracion, 3),
+            "solicitudes_http": server.requests,
+            "rechazadas_circuito": stats["rechazadas_circuito"],
+            "circuito": stats["circuito"],
+            "niveles": sorted({r["nivel_triage"] for r in resultados}),
+            "ok": server.requests == 5 and stats["circuito"] == "abierto"
+                  and all(r["confianza"] > 0 for r in resultados)
+        }
+    finally:
+        server.shutdown()
+
+
+def escenario_bloqueo() -> dict:
+    server = start_server(latency_s=3.0)
+    try:
+        engine = _engine(server, deadline_s=0.5, hedge_enabled=False)
+        inicio = time.perf_counter()
+        resultado = engine.classify_triage("Cefalea con disnea", "Cefalea", PROTOCOLO)
+        duracion = time.perf_counter() - inicio
+        return {
+            "segundos": round(duracion, 3),
+            "plazos_excedidos": engine.model.stats["plazos_excedidos"],
+            "nivel": resultado["nivel_triage"],
+            "ok": duracion < 1.0 and engine.model.stats["plazos_excedidos"] == 1
+        }
+    finally:
+        server.shutdown()
+
+
+def run(n_casos: int) -> dict:
+    return {
+        "cola_latencia": escenario_cola_latencia(n_casos),
+        "caida": escenario_caida(n_casos),
+        "bloqueo": escenario_bloqueo()
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--casos", type=int, default=200)
+    args = parser.parse_args()
+
+    resultados = run(args.casos)
+    for clave, valor in resultados.items():
+        print(f"{clave}: {valor}")
+    sys.exit(0 if all(r["ok"] for r in resultados.values()) else 1)
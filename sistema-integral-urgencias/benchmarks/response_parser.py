@@ -0,0 +1,82 @@
+"""
+Micro-benchmark del parser de respuestas de triage sobre un corpus de respuestas
+
+Compara el parser de una pasada (modules.response_parser) con la extracción
+anterior basada en varias llamadas a re.search sin compilar.
+
+Uso:
+    python -m benchmarks.response_parser --repeticiones 2000
+"""
+import argparse
+import json
+import os
+import re
+import time
+from modules.response_parser import parse_triage_response
+
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), "data", "triage_responses.json")
+
+
+def legacy_parse(response_text: str) -> dict:
+    """Extracción previa: tres pasadas independientes con re.search"""
+    nivel = "03"
+    for pattern in [r"Nivel de Triage:\s*(\d{2})", r"Triage:\s*(\d{2})", r"Nivel:\s*(\d{2})", r"\b(01|02|03|07)\b"]:
+        match = re.search(pattern, response_text, re.IGNORECASE)
+        if match and match.group(1) in ["01", "02", "03", "07"]:
+            nivel = match.group(1)
+            break
+
+    razonamiento = response_text.strip()
+    for pattern in [r"Razonamiento:\s*(.+?)(?:\n\n|\Z)", r"Explicación:\s*(.+?)(?:\n\n|\Z)", r"Justificación:\s*(.+?)(?:\n\n|\Z)"]:
+        match = re.search(pattern, response_text, re.IGNORECASE | re.DOTALL)
+        if match:
+            razonamiento = match.group(1).strip()
+            break
+
+    signos = []
+    match = re.search(r"Signos de Alarma Detectados:\s*(.+?)(?:\n\n|\n[A-Z]|\Z)", response_text, re.IGNORECASE | re.DOTALL)
+    if match:
+        signos = [s.strip() for s in re.findall(r"[-•]\s*(.+?)(?:\n|$)", match.group(1)) if s.strip()]
+
+    return {"nivel_triage": nivel, "signos_alarma": signos, "razonamiento": razonamiento}
+
+
+def run(repeticiones: int) -> dict:
+    """
+    Mide tiempo por respuesta y aciertos de nivel de ambos parsers
+
+    Returns:
+        Diccionario con resultados por parser
+    """
+    with open(CORPUS_PATH, encoding="utf-8") as f:
+        corpus = json.load(f)
+
+    resultados = {}
+    for nombre, parser in [("anterior", legacy_parse), ("una_pasada", parse_triage_response)]:
+        aciertos = sum(parser(c["respuesta"])["nivel_triage"] == c["nivel_esperado"] for c in corpus)
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            for caso in corpus:
+                parser(caso["respuesta"])
+        duracion = time.perf_counter() - inicio
+        resultados[nombre] = {
+            "us_por_respuesta": round(duracion / (repeticiones * len(corpus)) * 1e6, 2),
+            "aciertos_nivel": f"{aciertos}/{len(corpus)}"
+        }
+
+    reglas = {}
+    for caso in corpus:
+        regla = parse_triage_response(caso["respuesta"])["regla_nivel"]
+        reglas[regla] = reglas.get(regla, 0) + 1
+    resultados["reglas_una_pasada"] = reglas
+    return resultados
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeticiones", type=int, default=2000)
+    args = parser.parse_args()
+
+    for clave, valor in run(args.repeticiones).items():
+        print(f"{clave}: {valor}")
@@ -0,0 +1,75 @@
+"""
+Personal por teoría de colas: tiempo de Erlang C y de la simulación sobre un
+horizonte horario, y nivel de servicio simulado del plan Erlang C frente a la
+fórmula lineal anterior (médicos = horas médico de la hora pico)
+
+Usa como predicción la curva horaria de los datos demo de los últimos días.
+
+Uso:
+    python -m benchmarks.staffing --dias 30 --nivel-servicio 0.8
+"""
+import argparse
+import statistics
+import time
+import numpy as np
+import config
+from modules.forecaster import Forecaster, create_sample_historical_data, create_sample_hourly_data
+
+
+def _medir(func, repeticiones: int) -> tuple:
+    """Mediana en ms y último resultado"""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = func()
+        tiempos.append(time.perf_counter() - inicio)
+    return round(statistics.median(tiempos) * 1000, 1), resultado
+
+
+def _simulated_levels(forecaster: Forecaster, hourly, turnos) -> dict:
+    """Fracción atendida a tiempo por nivel con el personal de cada turno"""
+    simulacion = forecaster.simulate_shift_staff(hourly, turnos)
+    return dict(zip(simulacion["nivel"], simulacion["nivel_servicio"].round(3)))
+
+
+def run(dias: int, nivel_servicio: float, repeticiones: int = 5) -> dict:
+    """
+    Mide el dimensionamiento y compara ambos planes con la simulación
+
+    Returns:
+        Diccionario con ms de Erlang C y de la simulación, médicos-turno de
+        cada plan y nivel de servicio simulado por nivel de triage
+    """
+    hourly = create_sample_hourly_data(create_sample_historical_data(days=365)).tail(dias * 24)
+    hourly = hourly.rename(columns={
+        "fecha": "ds", "pacientes_total": "yhat", **{nivel: f"yhat_{nivel}" for nivel in config.TRIAGE_LEVELS}
+    }).reset_index(drop=True)
+    forecaster = Forecaster(model_store=None)
+
+    erlang_ms, turnos = _medir(
+        lambda: forecaster.calculate_shift_staff_needs(hourly, nivel_servicio=nivel_servicio), repeticiones
+    )
+    simulacion_ms, _ = _medir(lambda: forecaster.simulate_shift_staff(hourly, turnos), repeticiones)
+
+    # Plan anterior: tantos médicos como horas médico en la hora pico del turno
+    lineal = turnos.assign(medicos_necesarios=np.ceil(turnos["carga_pico"]).astype(int))
+    return {
+        "horas": len(hourly),
+        "erlang_ms": erlang_ms,
+        f"simulacion_ms_{config.STAFFING_SIMULATION_REPLICAS}_replicas": simulacion_ms,
+        "medicos_turno_erlang": int(turnos["medicos_necesarios"].sum()),
+        "medicos_turno_lineal": int(lineal["medicos_necesarios"].sum()),
+        "nivel_servicio_erlang": _simulated_levels(forecaster, hourly, turnos),
+        "nivel_servicio_lineal": _simulated_levels(forecaster, hourly, lineal)
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--dias", type=int, default=30, help="Días del horizonte horario")
+    parser.add_argument("--nivel-servicio", type=float, default=config.STAFFING_SERVICE_LEVEL)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    for clave, valor in run(args.dias, args.nivel_servicio, args.repeticiones).items():
+        print(f"{clave}: {valor}")
@@ -0,0 +1,83 @@
+"""
+Benchmark de SymptomRouter: caso a caso (rank) vs lote vectorizado (route_batch)
+
+Uso:
+    python -m benchmarks.symptom_routing --casos 20000
+"""
+import argparse
+import time
+from modules.symptom_router import SymptomRouter
+
+
+PROTOCOLOS = {
+    "Dolor Torácico": {
+        "signos_alarma": ["dolor opresivo", "diaforesis", "palidez", "irradiación a brazo izquierdo"],
+        "criterios_triage": ["01 - Dolor torácico con inestabilidad hemodinámica"],
+        "preguntas": ["¿El dolor se irradia?", "¿Tiene antecedentes coronarios?"]
+    },
+    "Dolor Abdominal": {
+        "signos_alarma": ["abdomen en tabla", "vómito con sangre", "melenas"],
+        "criterios_triage": ["02 - Dolor abdominal intenso con vómito persistente"],
+        "preguntas": ["¿Dónde se localiza el dolor?", "¿Ha tenido fiebre o diarrea?"]
+    },
+    "Disnea": {
+        "signos_alarma": ["cianosis", "tiraje", "saturación baja", "dificultad respiratoria"],
+        "criterios_triage": ["01 - Disnea con saturación menor a 90%"],
+        "preguntas": ["¿La falta de aire es en reposo?", "¿Tiene asma o EPOC?"]
+    },
+    "Trauma": {
+        "signos_alarma": ["deformidad", "sangrado activo", "pérdida de conciencia"],
+        "criterios_triage": ["02 - Caída de altura con pérdida de conciencia"],
+        "preguntas": ["¿Cómo ocurrió la lesión?", "¿Golpe en la cabeza?"]
+    },
+    "Fiebre": {
+        "signos_alarma": ["rigidez de nuca", "petequias", "convulsión"],
+        "criterios_triage": ["02 - Fiebre con petequias"],
+        "preguntas": ["¿Desde cuándo tiene fiebre?", "¿Temperatura máxima?"]
+    }
+}
+
+CASOS_BASE = [
+    ("Dolor Torácico", "Dolor en el pecho opresivo con sudoración y palidez"),
+    ("Dolor Abdominal", "Epigastralgia de 2 horas con vómitos y diarrea"),
+    ("Disnea", "Falta de aire en reposo, labios cianóticos, saturacion 88%"),
+    ("Trauma", "Caída desde su altura con deformidad en muñeca izquierda"),
+    ("Fiebre", "Fiebre de 39 grados con rigidez de nuca"),
+]
+
+
+def run(n_casos: int) -> dict:
+    """
+    Mide el throughput de ambos caminos y la concordancia con la etiqueta esperada
+
+    Returns:
+        Diccionario con casos por segundo y aciertos
+    """
+    router = SymptomRouter().fit(PROTOCOLOS)
+    casos = [f"Paciente {i}: {CASOS_BASE[i % len(CASOS_BASE)][1]}" for i in range(n_casos)]
+    esperados = [CASOS_BASE[i % len(CASOS_BASE)][0] for i in range(n_casos)]
+
+    n_individual = min(n_casos, 1000)
+    inicio = time.perf_counter()
+    for caso in casos[:n_individual]:
+        router.rank(caso, top_k=1)
+    individual_s = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    sugeridos, _ = router.route_batch(casos)
+    lote_s = time.perf_counter() - inicio
+
+    return {
+        "casos_por_segundo_individual": round(n_individual / individual_s, 1),
+        "casos_por_segundo_lote": round(n_casos / lote_s, 1),
+        "aciertos_lote": round(sum(s == e for s, e in zip(sugeridos, esperados)) / n_casos, 3)
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--casos", type=int, default=20000)
+    args = parser.parse_args()
+
+    for clave, valor in run(args.casos).items():
+        print(f"{clave}: {valor}")
@@ -0,0 +1,89 @@
+"""
+Recarga de la serie histórica: CSV por bloques vs almacén columnar
+Ingiere un CSV sintético de consultas en un VisitStore temporal (Parquet por
+sede/mes y conteos horarios en Arrow) y compara el tiempo de volver a cargar la
+serie desde el CSV con el de leer los conteos materializados con memory-map.
+
+Uso:
+    python -m benchmarks.visit_store --filas 10000000
+"""
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+import time
+import pandas as pd
+from benchmarks.historical_ingest import generate_csv
+from modules.forecaster import Forecaster
+from modules.visit_store import VisitStore
+
+
+def _medir(func, repeticiones: int) -> tuple:
+    """Mediana en ms y último resultado"""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = func()
+        tiempos.append(time.perf_counter() - inicio)
+    return round(statistics.median(tiempos) * 1000, 1), resultado
+
+
+def run(filas: int, chunk_size: int, repeticiones: int = 3, path: str = None) -> dict:
+    """
+    Genera el CSV (si no existe), lo ingiere y mide cada forma de recarga
+
+    Returns:
+        Diccionario con tiempos de ingesta y recarga (ms) y si las series coinciden
+    """
+    path = path or os.path.join(tempfile.gettempdir(), f"historico_{filas}.csv")
+    if not os.path.exists(path):
+        generate_csv(path, filas)
+    store_dir = tempfile.mkdtemp(prefix="visit_store_")
+    try:
+        store = VisitStore(store_dir)
+        inicio = time.perf_counter()
+        store.ingest(path, chunk_size=chunk_size)
+        resultados = {
+            "archivo_mb": round(os.path.getsize(path) / 2**20),
+            "ingesta_ms": round((time.perf_counter() - inicio) * 1000, 1)
+        }
+
+        csv_ms, desde_csv = _medir(
+            lambda: Forecaster(model_store=None).load_historical_data(path, chunk_size=chunk_size),
+            repeticiones
+        )
+        almacen_ms, desde_almacen = _medir(
+            lambda: Forecaster(model_store=None, visit_store=store).load_from_store(),
+            repeticiones
+        )
+        reingesta_ms, _ = _medir(lambda: store.ingest(path, chunk_size=chunk_size), repeticiones)
+        try:
+            pd.testing.assert_frame_equal(desde_csv, desde_almacen, check_dtype=False)
+            iguales = True
+        except AssertionError:
+            iguales = False
+
+        resultados.update({
+            "recarga_csv_ms": csv_ms,
+            "recarga_almacen_ms": almacen_ms,
+            "reingesta_duplicada_ms": reingesta_ms,
+            "aceleracion": round(csv_ms / almacen_ms, 1),
+            "misma_serie": iguales,
+            "almacen": store.stats()
+        })
+        return resultados
+    finally:
+        shutil.rmtree(store_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--filas", type=int, default=10_000_000)
+    parser.add_argument("--bloque", type=int, default=500_000, help="Filas por bloque")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--csv", default=None, help="Ruta del CSV (se genera si no existe)")
+    args = parser.parse_args()
+
+    for clave, valor in run(args.filas, args.bloque, args.repeticiones, args.csv).items():
+        print(f"{clave}: {valor}")
@@ -21,6 +21,35 @@ GCP_PROJECT_ID = os.getenv("GCP_PROJECT_ID", "")
 GCP_LOCATION = os.getenv("GCP_LOCATION", "us-central1")
 VERTEX_AI_MODEL = "medgemma-1.0"  # Modelo Med-Gemma en Vertex AI
 
+# Modelo stub local (benchmarks y pruebas sin red)
+USE_STUB_MODEL = os.getenv("USE_STUB_MODEL", "false").lower() == "true"
+STUB_MODEL_LATENCY_S = float(os.getenv("STUB_MODEL_LATENCY_S", "0.5"))
+
+# Backend del modelo de lenguaje: gemini | vertex | openai | stub
+LLM_BACKEND = os.getenv(
+    "LLM_BACKEND",
+    "stub" if USE_STUB_MODEL else "vertex" if USE_VERTEX_AI else "gemini"
+).lower()
+
+# Backend alternativo cuando el principal falla (vacío = sin alternativa)
+LLM_FALLBACK_BACKEND = os.getenv("LLM_FALLBACK_BACKEND", "").lower()
+
+# Endpoint compatible con OpenAI (vLLM, llama.cpp server, Ollama...)
+OPENAI_COMPAT_BASE_URL = os.getenv("OPENAI_COMPAT_BASE_URL", "http://localhost:8080/v1")
+OPENAI_COMPAT_MODEL = os.getenv("OPENAI_COMPAT_MODEL", "local")
+OPENAI_COMPAT_API_KEY = os.getenv("OPENAI_COMPAT_API_KEY", "")
+
+# Timeout por solicitud y solicitudes simultáneas por backend
+LLM_BACKEND_SETTINGS = {
+    "gemini": {"timeout_s": 30, "max_concurrency": 8},
+    "vertex": {"timeout_s": 30, "max_concurrency": 8},
+    "openai": {"timeout_s": 60, "max_concurrency": 4},
+    "stub": {"timeout_s": 30, "max_concurrency": 64}
+}
+
+# Conexiones keep-alive compartidas por los backends HTTP
+LLM_HTTP_POOL_SIZE = 16
+
 # Weather API
 WEATHER_API_KEY = os.getenv("WEATHER_API_KEY", "")
 WEATHER_API_URL = "https://api.openweathermap.org/data/2.5/forecast"
@@ -58,17 +87,87 @@ TRIAGE_LEVELS = {
 }
 
 # Signos de alarma obligatorios a detectar
+# (la detección normaliza tildes, no hace falta listar variantes sin tilde)
 SIGNOS_ALARMA = [
     "palidez",
     "diaforesis",
     "náuseas",
-    "nauseas",  # Variante sin tilde
     "vómito",
-    "vomito",  # Variante sin tilde
     "epigastralgia",
     "disnea"
 ]
 
+# Formas alternativas de cada signo (los plurales se reconocen solos)
+SIGNOS_ALARMA_VARIANTES = {
+    "pálido": "palidez",
+    "pálida": "palidez",
+    "diaforético": "diaforesis",
+    "diaforética": "diaforesis",
+    "sudoración profusa": "diaforesis",
+    "nauseoso": "náuseas",
+    "nauseosa": "náuseas",
+    "emesis": "vómito",
+    "vomita": "vómito",
+    "vomitando": "vómito",
+    "dolor epigástrico": "epigastralgia",
+    "disneico": "disnea",
+    "disneica": "disnea",
+    "dificultad respiratoria": "disnea"
+}
+
+# Clasificación en batch (solicitudes concurrentes al modelo)
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "8"))
+BATCH_REQUEST_TIMEOUT_S = float(os.getenv("BATCH_REQUEST_TIMEOUT_S", "30"))
+BATCH_MAX_RETRIES = int(os.getenv("BATCH_MAX_RETRIES", "2"))
+BATCH_BACKOFF_BASE_S = 0.5  # Base del backoff exponencial con jitter
+
+# Resiliencia de las llamadas al modelo (plazo, circuit breaker y hedging)
+TRIAGE_RESILIENCE_ENABLED = os.getenv("TRIAGE_RESILIENCE_ENABLED", "true").lower() == "true"
+TRIAGE_DEADLINE_S = float(os.getenv("TRIAGE_DEADLINE_S", "20"))
+CIRCUIT_BREAKER_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_BREAKER_FAILURE_THRESHOLD", "5"))
+CIRCUIT_BREAKER_RESET_TIMEOUT_S = float(os.getenv("CIRCUIT_BREAKER_RESET_TIMEOUT_S", "30"))
+# Duplicar una llamada cuando supera el percentil de latencia observado
+HEDGE_ENABLED = os.getenv("HEDGE_ENABLED", "true").lower() == "true"
+HEDGE_PERCENTILE = 95
+HEDGE_MIN_SAMPLES = 20  # Latencias necesarias antes de duplicar
+HEDGE_MIN_DELAY_S = 0.5
+# Clasificación local (reglas y signos de alarma) cuando el modelo no responde
+TRIAGE_LOCAL_FALLBACK_ENABLED = os.getenv("TRIAGE_LOCAL_FALLBACK_ENABLED", "true").lower() == "true"
+
+# Precarga de recursos pesados (modelo, snapshot de protocolos, Prophet) una vez por proceso
+PRELOAD_RESOURCES = os.getenv("PRELOAD_RESOURCES", "true").lower() == "true"
+
+# Métricas de latencia y throughput (formato de texto de Prometheus)
+METRICS_PROMETHEUS_PORT = int(os.getenv("METRICS_PROMETHEUS_PORT", "0"))  # 0 = sin endpoint /metrics
+METRICS_EXPORT_PATH = os.getenv("METRICS_EXPORT_PATH", "reportes/metrics.prom")
+METRICS_EXPORT_INTERVAL_S = float(os.getenv("METRICS_EXPORT_INTERVAL_S", "0"))  # 0 = sin volcado periódico
+
+# Caché de respuestas del modelo (clave: hash del prompt + nombre del modelo)
+TRIAGE_CACHE_ENABLED = os.getenv("TRIAGE_CACHE_ENABLED", "true").lower() == "true"
+TRIAGE_CACHE_MAX_ENTRIES = int(os.getenv("TRIAGE_CACHE_MAX_ENTRIES", "1024"))
+TRIAGE_CACHE_TTL_S = float(os.getenv("TRIAGE_CACHE_TTL_S", "3600"))
+TRIAGE_CACHE_DB_PATH = os.getenv("TRIAGE_CACHE_DB_PATH", "")  # Vacío = solo memoria
+
+# Formato de respuesta solicitado al modelo: "texto" (default) o "json"
+TRIAGE_RESPONSE_FORMAT = os.getenv("TRIAGE_RESPONSE_FORMAT", "texto").lower()
+
+# Presupuesto de tokens (estimados localmente) para las filas del protocolo en el prompt
+TRIAGE_PROMPT_MAX_PROTOCOL_TOKENS = int(os.getenv("TRIAGE_PROMPT_MAX_PROTOCOL_TOKENS", "600"))
+TRIAGE_PROMPT_MAX_ROW_CHARS = 400
+
+# Mostrar la respuesta del modelo a medida que se genera (Tab 1)
+TRIAGE_STREAMING_ENABLED = os.getenv("TRIAGE_STREAMING_ENABLED", "true").lower() == "true"
+
+# Fast-path de reglas locales: casos evidentes se clasifican sin llamar al LLM
+TRIAGE_FAST_PATH_ENABLED = os.getenv("TRIAGE_FAST_PATH_ENABLED", "true").lower() == "true"
+TRIAGE_FAST_PATH_MIN_CONFIDENCE = float(os.getenv("TRIAGE_FAST_PATH_MIN_CONFIDENCE", "0.9"))
+# Protocolos compilados en el motor compartido (signos de alarma y reglas):
+# los menos usados se descartan al superar el límite
+PROTOCOL_COMPILED_MAX_ENTRIES = int(os.getenv("PROTOCOL_COMPILED_MAX_ENTRIES", "256"))
+
+# Palabras (sin tildes) en el nombre del protocolo que lo marcan como cardiovascular
+PROTOCOLOS_CARDIOVASCULARES = ["toracico", "torax", "pecho", "coronari"]
+
 # ============================================================================
 # CONFIGURACIÓN DE PROTOCOLOS
 # ============================================================================
@@ -80,6 +179,20 @@ PROTOCOL_COLUMNS = {
     "criterio_triage": ["criterio", "criterios", "triage", "nivel"]
 }
 
+# Snapshots compilados de protocolos (python -m modules.protocol_store)
+PROTOCOL_STORE_DIR = os.getenv("PROTOCOL_STORE_DIR", "protocol_store")
+
+# Caché en disco de protocolos parseados (vacío = desactivada)
+PROTOCOL_CACHE_DIR = os.getenv("PROTOCOL_CACHE_DIR", ".cache/protocols")
+
+# Sugerencia automática de protocolo a partir del caso clínico
+SYMPTOM_ROUTER_ENABLED = os.getenv("SYMPTOM_ROUTER_ENABLED", "true").lower() == "true"
+SYMPTOM_ROUTER_NGRAM_RANGE = (3, 5)
+SYMPTOM_ROUTER_MIN_SCORE = float(os.getenv("SYMPTOM_ROUTER_MIN_SCORE", "0.05"))
+SYMPTOM_ROUTER_TOP_K = 3
+# CSV de casos previos (caso_clinico, sintoma_principal) para entrenar el router
+SYMPTOM_ROUTER_CASES_PATH = os.getenv("SYMPTOM_ROUTER_CASES_PATH", "")
+
 # ============================================================================
 # CONFIGURACIÓN DE FORECASTING
 # ============================================================================
@@ -89,17 +202,86 @@ PROPHET_PARAMS = {
     "changepoint_prior_scale": 0.05,
     "seasonality_prior_scale": 10,
     "seasonality_mode": "multiplicative",
-    "daily_seasonality": True,
+    "daily_seasonality": False,  # Se entrena con totales diarios: no hay curva intradía que ajustar
     "weekly_seasonality": True,
     "yearly_seasonality": True
 }
 
+# Prophet sobre conteos horarios (modo de predicción horaria)
+PROPHET_HOURLY_PARAMS = {
+    **PROPHET_PARAMS,
+    "daily_seasonality": True
+}
+
+# Backend de predicción: "prophet" (alta precisión), "ridge" (Fourier + ridge),
+# "naive_estacional" u "holt_winters" (rápidos, solo NumPy)
+FORECAST_BACKEND = os.getenv("FORECAST_BACKEND", "prophet").lower()
+
+# Predicción horaria (curvas de llegada por hora y personal por turno): ridge
+# ajusta varios años de horas en milisegundos; Prophet usa solo los últimos
+# FORECAST_HOURLY_HISTORY_DAYS días para acotar el tiempo de ajuste
+FORECAST_HOURLY_BACKEND = os.getenv("FORECAST_HOURLY_BACKEND", "ridge").lower()
+FORECAST_HOURLY_HISTORY_DAYS = int(os.getenv("FORECAST_HOURLY_HISTORY_DAYS", "730"))
+
+# Parámetros del backend ridge con términos de Fourier
+RIDGE_PARAMS = {
+    "weekly_order": 3,
+    "subdaily_weekly_order": 42,  # Series horarias: curva intradía por día de la semana
+    "yearly_order": 10,
+    "alpha": 1.0,
+    "interval_width": 0.8  # Igual al default de Prophet
+}
+
+# Parámetros del backend Holt-Winters aditivo
+HOLT_WINTERS_PARAMS = {
+    "alpha": 0.3,
+    "beta": 0.01,
+    "gamma": 0.2,
+    "season_length": 7,
+    "interval_width": 0.8
+}
+
+# Almacén de modelos entrenados (reutilización y warm-start)
+FORECAST_MODEL_STORE_ENABLED = os.getenv("FORECAST_MODEL_STORE_ENABLED", "true").lower() == "true"
+FORECAST_MODEL_STORE_DIR = os.getenv("FORECAST_MODEL_STORE_DIR", ".cache/models")
+
+# Procesos para la predicción por nivel de triage/sede (0 = todos los núcleos)
+FORECAST_MAX_WORKERS = int(os.getenv("FORECAST_MAX_WORKERS", "0"))
+
+# Columna opcional del CSV histórico que identifica la sede
+SITE_COLUMN = "sede"
+
+# Lectura por bloques del CSV histórico (memoria acotada por días, no por consultas)
+HISTORICAL_CSV_CHUNK_ROWS = int(os.getenv("HISTORICAL_CSV_CHUNK_ROWS", "500000"))
+HISTORICAL_DATETIME_FORMAT = os.getenv("HISTORICAL_DATETIME_FORMAT", "%Y-%m-%d %H:%M:%S")
+# Zona horaria de las sedes: las fechas con desfase horario se convierten a ella
+# y las horas, turnos y días se agrupan según su reloj local
+HISTORICAL_TIMEZONE = os.getenv("HISTORICAL_TIMEZONE", "America/Bogota")
+
+# Almacén columnar de consultas (Parquet por sede/mes y conteos horarios en Arrow)
+VISIT_STORE_ENABLED = os.getenv("VISIT_STORE_ENABLED", "true").lower() == "true"
+VISIT_STORE_DIR = os.getenv("VISIT_STORE_DIR", ".cache/visitas")
+# Predecir con todos los archivos ingeridos (de todas las sesiones) en lugar de
+# solo con el CSV cargado, y mostrar el botón "Cargar desde Almacén"
+VISIT_STORE_ACCUMULATE = os.getenv("VISIT_STORE_ACCUMULATE", "false").lower() == "true"
+
 # Horizonte de predicción por defecto (días)
 DEFAULT_FORECAST_HORIZON = 7
 
 # Horas de trabajo por turno médico
 HORAS_POR_TURNO = 8
 
+# Dimensionamiento de personal con teoría de colas (Erlang C por hora y nivel):
+# fracción de pacientes que debe empezar a ser atendida dentro del tiempo
+# objetivo de su nivel (TRIAGE_LEVELS["tiempo_atencion_min"])
+STAFFING_SERVICE_LEVEL = float(os.getenv("STAFFING_SERVICE_LEVEL", "0.8"))
+# Duración media de la atención médica por nivel (minutos)
+STAFFING_SERVICE_MINUTES = {"01": 60, "02": 60, "03": 20, "07": 20}
+# Médicos mínimos de guardia en cualquier hora
+STAFFING_MIN_PHYSICIANS = int(os.getenv("STAFFING_MIN_PHYSICIANS", "1"))
+# Corridas de la simulación de eventos discretos que valida el plan
+STAFFING_SIMULATION_REPLICAS = int(os.getenv("STAFFING_SIMULATION_REPLICAS", "5"))
+
 # ============================================================================
 # CONFIGURACIÓN DE LA APLICACIÓN
 # ============================================================================
@@ -152,10 +334,19 @@ Signos de Alarma Detectados: [lista]
 Razonamiento: [explicación médica detallada]
 """
 
+# Instrucción adicional cuando TRIAGE_RESPONSE_FORMAT = "json"
+TRIAGE_JSON_FORMAT_PROMPT = """FORMATO DE RESPUESTA (JSON):
+Ignora el formato anterior y responde únicamente con un objeto JSON con las claves:
+{"nivel_triage": "01|02|03|07", "signos_alarma": ["..."], "razonamiento": "..."}
+"""
+
 def get_triage_prompt(caso_clinico: str, protocolo: dict, sintoma_principal: str) -> str:
     """
     Genera el prompt específico para clasificación de triage
     
+    Solo se incluyen las filas del protocolo relacionadas con el caso, dentro de
+    TRIAGE_PROMPT_MAX_PROTOCOL_TOKENS (ver modules.prompt_builder).
+    
     Args:
         caso_clinico: Descripción del caso del paciente
         protocolo: Diccionario con el protocolo médico relevante
@@ -164,16 +355,9 @@ def get_triage_prompt(caso_clinico: str, protocolo: dict, sintoma_principal: str
     Returns:
         Prompt formateado para Gemini
     """
-    return f"""{TRIAGE_SYSTEM_PROMPT}
-
-PROTOCOLO APLICABLE: {sintoma_principal}
-{protocolo.get('contenido', 'No disponible')}
-
-CASO CLÍNICO:
-{caso_clinico}
-
-Por favor, clasifica este caso siguiendo el formato especificado.
-"""
+    from modules.prompt_builder import PromptBuilder
+    
+    return PromptBuilder().build(caso_clinico, protocolo, sintoma_principal)
 
 # ============================================================================
 # VALIDACIÓN DE CONFIGURACIÓN
@@ -188,10 +372,10 @@ def validate_config() -> tuple[bool, list[str]]:
     """
     errors = []
     
-    if not GEMINI_API_KEY and not USE_VERTEX_AI:
+    if LLM_BACKEND == "gemini" and not GEMINI_API_KEY:
         errors.append("GEMINI_API_KEY no está configurada")
     
-    if USE_VERTEX_AI and not GCP_PROJECT_ID:
+    if LLM_BACKEND == "vertex" and not GCP_PROJECT_ID:
         errors.append("GCP_PROJECT_ID requerido para Vertex AI")
     
     return len(errors) == 0, errors
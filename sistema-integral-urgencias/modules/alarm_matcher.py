@@ -0,0 +1,309 @@
+"""
+Detector de signos de alarma en una sola pasada
+Trie de palabras (Aho-Corasick a nivel de token) con normalización de tildes
+y plurales, límites de palabra y manejo de negaciones ("niega disnea")
+"""
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+import config
+
+
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+_TERMINAL = "\0"
+
+# Palabras que niegan el signo que les sigue
+NEGATION_CUES = {"no", "niega", "niegan", "sin", "ausencia", "negativo", "negativa", "descarta", "ni"}
+# Palabras que pueden ir entre la negación y el signo sin cambiar a qué se
+# aplica ("no presenta disnea", "sin datos de la disnea", "sin vómito o diarrea").
+# Cualquier otra palabra ("sin mejoría de la disnea", "no tiene antecedentes
+# relevantes, disnea") cierra el alcance: ante la duda se reporta el signo
+# (sobre-triage antes que omitirlo)
+NEGATION_FILLERS = {
+    "el", "la", "los", "las", "lo", "un", "una", "unos", "unas", "de", "del", "al", "o",
+    "ningun", "ninguno", "ninguna", "nunca", "tampoco", "actualmente", "aparentemente",
+    "se", "le", "ha", "han", "presenta", "presentan", "presento", "refiere", "refieren",
+    "refirio", "tiene", "hay", "muestra", "aqueja", "signos", "signo", "datos", "evidencia"
+}
+# Tokens que cierran el alcance de una negación aunque le siga un signo
+NEGATION_BREAKS = {".", ",", ";", ":", "y", "pero", "aunque", "con"}
+NEGATION_WINDOW = 4  # Máximo de palabras intermedias entre la negación y el signo
+
+
+def fold_accents(texto: str) -> str:
+    """
+    Pasa a minúsculas y elimina tildes y diacríticos
+
+    Args:
+        texto: Texto original
+
+    Returns:
+        Texto normalizado ("Vómito" -> "vomito")
+    """
+    descompuesto = unicodedata.normalize("NFKD", texto.lower())
+    return "".join(c for c in descompuesto if not unicodedata.combining(c))
+
+
+def fold_plural(token: str) -> str:
+    """
+    Reduce un token normalizado a su forma singular aproximada
+
+    Quita la -s final y, si queda una -e tras l, r, n, d, z o j, también la
+    -e ("dolores" -> "dolor", "vomitos" -> "vomito", "voces" -> "voz"). Se aplica
+    igual a los términos y al texto, así que basta con que ambos coincidan.
+
+    Args:
+        token: Token de tokenize()
+
+    Returns:
+        Token sin la marca de plural
+    """
+    if len(token) <= 3 or not token.isalpha():
+        return token
+    if token.endswith("s"):
+        token = token[:-1]
+    if len(token) > 3 and token.endswith("e"):
+        if token[-2] in "lrndzj":
+            token = token[:-1]
+        elif token.endswith("ce"):
+            token = token[:-2] + "z"
+    return token
+
+
+def tokenize(texto: str) -> List[str]:
+    """
+    Normaliza y separa el texto en palabras y signos de puntuación
+
+    Args:
+        texto: Texto original
+
+    Returns:
+        Lista de tokens normalizados
+    """
+    return _TOKEN_PATTERN.findall(fold_accents(texto))
+
+
+class AlarmMatch:
+    """Coincidencia de un signo de alarma en el texto"""
+
+    __slots__ = ("signo", "fuente", "inicio", "fin", "negado")
+
+    def __init__(self, signo: str, fuente: Optional[Hashable], inicio: int, fin: int, negado: bool):
+        self.signo = signo
+        self.fuente = fuente
+        self.inicio = inicio
+        self.fin = fin
+        self.negado = negado
+
+    def __repr__(self) -> str:
+        estado = "negado" if self.negado else "presente"
+        return f"AlarmMatch({self.signo!r}, fuente={self.fuente!r}, {estado})"
+
+
+class AlarmSignMatcher:
+    """Autómata de términos de alarma construido una sola vez"""
+
+    def __init__(
+        self,
+        terminos: Iterable[str] = (),
+        variantes: Optional[Dict[str, str]] = None,
+        max_protocolos: Optional[int] = None
+    ):
+        """
+        Args:
+            terminos: Signos de alarma globales (config.SIGNOS_ALARMA)
+            variantes: Formas alternativas {variante: signo} (config.SIGNOS_ALARMA_VARIANTES)
+            max_protocolos: Protocolos registrados como máximo (default: config.PROTOCOL_COMPILED_MAX_ENTRIES)
+        """
+        self._trie: Dict = {}
+        self._registered = OrderedDict()  # fuente -> signos, del menos al más usado
+        self.max_protocolos = max_protocolos or config.PROTOCOL_COMPILED_MAX_ENTRIES
+        self._lock = threading.Lock()
+        self.total_terminos = 0
+        self.add_terms(terminos)
+        self.add_variants(variantes or {})
+
+    def add_terms(self, terminos: Iterable[str], fuente: Optional[Hashable] = None):
+        """
+        Agrega términos al autómata
+
+        Args:
+            terminos: Términos a detectar (pueden tener varias palabras)
+            fuente: Protocolo al que pertenecen (None = globales)
+        """
+        with self._lock:
+            for termino in terminos:
+                termino = str(termino).strip()
+                self._add(termino, termino[:1].upper() + termino[1:].lower(), fuente)
+
+    def add_variants(self, variantes: Dict[str, str], fuente: Optional[Hashable] = None):
+        """
+        Agrega formas alternativas que se reportan con la etiqueta de su signo
+
+        Args:
+            variantes: {variante: etiqueta} ("pálido": "palidez", "disneico": "disnea")
+            fuente: Protocolo al que pertenecen (None = globales)
+        """
+        with self._lock:
+            for variante, signo in variantes.items():
+                signo = str(signo).strip()
+                self._add(str(variante).strip(), signo[:1].upper() + signo[1:].lower(), fuente)
+
+    def _add(self, termino: str, etiqueta: str, fuente: Optional[Hashable]):
+        """
+        Inserta un término (en singular) con su etiqueta; requiere el lock tomado
+
+        Copia los nodos del camino y publica la raíz nueva al final: find() lee
+        sin lock y nunca ve un nodo a medio modificar.
+        """
+        palabras = [fold_plural(t) for t in tokenize(termino) if t[0].isalnum()]
+        if not palabras:
+            return
+        raiz = dict(self._trie)
+        node = raiz
+        for palabra in palabras:
+            hijo = dict(node.get(palabra, {}))
+            node[palabra] = hijo
+            node = hijo
+        etiquetas = node.get(_TERMINAL, {})
+        if fuente in etiquetas:
+            return
+        node[_TERMINAL] = {**etiquetas, fuente: etiqueta}
+        self.total_terminos += 1
+        self._trie = raiz
+
+    def _remove(self, termino: str, fuente: Hashable):
+        """Quita un término de una fuente y poda las ramas vacías (copiando el camino); requiere el lock tomado"""
+        palabras = [fold_plural(t) for t in tokenize(termino) if t[0].isalnum()]
+        camino = [self._trie]
+        for palabra in palabras:
+            siguiente = camino[-1].get(palabra)
+            if siguiente is None:
+                return
+            camino.append(siguiente)
+        if fuente not in camino[-1].get(_TERMINAL, {}):
+            return
+        node = dict(camino[-1])
+        etiquetas = {f: e for f, e in node.pop(_TERMINAL).items() if f != fuente}
+        if etiquetas:
+            node[_TERMINAL] = etiquetas
+        for palabra, padre in zip(reversed(palabras), reversed(camino[:-1])):
+            padre = dict(padre)
+            if node:
+                padre[palabra] = node
+            else:
+                del padre[palabra]
+            node = padre
+        self.total_terminos -= 1
+        self._trie = node
+
+    def register_protocol(self, protocolo: Dict) -> Optional[Tuple]:
+        """
+        Agrega los signos_alarma de un protocolo (una sola vez por contenido)
+
+        La fuente incluye los signos: si dos sesiones cargan versiones distintas
+        del mismo protocolo, cada una detecta solo los signos de la suya. Al
+        superar max_protocolos se quitan los signos del protocolo menos usado
+        (se vuelven a agregar si alguna sesión lo usa otra vez).
+
+        Args:
+            protocolo: Protocolo de ProtocolLoader
+
+        Returns:
+            Fuente a pasar a find/detect (None si el protocolo no tiene signos)
+        """
+        sintoma = protocolo.get("sintoma")
+        signos = tuple(str(s) for s in protocolo.get("signos_alarma", []))
+        if sintoma is None or not signos:
+            return None
+        fuente = (sintoma, signos)
+        with self._lock:
+            if fuente in self._registered:
+                self._registered.move_to_end(fuente)
+                return fuente
+            for signo in signos:
+                signo = signo.strip()
+                self._add(signo, signo[:1].upper() + signo[1:].lower(), fuente)
+            self._registered[fuente] = signos
+            while len(self._registered) > self.max_protocolos:
+                antigua, signos_antiguos = self._registered.popitem(last=False)
+                for signo in signos_antiguos:
+                    self._remove(signo.strip(), antigua)
+        return fuente
+
+    def registered_protocols(self) -> int:
+        """Cantidad de protocolos con signos registrados"""
+        return len(self._registered)
+
+    def find(self, texto: str, fuente: Optional[Hashable] = None) -> List[AlarmMatch]:
+        """
+        Busca todos los términos en una pasada (coincidencia más larga por posición)
+
+        Args:
+            texto: Texto del caso clínico
+            fuente: Protocolo (register_protocol) cuyos términos se incluyen además de los globales
+
+        Returns:
+            Lista de coincidencias, incluidas las negadas
+        """
+        tokens = tokenize(texto)
+        claves = [fold_plural(t) for t in tokens]
+        # Versión del trie para toda la búsqueda: las modificaciones publican otra raíz
+        raiz = self._trie
+        matches = []
+        negacion_restante = 0
+        i = 0
+        n = len(tokens)
+
+        while i < n:
+            token = tokens[i]
+
+            # Seguir la coincidencia más larga que arranca en i
+            node = raiz
+            mejor = None
+            j = i
+            while j < n and claves[j] in node:
+                node = node[claves[j]]
+                j += 1
+                etiquetas = node.get(_TERMINAL)
+                if etiquetas:
+                    etiqueta_fuente = fuente if fuente in etiquetas else None
+                    if etiqueta_fuente in etiquetas:
+                        mejor = (j, etiquetas[etiqueta_fuente], etiqueta_fuente)
+
+            if mejor is not None:
+                fin, signo, origen = mejor
+                # La negación sigue para los signos coordinados ("sin vómito o diarrea")
+                matches.append(AlarmMatch(signo, origen, i, fin, negacion_restante > 0))
+                i = fin
+                continue
+
+            if token in NEGATION_CUES:
+                negacion_restante = NEGATION_WINDOW
+            elif token in NEGATION_BREAKS:
+                negacion_restante = 0
+            elif negacion_restante > 0 and token[0].isalnum():
+                # Solo artículos, adverbios y verbos de presentación mantienen la negación
+                negacion_restante = negacion_restante - 1 if token in NEGATION_FILLERS else 0
+            i += 1
+
+        return matches
+
+    def detect(self, texto: str, fuente: Optional[Hashable] = None) -> List[str]:
+        """
+        Retorna los signos presentes (no negados), sin duplicados
+
+        Args:
+            texto: Texto del caso clínico
+            fuente: Protocolo (register_protocol) cuyos términos se incluyen
+
+        Returns:
+            Lista de signos en orden de aparición
+        """
+        signos = []
+        for match in self.find(texto, fuente):
+            if not match.negado and match.signo not in signos:
+                signos.append(match.signo)
+        return signos
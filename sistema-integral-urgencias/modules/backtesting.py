@@ -0,0 +1,211 @@
+"""
+Backtesting con origen móvil para los backends de predicción
+Mide precisión (MAE, MAPE, cobertura del intervalo) por horizonte y costo
+(tiempo de ajuste/predicción y pico de memoria propio y de procesos hijos) por backend y parámetros.
+"""
+import json
+import os
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+import config
+from modules.forecast_backends import FORECAST_BACKENDS
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def rolling_origin_folds(n_rows: int, horizon: int, n_folds: int, step: int, min_train: int) -> List[int]:
+    """
+    Calcula los puntos de corte (filas de entrenamiento) de cada fold
+
+    Args:
+        n_rows: Filas de la serie
+        horizon: Días predichos por fold
+        n_folds: Número máximo de folds
+        step: Días entre orígenes consecutivos
+        min_train: Mínimo de filas de entrenamiento
+
+    Returns:
+        Lista de cortes, del más antiguo al más reciente
+    """
+    cortes = [n_rows - horizon - i * step for i in range(n_folds)]
+    return sorted(c for c in cortes if c >= min_train)
+
+
+def _import_backends(nombres: List[str]):
+    """Importa en cada worker las dependencias diferidas, para que no cuenten en fit_s ni en memoria"""
+    if "prophet" in nombres:
+        import prophet  # noqa: F401
+
+
+def _fit_predict(backend_name: str, params: Optional[Dict], train: pd.DataFrame, horizon: int):
+    """Ajusta un backend nuevo y predice el horizonte; devuelve (predicción, fit_s, predict_s)"""
+    inicio = time.perf_counter()
+    backend = FORECAST_BACKENDS[backend_name](params=params)
+    backend.fit(train, [])
+    fit_s = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    pred = backend.predict(backend.make_future_dataframe(horizon).tail(horizon))
+    return pred, fit_s, time.perf_counter() - inicio
+
+
+def _children_peak_mb() -> float:
+    """Pico de memoria residente del mayor proceso hijo terminado (Stan en Prophet)"""
+    if resource is None:
+        return 0.0
+    pico = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # Linux informa KB y macOS bytes
+    return pico / 1e6 if sys.platform == "darwin" else pico / 1e3
+
+
+def _run_fold(args: Tuple) -> Dict:
+    """
+    Ajusta y evalúa un backend en un fold (ejecutado en un proceso del pool)
+
+    Los tiempos se miden sin tracemalloc, que ralentiza cada asignación y
+    penalizaría a los backends NumPy; la memoria se mide en un segundo ajuste.
+    tracemalloc solo ve el heap de Python, así que el pico de los procesos hijos
+    (el muestreador de Stan que lanza Prophet) se toma de getrusage. Un hijo
+    creado con fork hereda el RSS del padre (por ejemplo el `uname` que lanza
+    `import prophet`), así que solo se informa si algún hijo del fold supera
+    el pico previo.
+
+    Args:
+        args: Tupla (backend, params, serie con ds/y, corte, horizon)
+
+    Returns:
+        Diccionario con errores por horizonte y métricas de costo
+    """
+    backend_name, params, serie, corte, horizon = args
+    train = serie.iloc[:corte]
+    test = serie.iloc[corte:corte + horizon]
+
+    pico_hijos_previo = _children_peak_mb()
+    pred, fit_s, predict_s = _fit_predict(backend_name, params, train, horizon)
+
+    tracemalloc.start()
+    try:
+        _fit_predict(backend_name, params, train, horizon)
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    pico_hijos = _children_peak_mb()
+
+    y = test["y"].to_numpy(dtype=float)
+    yhat = pred["yhat"].to_numpy(dtype=float)
+    return {
+        "corte": str(train["ds"].iloc[-1].date()),
+        "error_abs": np.abs(y - yhat).tolist(),
+        "error_pct": np.where(y != 0, np.abs(y - yhat) / np.where(y != 0, y, 1), np.nan).tolist(),
+        "cubierto": ((y >= pred["yhat_lower"].to_numpy()) & (y <= pred["yhat_upper"].to_numpy())).tolist(),
+        "fit_s": fit_s,
+        "predict_s": predict_s,
+        "pico_memoria_mb": pico / 1e6,
+        "pico_memoria_hijos_mb": pico_hijos if pico_hijos > pico_hijos_previo else 0.0
+    }
+
+
+def backtest(
+    df: pd.DataFrame,
+    candidatos: List[Tuple[str, Optional[Dict]]],
+    target_col: str = "pacientes_total",
+    horizon: int = 7,
+    n_folds: int = 8,
+    step: int = 7,
+    min_train: int = 365,
+    max_workers: Optional[int] = None
+) -> Dict:
+    """
+    Ejecuta el backtesting de origen móvil para cada candidato
+
+    Args:
+        df: DataFrame diario con columnas fecha y target_col
+        candidatos: Lista de (nombre_backend, parámetros o None)
+        target_col: Columna a predecir
+        horizon: Días predichos por fold
+        n_folds: Número de orígenes
+        step: Días entre orígenes
+        min_train: Mínimo de días de entrenamiento
+        max_workers: Procesos en paralelo (default: config.FORECAST_MAX_WORKERS o núcleos)
+
+    Returns:
+        Reporte serializable en JSON con métricas por horizonte y costos
+    """
+    serie = pd.DataFrame({"ds": pd.to_datetime(df["fecha"]), "y": df[target_col]}).reset_index(drop=True)
+    cortes = rolling_origin_folds(len(serie), horizon, n_folds, step, min_train)
+    if not cortes:
+        raise ValueError("No hay suficientes datos para el backtesting")
+
+    tareas = [
+        (nombre, params, serie, corte, horizon)
+        for nombre, params in candidatos
+        for corte in cortes
+    ]
+    max_workers = max_workers or config.FORECAST_MAX_WORKERS or os.cpu_count()
+    # Un proceso por fold: RUSAGE_CHILDREN acumula el máximo de todos los hijos
+    # del proceso, así que un worker reutilizado mezclaría folds y backends
+    with ProcessPoolExecutor(
+        max_workers=min(max_workers, len(tareas)),
+        max_tasks_per_child=1,
+        initializer=_import_backends,
+        initargs=([nombre for nombre, _ in candidatos],)
+    ) as executor:
+        folds = list(executor.map(_run_fold, tareas))
+
+    resultados = []
+    for i, (nombre, params) in enumerate(candidatos):
+        folds_candidato = folds[i * len(cortes):(i + 1) * len(cortes)]
+        error_abs = np.array([f["error_abs"] for f in folds_candidato])
+        error_pct = np.array([f["error_pct"] for f in folds_candidato], dtype=float)
+        cubierto = np.array([f["cubierto"] for f in folds_candidato])
+
+        resultados.append({
+            "backend": nombre,
+            "params": params or {},
+            "por_horizonte": [
+                {
+                    "horizonte": h + 1,
+                    "mae": round(float(error_abs[:, h].mean()), 4),
+                    "mape": round(float(np.nanmean(error_pct[:, h]) * 100), 4),
+                    "cobertura": round(float(cubierto[:, h].mean()), 4)
+                }
+                for h in range(error_abs.shape[1])
+            ],
+            "mae": round(float(error_abs.mean()), 4),
+            "mape": round(float(np.nanmean(error_pct) * 100), 4),
+            "cobertura": round(float(cubierto.mean()), 4),
+            "fit_s_medio": round(float(np.mean([f["fit_s"] for f in folds_candidato])), 4),
+            "predict_s_medio": round(float(np.mean([f["predict_s"] for f in folds_candidato])), 4),
+            "pico_memoria_mb": round(float(max(f["pico_memoria_mb"] for f in folds_candidato)), 2),
+            "pico_memoria_hijos_mb": round(float(max(f["pico_memoria_hijos_mb"] for f in folds_candidato)), 2)
+        })
+
+    return {
+        "generado": datetime.now().isoformat(timespec="seconds"),
+        "target": target_col,
+        "horizonte": horizon,
+        "folds": [f["corte"] for f in folds[:len(cortes)]],
+        "resultados": resultados
+    }
+
+
+def save_report(report: Dict, path: str):
+    """
+    Guarda el reporte en JSON
+
+    Args:
+        report: Reporte de backtest()
+        path: Ruta de salida
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,332 @@
+"""
+Backends de predicción intercambiables para Forecaster
+Todos exponen la interfaz de Prophet usada por Forecaster (fit,
+make_future_dataframe, predict) y retornan ds, yhat, yhat_lower, yhat_upper.
+Aceptan series diarias u horarias: el paso se toma de las fechas del ajuste.
+Los backends NumPy no requieren Prophet ni Stan.
+"""
+from statistics import NormalDist
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+import config
+
+
+class ForecastBackend:
+    """Interfaz común de los backends de predicción"""
+
+    name = ""
+
+    def __init__(self):
+        self.history: Optional[pd.DataFrame] = None
+        self.regresores: List[str] = []
+        self.step = pd.Timedelta(days=1)
+
+    def _set_history(self, prophet_df: pd.DataFrame, regresores: List[str]):
+        """Guarda la historia y deduce el paso de la serie (día u hora)"""
+        self.history = prophet_df
+        self.regresores = regresores
+        pasos = prophet_df["ds"].diff().dropna()
+        self.step = pasos.min() if not pasos.empty else pd.Timedelta(days=1)
+
+    def _season_steps(self, dias: float) -> int:
+        """Largo de una temporada de `dias` días, en pasos de la serie"""
+        return max(int(round(pd.Timedelta(days=dias) / self.step)), 1)
+
+    def fit(self, prophet_df: pd.DataFrame, regresores: List[str]) -> "ForecastBackend":
+        """
+        Ajusta el modelo
+
+        Args:
+            prophet_df: DataFrame con columnas ds, y y los regresores
+            regresores: Nombres de las columnas de regresores
+
+        Returns:
+            El mismo backend ajustado
+        """
+        raise NotImplementedError
+
+    def make_future_dataframe(self, periods: int) -> pd.DataFrame:
+        """
+        Fechas históricas más los próximos pasos, como en Prophet
+
+        Args:
+            periods: Pasos (días u horas) a agregar
+
+        Returns:
+            DataFrame con la columna ds
+        """
+        last = self.history["ds"].max()
+        future = pd.date_range(start=last + self.step, periods=periods, freq=self.step)
+        return pd.DataFrame({"ds": pd.concat([self.history["ds"], pd.Series(future)], ignore_index=True)})
+
+    def predict(self, future: pd.DataFrame) -> pd.DataFrame:
+        """
+        Predice para las fechas de future
+
+        Args:
+            future: DataFrame con ds y los regresores
+
+        Returns:
+            DataFrame con ds, yhat, yhat_lower, yhat_upper
+        """
+        raise NotImplementedError
+
+    def _steps_ahead(self, ds: pd.Series) -> np.ndarray:
+        """Pasos posteriores al último dato histórico (0 para fechas históricas)"""
+        last = self.history["ds"].max()
+        return np.maximum(((ds - last) / self.step).to_numpy(), 0)
+
+    def _step_index(self, ds: pd.Series) -> np.ndarray:
+        """Posición de cada fecha desde el inicio de la historia, en pasos"""
+        return ((ds - self.history["ds"].min()) / self.step).to_numpy().astype(int)
+
+    @staticmethod
+    def _z(interval_width: float) -> float:
+        """Cuantil normal para un intervalo central de ancho interval_width"""
+        return NormalDist().inv_cdf(0.5 + interval_width / 2)
+
+
+class ProphetBackend(ForecastBackend):
+    """Prophet con reutilización de modelos del ModelStore (alta precisión)"""
+
+    name = "prophet"
+
+    def __init__(
+        self,
+        model_store=None,
+        target_col: str = "y",
+        params: Optional[Dict] = None,
+        serie: Optional[str] = None
+    ):
+        """
+        Args:
+            model_store: ModelStore para reutilizar/warm-start (opcional)
+            target_col: Columna objetivo (parte de la clave del modelo)
+            params: Parámetros de Prophet (default: config.PROPHET_PARAMS)
+            serie: Serie para el warm-start, por ejemplo "sede|nivel" (default: target_col)
+        """
+        super().__init__()
+        self.model_store = model_store
+        self.target_col = target_col
+        self.serie = serie or target_col
+        self.params = params or config.PROPHET_PARAMS
+        self.model = None
+
+    def fit(self, prophet_df: pd.DataFrame, regresores: List[str]) -> "ProphetBackend":
+        from prophet import Prophet
+
+        self._set_history(prophet_df, regresores)
+
+        # Reutilizar un modelo ya entrenado con los mismos datos y parámetros
+        params_key = None
+        if self.model_store is not None:
+            params_key = self.model_store.hash_params(self.params, regresores, self.target_col)
+            self.model = self.model_store.load(params_key, self.model_store.hash_data(prophet_df))
+            if self.model is not None:
+                return self
+
+        self.model = Prophet(**self.params)
+        for regresor in regresores:
+            self.model.add_regressor(regresor)
+
+        # Warm-start si solo se agregaron días nuevos
+        init = None
+        if self.model_store is not None:
+            init = self.model_store.find_warm_start(params_key, prophet_df, self.serie)
+
+        if init is not None:
+            self.model.fit(prophet_df, init=init)
+        else:
+            self.model.fit(prophet_df)
+
+        if self.model_store is not None:
+            self.model_store.save(params_key, prophet_df, self.model, self.serie)
+        return self
+
+    def make_future_dataframe(self, periods: int) -> pd.DataFrame:
+        return self.model.make_future_dataframe(periods=periods, freq=self.step)
+
+    def predict(self, future: pd.DataFrame) -> pd.DataFrame:
+        return self.model.predict(future)
+
+
+class FourierRidgeBackend(ForecastBackend):
+    """
+    Regresión ridge con tendencia lineal y términos de Fourier semanales y anuales
+
+    Con series horarias los términos semanales llegan a subdaily_weekly_order:
+    los armónicos semanales múltiplos de 7 son los diarios, así que la curva
+    intradía puede variar según el día de la semana.
+    """
+
+    name = "ridge"
+
+    def __init__(self, params: Optional[Dict] = None):
+        """
+        Args:
+            params: weekly_order, subdaily_weekly_order, yearly_order, alpha, interval_width
+                (default: config.RIDGE_PARAMS)
+        """
+        super().__init__()
+        self.params = {**config.RIDGE_PARAMS, **(params or {})}
+        self.coef = None
+        self.sigma = 0.0
+
+    def _features(self, df: pd.DataFrame) -> np.ndarray:
+        """Matriz de diseño: intercepto, tendencia, Fourier y regresores"""
+        dias = ((df["ds"] - self._t0) / pd.Timedelta(days=1)).to_numpy(dtype=float)
+        columnas = [np.ones_like(dias), dias / self._t_scale]
+        orden_semanal = (
+            self.params["weekly_order"] if self.step >= pd.Timedelta(days=1)
+            else self.params["subdaily_weekly_order"]
+        )
+        for periodo, orden in [(7.0, orden_semanal), (365.25, self.params["yearly_order"])]:
+            k = np.arange(1, orden + 1)
+            angulos = 2 * np.pi * np.outer(dias, k) / periodo
+            columnas.extend(np.sin(angulos).T)
+            columnas.extend(np.cos(angulos).T)
+        for regresor in self.regresores:
+            columnas.append(df[regresor].to_numpy(dtype=float))
+        return np.column_stack(columnas)
+
+    def fit(self, prophet_df: pd.DataFrame, regresores: List[str]) -> "FourierRidgeBackend":
+        self._set_history(prophet_df, regresores)
+        self._t0 = prophet_df["ds"].min()
+        self._t_scale = max((prophet_df["ds"].max() - self._t0) / pd.Timedelta(days=1), 1.0)
+
+        X = self._features(prophet_df)
+        y = prophet_df["y"].to_numpy(dtype=float)
+
+        # Ridge sin penalizar el intercepto
+        penalty = self.params["alpha"] * np.eye(X.shape[1])
+        penalty[0, 0] = 0.0
+        self.coef = np.linalg.solve(X.T @ X + penalty, X.T @ y)
+
+        residuos = y - X @ self.coef
+        self.sigma = float(np.std(residuos, ddof=min(X.shape[1], len(y) - 1)))
+        return self
+
+    def predict(self, future: pd.DataFrame) -> pd.DataFrame:
+        yhat = self._features(future) @ self.coef
+        margen = self._z(self.params["interval_width"]) * self.sigma
+        return pd.DataFrame({
+            "ds": future["ds"].to_numpy(),
+            "yhat": yhat,
+            "yhat_lower": yhat - margen,
+            "yhat_upper": yhat + margen
+        })
+
+
+class SeasonalNaiveBackend(ForecastBackend):
+    """Repite el valor del mismo día (u hora) de la semana anterior"""
+
+    name = "naive_estacional"
+
+    def __init__(self, params: Optional[Dict] = None):
+        """
+        Args:
+            params: season_length (días), interval_width
+        """
+        super().__init__()
+        self.params = {"season_length": 7, "interval_width": 0.8, **(params or {})}
+        self.season_length = self.params["season_length"]
+        self.interval_width = self.params["interval_width"]
+        self.sigma = 0.0
+
+    def fit(self, prophet_df: pd.DataFrame, regresores: List[str]) -> "SeasonalNaiveBackend":
+        self._set_history(prophet_df, regresores)
+        self.season_length = self._season_steps(self.params["season_length"])
+        y = prophet_df["y"].to_numpy(dtype=float)
+        m = self.season_length
+        self.sigma = float(np.std(y[m:] - y[:-m])) if len(y) > m else 0.0
+        self._y = y
+        return self
+
+    def predict(self, future: pd.DataFrame) -> pd.DataFrame:
+        y = self._y
+        m = self.season_length
+        n = len(y)
+        indices = self._step_index(future["ds"])
+
+        # Índice del último valor observado de la misma fase estacional
+        origen = np.where(indices < n, indices - m, n - m + (indices - n) % m)
+        origen = np.clip(origen, 0, n - 1)
+        yhat = y[origen]
+
+        temporadas = np.maximum(np.ceil(self._steps_ahead(future["ds"]) / m), 1)
+        margen = self._z(self.interval_width) * self.sigma * np.sqrt(temporadas)
+        return pd.DataFrame({
+            "ds": future["ds"].to_numpy(),
+            "yhat": yhat,
+            "yhat_lower": yhat - margen,
+            "yhat_upper": yhat + margen
+        })
+
+
+class HoltWintersBackend(ForecastBackend):
+    """Suavizado exponencial triple aditivo (Holt-Winters) con estacionalidad semanal"""
+
+    name = "holt_winters"
+
+    def __init__(self, params: Optional[Dict] = None):
+        """
+        Args:
+            params: alpha, beta, gamma, season_length (días), interval_width
+                (default: config.HOLT_WINTERS_PARAMS)
+        """
+        super().__init__()
+        self.params = {**config.HOLT_WINTERS_PARAMS, **(params or {})}
+        self.sigma = 0.0
+
+    def fit(self, prophet_df: pd.DataFrame, regresores: List[str]) -> "HoltWintersBackend":
+        self._set_history(prophet_df, regresores)
+        y = prophet_df["y"].to_numpy(dtype=float)
+        m = self._season_steps(self.params["season_length"])
+        alpha, beta, gamma = self.params["alpha"], self.params["beta"], self.params["gamma"]
+
+        if len(y) < 2 * m:
+            raise ValueError(f"Holt-Winters requiere al menos {2 * m} pasos de datos")
+
+        # Inicialización con las dos primeras temporadas
+        level = y[:m].mean()
+        trend = (y[m:2 * m].mean() - y[:m].mean()) / m
+        season = list(y[:m] - level)
+
+        fitted = np.empty(len(y))
+        for t, valor in enumerate(y):
+            s = season[t % m]
+            fitted[t] = level + trend + s
+            nuevo_level = alpha * (valor - s) + (1 - alpha) * (level + trend)
+            trend = beta * (nuevo_level - level) + (1 - beta) * trend
+            season[t % m] = gamma * (valor - nuevo_level) + (1 - gamma) * s
+            level = nuevo_level
+
+        self._fitted = fitted
+        self._level, self._trend, self._season = level, trend, np.array(season)
+        self.sigma = float(np.std(y[m:] - fitted[m:]))
+        return self
+
+    def predict(self, future: pd.DataFrame) -> pd.DataFrame:
+        m = len(self._season)
+        n = len(self._fitted)
+        pasos = self._steps_ahead(future["ds"]).astype(int)
+        indices = self._step_index(future["ds"])
+
+        pronostico = self._level + pasos * self._trend + self._season[indices % m]
+        yhat = np.where(indices < n, self._fitted[np.clip(indices, 0, n - 1)], pronostico)
+
+        margen = self._z(self.params["interval_width"]) * self.sigma * np.sqrt(np.maximum(pasos, 1))
+        return pd.DataFrame({
+            "ds": future["ds"].to_numpy(),
+            "yhat": yhat,
+            "yhat_lower": yhat - margen,
+            "yhat_upper": yhat + margen
+        })
+
+
+# Registro de backends seleccionables con config.FORECAST_BACKEND
+FORECAST_BACKENDS = {
+    backend.name: backend
+    for backend in [ProphetBackend, FourierRidgeBackend, SeasonalNaiveBackend, HoltWintersBackend]
+}
@@ -3,55 +3,158 @@ Módulo de predicción de demanda usando series temporales
 """
 import pandas as pd
 import numpy as np
-from prophet import Prophet
 import streamlit as st
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
+import os
 import config
+from modules.metrics import METRICS
+from modules.forecast_backends import FORECAST_BACKENDS, ForecastBackend, ProphetBackend
+from modules.historical_ingest import VisitCounts, VisitCSVReader, aggregate_visits
+from modules.model_store import ModelStore
+from modules.staffing import simulate, staff_by_hour
+
+
+# Distribución de pacientes por nivel cuando la predicción no es por nivel
+DISTRIBUCION_TRIAGE = {
+    "01": 0.10,  # 10% emergencias
+    "02": 0.20,  # 20% urgencias
+    "03": 0.50,  # 50% prioridad media
+    "07": 0.20   # 20% riesgo coronario/DM
+}
+
+# Pasos por día de cada frecuencia de predicción
+PASOS_POR_DIA = {"dia": 1, "hora": 24}
 
 
 class Forecaster:
-    """Predictor de demanda de urgencias usando Prophet"""
+    """Predictor de demanda de urgencias (Prophet o backends NumPy)"""
     
-    def __init__(self):
+    def __init__(
+        self,
+        model_store: Optional[ModelStore] = None,
+        backend: Optional[str] = None,
+        visit_store=None,
+        hourly_backend: Optional[str] = None
+    ):
+        """
+        Args:
+            model_store: Almacén de modelos Prophet entrenados (default: según config)
+            backend: Nombre del backend de predicción (default: config.FORECAST_BACKEND)
+            visit_store: VisitStore donde se ingieren los CSV (None: solo lectura por bloques)
+            hourly_backend: Backend de la predicción horaria (default: config.FORECAST_HOURLY_BACKEND)
+        """
+        self.backend = backend or config.FORECAST_BACKEND
+        self.hourly_backend = hourly_backend or config.FORECAST_HOURLY_BACKEND
+        self.frecuencia = "dia"
         self.model = None
         self.historical_data = None
+        self.historical_by_site = None
+        self._hourly_counts: Optional[VisitCounts] = None
+        self._hourly = {}
+        self.series_forecasts = None
         self.is_trained = False
+        self.visit_store = visit_store
+        self.model_store = model_store
+        if self.model_store is None and config.FORECAST_MODEL_STORE_ENABLED:
+            self.model_store = ModelStore(config.FORECAST_MODEL_STORE_DIR)
     
-    def load_historical_data(self, csv_file) -> pd.DataFrame:
+    def load_historical_data(self, csv_file, chunk_size: Optional[int] = None) -> pd.DataFrame:
         """
         Carga datos históricos desde CSV
         
+        El archivo se lee por bloques (solo fecha_hora, triage_asignado y sede)
+        y cada bloque se suma a los conteos por hora, sin cargar todas las
+        consultas en memoria; la serie diaria se obtiene reagrupando las horas.
+        Con almacén de consultas, el CSV se ingiere en él (una sola vez por
+        contenido) y la serie se carga desde los conteos materializados del
+        propio archivo; con VISIT_STORE_ACCUMULATE, desde los de todos los
+        archivos ingeridos.
+        
         Args:
             csv_file: Archivo CSV con datos históricos
+            chunk_size: Filas por bloque (default: config.HISTORICAL_CSV_CHUNK_ROWS)
         
         Returns:
             DataFrame con datos procesados
         """
         try:
-            df = pd.read_csv(csv_file)
-            
-            # Validar columnas requeridas
-            required_cols = ["fecha_hora"]
-            missing_cols = [col for col in required_cols if col not in df.columns]
+            if self.visit_store is not None:
+                if config.VISIT_STORE_ACCUMULATE:
+                    ingesta = self.visit_store.ingest(csv_file, chunk_size=chunk_size)
+                    conteos = self.visit_store.load_counts_by_hour()
+                else:
+                    ingesta, conteos = self.visit_store.ingest_file_counts(csv_file, chunk_size=chunk_size)
+                filas, descartadas = ingesta["filas"], ingesta["descartadas"]
+            else:
+                lector = VisitCSVReader(csv_file, chunk_size=chunk_size)
+                conteos = VisitCounts("hora")
+                for chunk in lector:
+                    conteos.add(chunk)
+                filas, descartadas = lector.filas_leidas, lector.filas_descartadas
             
-            if missing_cols:
-                st.error(f"Columnas faltantes en CSV: {missing_cols}")
+            if conteos.empty:
+                st.error("El CSV no tiene consultas con fecha_hora válida")
                 return pd.DataFrame()
-            
-            # Convertir fecha_hora a datetime
-            df["fecha_hora"] = pd.to_datetime(df["fecha_hora"])
-            
-            # Agregar por día si hay múltiples registros por día
-            df_daily = self._aggregate_daily(df)
-            
-            self.historical_data = df_daily
-            return df_daily
+            if descartadas:
+                st.warning(
+                    f"Se descartaron {descartadas} de {filas} filas "
+                    f"con fecha_hora inválida (formato esperado: {config.HISTORICAL_DATETIME_FORMAT})"
+                )
+            return self._set_historical(conteos)
         
         except Exception as e:
             st.error(f"Error al cargar datos históricos: {str(e)}")
             return pd.DataFrame()
     
+    def load_from_store(self) -> pd.DataFrame:
+        """
+        Carga las series diaria y horaria desde los conteos materializados del
+        almacén, sin volver a leer ningún CSV
+        
+        Returns:
+            DataFrame con datos procesados (vacío si el almacén no tiene datos)
+        """
+        if self.visit_store is None:
+            return pd.DataFrame()
+        try:
+            conteos = self.visit_store.load_counts_by_hour()
+            if conteos.empty:
+                return pd.DataFrame()
+            return self._set_historical(conteos)
+        except Exception as e:
+            st.error(f"Error al cargar el almacén de consultas: {str(e)}")
+            return pd.DataFrame()
+    
+    @property
+    def historical_hourly(self) -> Optional[pd.DataFrame]:
+        """Conteos por hora (se arman al usarlos por primera vez)"""
+        if "total" not in self._hourly and self._hourly_counts is not None:
+            self._hourly["total"] = self._hourly_counts.series()
+        return self._hourly.get("total")
+    
+    @historical_hourly.setter
+    def historical_hourly(self, df: Optional[pd.DataFrame]):
+        self._hourly_counts = None
+        self._hourly = {"total": df, "por_sede": None}
+    
+    @property
+    def historical_hourly_by_site(self) -> Optional[pd.DataFrame]:
+        """Conteos por hora y sede (None sin columna de sede)"""
+        if "por_sede" not in self._hourly and self._hourly_counts is not None:
+            self._hourly["por_sede"] = self._hourly_counts.series_by_site()
+        return self._hourly.get("por_sede")
+    
+    def _set_historical(self, conteos: VisitCounts) -> pd.DataFrame:
+        # Conservar el detalle por sede para la predicción por nivel
+        self._hourly_counts = conteos
+        self._hourly = {}
+        diarios = conteos.rollup("dia")
+        self.historical_by_site = diarios.series_by_site()
+        self.historical_data = diarios.series()
+        return self.historical_data
+    
     def _aggregate_daily(self, df: pd.DataFrame) -> pd.DataFrame:
         """
         Agrega datos por día
@@ -62,22 +165,21 @@ class Forecaster:
         Returns:
             DataFrame agregado por día
         """
-        df["fecha"] = df["fecha_hora"].dt.date
-        
-        # Agrupar por fecha
-        daily = df.groupby("fecha").agg({
-            "fecha_hora": "count",  # Total de pacientes
-        }).rename(columns={"fecha_hora": "pacientes_total"})
-        
-        # Agregar conteos por nivel de triage si existe la columna
-        if "triage_asignado" in df.columns:
-            triage_counts = df.groupby(["fecha", "triage_asignado"]).size().unstack(fill_value=0)
-            daily = daily.join(triage_counts, how="left")
+        return aggregate_visits(df, "dia")
+    
+    def aggregate(self, df: pd.DataFrame, frecuencia: str = "dia") -> pd.DataFrame:
+        """
+        Agrega consultas por hora, turno (config.HORAS_POR_TURNO) o día, en la
+        hora local de config.HISTORICAL_TIMEZONE
         
-        daily = daily.reset_index()
-        daily["fecha"] = pd.to_datetime(daily["fecha"])
+        Args:
+            df: DataFrame con datos por consulta
+            frecuencia: "hora", "turno" o "dia"
         
-        return daily
+        Returns:
+            DataFrame con fecha (inicio del intervalo), pacientes_total y niveles
+        """
+        return aggregate_visits(df, frecuencia)
     
     def add_external_features(
         self,
@@ -114,38 +216,70 @@ class Forecaster:
         
         return df
     
-    def train(self, df: pd.DataFrame, target_col: str = "pacientes_total") -> bool:
+    def _create_backend(self, target_col: str, serie: Optional[str] = None) -> ForecastBackend:
+        """
+        Crea el backend de predicción configurado
+        
+        Args:
+            target_col: Columna objetivo
+            serie: Identidad de la serie para el warm-start de Prophet
+        
+        Returns:
+            Instancia del backend sin entrenar
+        """
+        backend = self._backend_name()
+        if backend == ProphetBackend.name:
+            params = config.PROPHET_HOURLY_PARAMS if self.frecuencia == "hora" else config.PROPHET_PARAMS
+            return ProphetBackend(self.model_store, target_col, params, serie=serie)
+        if backend not in FORECAST_BACKENDS:
+            raise ValueError(f"Backend de predicción desconocido: {backend}")
+        return FORECAST_BACKENDS[backend]()
+    
+    def _backend_name(self) -> str:
+        return self.hourly_backend if self.frecuencia == "hora" else self.backend
+    
+    def train(
+        self,
+        df: pd.DataFrame,
+        target_col: str = "pacientes_total",
+        frecuencia: str = "dia",
+        serie: Optional[str] = None
+    ) -> bool:
         """
-        Entrena el modelo Prophet
+        Entrena el modelo con el backend configurado (Prophet por defecto)
         
         Args:
             df: DataFrame con datos históricos
             target_col: Columna objetivo a predecir
+            frecuencia: "dia" (backend y PROPHET_PARAMS) u "hora"
+                (FORECAST_HOURLY_BACKEND y PROPHET_HOURLY_PARAMS)
+            serie: Identidad de la serie para el warm-start, por ejemplo
+                "sede|nivel" (default: target_col)
         
         Returns:
             True si el entrenamiento fue exitoso
         """
         try:
+            if frecuencia not in PASOS_POR_DIA:
+                raise ValueError(f"Frecuencia de predicción desconocida: {frecuencia}")
+            self.frecuencia = frecuencia
+            df = self._hourly_history(df) if frecuencia == "hora" else df
+            
             # Preparar datos para Prophet (requiere columnas 'ds' y 'y')
             prophet_df = pd.DataFrame({
                 "ds": df["fecha"],
                 "y": df[target_col]
             })
             
-            # Crear y configurar modelo
-            self.model = Prophet(**config.PROPHET_PARAMS)
-            
             # Agregar regresores si hay features adicionales
-            if "es_fin_semana" in df.columns:
-                prophet_df["es_fin_semana"] = df["es_fin_semana"]
-                self.model.add_regressor("es_fin_semana")
-            
-            if "tiene_evento" in df.columns:
-                prophet_df["tiene_evento"] = df["tiene_evento"]
-                self.model.add_regressor("tiene_evento")
+            regresores = [col for col in ["es_fin_semana", "tiene_evento"] if col in df.columns]
+            for regresor in regresores:
+                prophet_df[regresor] = df[regresor]
             
-            # Entrenar modelo
-            self.model.fit(prophet_df)
+            # Entrenar con el backend configurado
+            self.model = self._create_backend(target_col, serie)
+            with METRICS.timer("forecast_fit_seconds", backend=self._backend_name()):
+                self.model.fit(prophet_df, regresores)
             self.is_trained = True
             
             return True
@@ -154,6 +288,13 @@ class Forecaster:
             st.error(f"Error al entrenar modelo: {str(e)}")
             return False
     
+    def _hourly_history(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Últimos FORECAST_HOURLY_HISTORY_DAYS días de horas si el backend horario es Prophet"""
+        dias = config.FORECAST_HOURLY_HISTORY_DAYS
+        if self.hourly_backend != ProphetBackend.name or not dias:
+            return df
+        return df[df["fecha"] >= df["fecha"].max() - pd.Timedelta(days=dias)]
+    
     def predict(
         self,
         horizon_days: int = 7,
@@ -163,7 +304,7 @@ class Forecaster:
         Genera predicciones
         
         Args:
-            horizon_days: Días a predecir
+            horizon_days: Días a predecir (en modo horario, horizon_days * 24 horas)
             future_events: DataFrame con eventos futuros
         
         Returns:
@@ -175,7 +316,7 @@ class Forecaster:
         
         try:
             # Crear dataframe futuro
-            future = self.model.make_future_dataframe(periods=horizon_days)
+            future = self.model.make_future_dataframe(periods=horizon_days * PASOS_POR_DIA[self.frecuencia])
             
             # Agregar regresores para fechas futuras
             if future_events is not None:
@@ -188,7 +329,8 @@ class Forecaster:
             future["es_fin_semana"] = future["ds"].dt.dayofweek.isin([5, 6]).astype(int)
             
             # Predecir
-            forecast = self.model.predict(future)
+            with METRICS.timer("forecast_predict_seconds", backend=self._backend_name()):
+                forecast = self.model.predict(future)
             
             return forecast
         
@@ -196,55 +338,271 @@ class Forecaster:
             st.error(f"Error al generar predicciones: {str(e)}")
             return pd.DataFrame()
     
+    def forecast_by_level(
+        self,
+        df: Optional[pd.DataFrame] = None,
+        horizon_days: int = 7,
+        max_workers: Optional[int] = None,
+        frecuencia: str = "dia"
+    ) -> pd.DataFrame:
+        """
+        Entrena un modelo por nivel de triage (y por sede si existe) en paralelo
+        y combina las predicciones
+        
+        Los totales se reconcilian de abajo hacia arriba: el total es la suma de
+        las series por nivel/sede, y su intervalo combina los de cada serie
+        suponiendo independencia.
+        
+        Args:
+            df: DataFrame diario (u horario) con columnas por nivel ("01", "02", ...).
+                Por defecto usa el detalle por sede o los datos históricos cargados
+            horizon_days: Días a predecir
+            max_workers: Procesos en paralelo (default: config.FORECAST_MAX_WORKERS)
+            frecuencia: "dia" u "hora"
+        
+        Returns:
+            DataFrame con ds, yhat, yhat_lower, yhat_upper (total) y yhat_<nivel>
+        """
+        if df is None:
+            df = self._default_history(frecuencia)
+        if df is None or df.empty:
+            st.error("No hay datos históricos para predecir por nivel.")
+            return pd.DataFrame()
+        
+        niveles = [nivel for nivel in config.TRIAGE_LEVELS if nivel in df.columns]
+        if not niveles:
+            st.error("Los datos no tienen columnas por nivel de triage.")
+            return pd.DataFrame()
+        
+        # Una serie por (sede, nivel)
+        grupos = df.groupby(config.SITE_COLUMN) if config.SITE_COLUMN in df.columns else [(None, df)]
+        series = []
+        for sede, df_sede in grupos:
+            for nivel in niveles:
+                serie_df = df_sede[["fecha", nivel]].rename(columns={nivel: "y"}).reset_index(drop=True)
+                series.append((sede, nivel, serie_df, horizon_days, frecuencia, self.backend, self.hourly_backend))
+        
+        max_workers = max_workers or config.FORECAST_MAX_WORKERS or os.cpu_count()
+        try:
+            backend = self.hourly_backend if frecuencia == "hora" else self.backend
+            with METRICS.timer("forecast_by_level_seconds", backend=backend), \
+                    ProcessPoolExecutor(max_workers=min(max_workers, len(series))) as executor:
+                predicciones = list(executor.map(_forecast_series, series))
+        except Exception as e:
+            st.error(f"Error en predicción por nivel: {str(e)}")
+            return pd.DataFrame()
+        
+        partes = []
+        for (sede, nivel, *_), pred in zip(series, predicciones):
+            if pred.empty:
+                st.error(f"No se pudo entrenar el modelo del nivel {nivel}" + (f" en {sede}" if sede else ""))
+                return pd.DataFrame()
+            partes.append(pred.assign(sede=sede, nivel=nivel))
+        self.series_forecasts = pd.concat(partes, ignore_index=True)
+        
+        return self._reconcile_levels(self.series_forecasts)
+    
+    def _default_history(self, frecuencia: str) -> Optional[pd.DataFrame]:
+        """Detalle por sede si existe; si no, la serie total de la frecuencia"""
+        if frecuencia == "hora":
+            return self.historical_hourly_by_site if self.historical_hourly_by_site is not None else self.historical_hourly
+        return self.historical_by_site if self.historical_by_site is not None else self.historical_data
+    
+    def forecast_hourly(
+        self,
+        df: Optional[pd.DataFrame] = None,
+        horizon_days: int = 7,
+        por_nivel: bool = False
+    ) -> pd.DataFrame:
+        """
+        Curva de llegadas por hora para los próximos días
+        
+        Args:
+            df: Conteos horarios (fecha, pacientes_total y niveles). Por defecto
+                los cargados desde el CSV o el almacén de consultas
+            horizon_days: Días a predecir
+            por_nivel: Un modelo por nivel (y sede) en lugar del total
+        
+        Returns:
+            DataFrame con ds (inicio de la hora), yhat (llegadas/hora),
+            yhat_lower, yhat_upper y yhat_<nivel> si por_nivel; solo el horizonte
+        """
+        if por_nivel:
+            forecast = self.forecast_by_level(df, horizon_days=horizon_days, frecuencia="hora")
+        else:
+            df = df if df is not None else self.historical_hourly
+            if df is None or df.empty:
+                st.error("No hay conteos horarios: carga un CSV con fecha_hora.")
+                return pd.DataFrame()
+            if not self.train(df, target_col="pacientes_total", frecuencia="hora"):
+                return pd.DataFrame()
+            forecast = self.predict(horizon_days=horizon_days)
+        if forecast.empty:
+            return forecast
+        
+        forecast = forecast[["ds", "yhat", "yhat_lower", "yhat_upper"] + [
+            col for col in forecast.columns if col.startswith("yhat_") and col not in ("yhat_lower", "yhat_upper")
+        ]].tail(horizon_days * PASOS_POR_DIA["hora"]).reset_index(drop=True)
+        # Tasas de llegada: no negativas
+        columnas = [col for col in forecast.columns if col != "ds"]
+        forecast[columnas] = forecast[columnas].clip(lower=0)
+        return forecast
+    
+    @staticmethod
+    def _reconcile_levels(series_forecasts: pd.DataFrame) -> pd.DataFrame:
+        """
+        Combina las predicciones por sede/nivel en un total coherente
+        
+        Args:
+            series_forecasts: Predicciones en formato largo (ds, sede, nivel, yhat...)
+        
+        Returns:
+            DataFrame ancho con el total y una columna yhat_<nivel> por nivel
+        """
+        pred = series_forecasts.copy()
+        pred["varianza"] = ((pred["yhat_upper"] - pred["yhat_lower"]) / 2) ** 2
+        
+        total = pred.groupby("ds").agg(yhat=("yhat", "sum"), varianza=("varianza", "sum"))
+        semi_intervalo = np.sqrt(total.pop("varianza"))
+        total["yhat_lower"] = total["yhat"] - semi_intervalo
+        total["yhat_upper"] = total["yhat"] + semi_intervalo
+        
+        por_nivel = pred.pivot_table(index="ds", columns="nivel", values="yhat", aggfunc="sum")
+        por_nivel.columns = [f"yhat_{nivel}" for nivel in por_nivel.columns]
+        
+        return total.join(por_nivel).reset_index()
+    
     def calculate_staff_needs(
         self,
         forecast: pd.DataFrame,
-        triage_distribution: Optional[Dict[str, float]] = None
+        triage_distribution: Optional[Dict[str, float]] = None,
+        nivel_servicio: Optional[float] = None
     ) -> pd.DataFrame:
         """
-        Calcula necesidades de personal médico
+        Calcula necesidades de personal médico por día
+        
+        Las llegadas del día se reparten de forma uniforme en sus 24 horas y se
+        dimensionan con Erlang C (staffing.staff_by_hour); los médicos del día
+        son los simultáneos multiplicados por los turnos que cubren 24 horas.
+        Para capturar los picos dentro del día usar calculate_shift_staff_needs.
         
         Args:
             forecast: DataFrame con predicciones
             triage_distribution: Distribución porcentual por nivel de triage
                                 Ej: {"01": 0.1, "02": 0.2, "03": 0.5, "07": 0.2}
+                                Se ignora para los niveles con columna yhat_<nivel>
+            nivel_servicio: Fracción a atender dentro del tiempo objetivo
+                            (por defecto STAFFING_SERVICE_LEVEL)
         
         Returns:
             DataFrame con recomendaciones de personal
         """
-        # Distribución por defecto si no se proporciona
-        if triage_distribution is None:
-            triage_distribution = {
-                "01": 0.10,  # 10% emergencias
-                "02": 0.20,  # 20% urgencias
-                "03": 0.50,  # 50% prioridad media
-                "07": 0.20   # 20% riesgo coronario/DM
-            }
-        
-        # Calcular pacientes por nivel de triage
-        forecast["pacientes_01_02"] = forecast["yhat"] * (
-            triage_distribution.get("01", 0) + triage_distribution.get("02", 0)
-        )
-        forecast["pacientes_03_07"] = forecast["yhat"] * (
-            triage_distribution.get("03", 0) + triage_distribution.get("07", 0)
-        )
+        pacientes = self._patients_by_level(forecast, triage_distribution)
+        forecast["pacientes_01_02"] = pacientes["01"] + pacientes["02"]
+        forecast["pacientes_03_07"] = pacientes["03"] + pacientes["07"]
         
-        # Calcular minutos totales necesarios
-        forecast["minutos_necesarios"] = (
-            forecast["pacientes_01_02"] * 60 +  # 60 min para 01/02
-            forecast["pacientes_03_07"] * 20     # 20 min para 03/07
+        # Horas médico de atención (sin contar esperas ni holgura)
+        forecast["minutos_necesarios"] = sum(
+            pacientes[nivel] * minutos for nivel, minutos in config.STAFFING_SERVICE_MINUTES.items()
         )
-        
-        # Convertir a horas médico
         forecast["horas_medico"] = forecast["minutos_necesarios"] / 60
         
-        # Calcular número de médicos (asumiendo turnos de 8 horas)
-        forecast["medicos_necesarios"] = np.ceil(
-            forecast["horas_medico"] / config.HORAS_POR_TURNO
-        )
+        # Médicos simultáneos para la tasa horaria media y turnos del día
+        por_hora = staff_by_hour(pacientes / 24, nivel_servicio)
+        forecast["medicos_simultaneos"] = por_hora["medicos"]
+        forecast["nivel_servicio"] = por_hora["nivel_servicio"]
+        forecast["medicos_necesarios"] = np.ceil(por_hora["medicos"] * 24 / config.HORAS_POR_TURNO)
         
         return forecast
     
+    def calculate_shift_staff_needs(
+        self,
+        hourly_forecast: pd.DataFrame,
+        triage_distribution: Optional[Dict[str, float]] = None,
+        nivel_servicio: Optional[float] = None
+    ) -> pd.DataFrame:
+        """
+        Médicos por turno a partir de la curva de llegadas por hora
+        
+        Cada hora se dimensiona con Erlang C por nivel de triage
+        (staffing.staff_by_hour); como el médico cubre el turno completo, el
+        turno necesita tantos médicos como su hora más exigente.
+        
+        Args:
+            hourly_forecast: Predicción horaria (forecast_hourly)
+            triage_distribution: Distribución por nivel para las horas sin yhat_<nivel>
+            nivel_servicio: Fracción a atender dentro del tiempo objetivo
+                            (por defecto STAFFING_SERVICE_LEVEL)
+        
+        Returns:
+            DataFrame por turno con turno_inicio, pacientes, horas_medico,
+            carga_pico, medicos_necesarios, medicos_promedio (horas / HORAS_POR_TURNO),
+            nivel_servicio (Erlang C de la hora más ajustada) y espera_media_min
+        """
+        por_hora = staff_by_hour(
+            self._patients_by_level(hourly_forecast, triage_distribution), nivel_servicio
+        )
+        horas = pd.DataFrame({
+            "turno_inicio": hourly_forecast["ds"].dt.floor(f"{config.HORAS_POR_TURNO}h"),
+            "pacientes": hourly_forecast["yhat"],
+            "carga": por_hora["carga"],
+            "medicos": por_hora["medicos"],
+            "nivel_servicio": por_hora["nivel_servicio"],
+            "espera": por_hora["espera_media_min"] * hourly_forecast["yhat"].clip(lower=0)
+        })
+        turnos = horas.groupby("turno_inicio").agg(
+            pacientes=("pacientes", "sum"),
+            horas_medico=("carga", "sum"),
+            carga_pico=("carga", "max"),
+            medicos_necesarios=("medicos", "max"),
+            nivel_servicio=("nivel_servicio", "min"),
+            espera=("espera", "sum")
+        ).reset_index()
+        turnos["medicos_promedio"] = np.ceil(turnos["horas_medico"] / config.HORAS_POR_TURNO).astype(int)
+        turnos["espera_media_min"] = (turnos.pop("espera") / turnos["pacientes"].where(turnos["pacientes"] > 0)).fillna(0)
+        return turnos
+    
+    def simulate_shift_staff(
+        self,
+        hourly_forecast: pd.DataFrame,
+        shift_staff: pd.DataFrame,
+        triage_distribution: Optional[Dict[str, float]] = None,
+        replicas: Optional[int] = None
+    ) -> pd.DataFrame:
+        """
+        Valida el plan por turno con la simulación de eventos discretos
+        (un solo grupo de médicos que atiende por prioridad de triage)
+        
+        Returns:
+            DataFrame por nivel con pacientes, objetivo_min, nivel_servicio,
+            espera_media_min y espera_p90_min
+        """
+        turno = hourly_forecast["ds"].dt.floor(f"{config.HORAS_POR_TURNO}h")
+        medicos = turno.map(shift_staff.set_index("turno_inicio")["medicos_necesarios"])
+        return simulate(
+            self._patients_by_level(hourly_forecast, triage_distribution),
+            medicos.fillna(config.STAFFING_MIN_PHYSICIANS).to_numpy(),
+            replicas=replicas
+        )
+    
+    @staticmethod
+    def _patients_by_level(
+        forecast: pd.DataFrame,
+        triage_distribution: Optional[Dict[str, float]] = None
+    ) -> pd.DataFrame:
+        """
+        Pacientes por nivel de triage: predicción por nivel si existe
+        (forecast_by_level), si no la distribución fija
+        """
+        triage_distribution = triage_distribution or DISTRIBUCION_TRIAGE
+        return pd.DataFrame({
+            nivel: (
+                forecast[f"yhat_{nivel}"] if f"yhat_{nivel}" in forecast.columns
+                else forecast["yhat"] * triage_distribution.get(nivel, 0)
+            ).clip(lower=0)
+            for nivel in config.TRIAGE_LEVELS
+        }, index=forecast.index)
+    
     def get_forecast_summary(self, forecast: pd.DataFrame, days: int = 7) -> Dict:
         """
         Genera resumen de predicciones
@@ -270,6 +628,28 @@ class Forecaster:
         }
 
 
+def _forecast_series(args: Tuple) -> pd.DataFrame:
+    """
+    Entrena y predice una serie (ejecutado en un proceso del pool)
+    
+    Args:
+        args: Tupla (sede, nivel, serie_df con fecha/y, horizon_days, frecuencia,
+            backend, backend horario)
+    
+    Returns:
+        DataFrame con ds, yhat, yhat_lower, yhat_upper (vacío si falla)
+    """
+    sede, nivel, serie_df, horizon_days, frecuencia, backend, hourly_backend = args
+    forecaster = Forecaster(backend=backend, hourly_backend=hourly_backend)
+    # Cada (sede, nivel) tiene su propio puntero de warm-start en el ModelStore
+    if not forecaster.train(serie_df, target_col="y", frecuencia=frecuencia, serie=f"{sede}|{nivel}"):
+        return pd.DataFrame()
+    forecast = forecaster.predict(horizon_days=horizon_days)
+    if forecast.empty:
+        return forecast
+    return forecast[["ds", "yhat", "yhat_lower", "yhat_upper"]]
+
+
 def create_sample_historical_data(days: int = 365 * 5) -> pd.DataFrame:
     """
     Crea datos históricos sintéticos para demostración
@@ -283,7 +663,7 @@ def create_sample_historical_data(days: int = 365 * 5) -> pd.DataFrame:
     np.random.seed(42)
     
     # Generar fechas
-    end_date = datetime.now()
+    end_date = pd.Timestamp.now().normalize()
     start_date = end_date - timedelta(days=days)
     dates = pd.date_range(start=start_date, end=end_date, freq="D")
     
@@ -311,12 +691,28 @@ def create_sample_historical_data(days: int = 365 * 5) -> pd.DataFrame:
     return df
 
 
-@st.cache_resource
-def get_forecaster() -> Forecaster:
+def create_sample_hourly_data(daily: pd.DataFrame, seed: int = 42) -> pd.DataFrame:
     """
-    Retorna instancia cacheada del forecaster
+    Reparte datos diarios de demostración en horas con una curva intradía
+    (pocas llegadas de madrugada, picos a media mañana y al anochecer)
+    
+    Args:
+        daily: DataFrame diario (create_sample_historical_data)
+        seed: Semilla del generador
     
     Returns:
-        Instancia de Forecaster
+        DataFrame con fecha (inicio de la hora), pacientes_total y niveles
     """
-    return Forecaster()
+    rng = np.random.default_rng(seed)
+    horas = np.arange(24)
+    curva = 0.3 + np.exp(-((horas - 11) ** 2) / 8) + 0.8 * np.exp(-((horas - 19) ** 2) / 6)
+    curva /= curva.sum()
+    
+    niveles = [nivel for nivel in config.TRIAGE_LEVELS if nivel in daily.columns]
+    por_nivel = {nivel: rng.multinomial(daily[nivel].to_numpy(), curva).ravel() for nivel in niveles}
+    # Pacientes del total que no quedaron en ningún nivel (redondeo de la distribución)
+    resto = daily["pacientes_total"].to_numpy() - sum(daily[nivel].to_numpy() for nivel in niveles)
+    total = rng.multinomial(np.maximum(resto, 0), curva).ravel() + sum(por_nivel.values())
+    
+    fechas = (daily["fecha"].to_numpy()[:, None] + (horas * np.timedelta64(1, "h"))[None, :]).ravel()
+    return pd.DataFrame({"fecha": fechas, "pacientes_total": total, **por_nivel})
@@ -0,0 +1,364 @@
+"""
+Ingesta por bloques de CSV históricos de consultas
+Lee solo las columnas necesarias, con tipos fijos y formato de fecha explícito,
+y acumula los conteos por intervalo (hora, turno o día), por nivel de triage y
+por sede, bloque a bloque: la memoria depende del número de intervalos, no del
+número de consultas.
+"""
+from typing import Iterator, List, Optional
+import pandas as pd
+from pandas.tseries.frequencies import to_offset
+import config
+
+
+DATETIME_COLUMN = "fecha_hora"
+TRIAGE_COLUMN = "triage_asignado"
+
+# Intervalos de agregación (alias de frecuencia de pandas)
+AGGREGATION_FREQUENCIES = {
+    "hora": "h",
+    "turno": f"{config.HORAS_POR_TURNO}h",
+    "dia": "D"
+}
+
+
+def aggregation_freq(frecuencia: str) -> str:
+    """
+    Alias de pandas de un intervalo de agregación
+
+    Args:
+        frecuencia: "hora", "turno", "dia" o un alias de pandas ("4h")
+
+    Returns:
+        Alias de frecuencia de pandas
+    """
+    return AGGREGATION_FREQUENCIES.get(frecuencia, frecuencia)
+
+
+def _freq_duration(freq: str) -> pd.Timedelta:
+    # Día calendario sin cambio de horario (Day no es un Timedelta en pandas 3)
+    origen = pd.Timestamp("2000-01-01")
+    return origen + to_offset(freq) - origen
+
+
+def normalize_triage_code(codigo) -> str:
+    """
+    Normaliza un código de triage al formato de config.TRIAGE_LEVELS
+
+    Args:
+        codigo: Código leído del CSV ("1", "01", " 3 ")
+
+    Returns:
+        Código de dos dígitos ("01") o el texto original sin espacios
+    """
+    codigo = str(codigo).strip()
+    return codigo.zfill(2) if codigo.isdigit() else codigo
+
+
+def _normalize_triage_column(valores: pd.Series) -> pd.Series:
+    """Normaliza los códigos sobre las categorías (pocas) y no fila por fila"""
+    categorias = valores.astype("category")
+    normalizadas = [normalize_triage_code(c) for c in categorias.cat.categories]
+    if len(set(normalizadas)) == len(normalizadas):
+        return categorias.cat.rename_categories(normalizadas)
+    # "1" y "01" en el mismo bloque: se unifican
+    mapeo = dict(zip(categorias.cat.categories, normalizadas))
+    return categorias.map(mapeo).astype("category")
+
+
+def to_local_time(fechas: pd.Series, tz: Optional[str] = None) -> pd.Series:
+    """
+    Hora local (sin zona) en la que se agrupan las consultas
+
+    Las fechas con zona horaria se convierten a la zona de las sedes; las que
+    no la tienen se asumen ya en hora local. Los intervalos siguen el reloj
+    local: en el cambio de horario la hora repetida cae en el mismo intervalo.
+
+    Args:
+        fechas: Serie datetime64, con o sin zona horaria
+        tz: Zona horaria de las sedes (default: config.HISTORICAL_TIMEZONE)
+
+    Returns:
+        Serie datetime64 sin zona horaria
+    """
+    if getattr(fechas.dt, "tz", None) is None:
+        return fechas
+    return fechas.dt.tz_convert(tz or config.HISTORICAL_TIMEZONE).dt.tz_localize(None)
+
+
+def parse_datetimes(valores: pd.Series, datetime_format: Optional[str] = None) -> pd.Series:
+    """
+    Convierte a datetime con formato fijo (mucho más rápido que la inferencia)
+
+    Args:
+        valores: Columna de texto
+        datetime_format: Formato strptime (default: config.HISTORICAL_DATETIME_FORMAT)
+
+    Returns:
+        Serie datetime64 en hora local; NaT en los valores inválidos
+    """
+    datetime_format = datetime_format or config.HISTORICAL_DATETIME_FORMAT
+    fechas = pd.to_datetime(valores, format=datetime_format, errors="coerce")
+    # Archivo con otro formato: se intenta ISO 8601 antes de descartar el bloque
+    if fechas.isna().all() and valores.notna().any():
+        try:
+            fechas = pd.to_datetime(valores, format="ISO8601", errors="coerce")
+        except ValueError:
+            # Distintos desfases horarios en el mismo bloque
+            fechas = pd.to_datetime(valores, format="ISO8601", errors="coerce", utc=True)
+    return to_local_time(fechas)
+
+
+def aggregate_visits(df: pd.DataFrame, frecuencia: str = "dia", tz: Optional[str] = None) -> pd.DataFrame:
+    """
+    Cuenta consultas por intervalo y nivel de triage (DataFrame en memoria)
+
+    Args:
+        df: Consultas con fecha_hora y opcionalmente triage_asignado
+        frecuencia: "hora", "turno" (config.HORAS_POR_TURNO), "dia" o alias de pandas
+        tz: Zona horaria de las sedes (default: config.HISTORICAL_TIMEZONE)
+
+    Returns:
+        DataFrame con fecha (inicio del intervalo), pacientes_total y una
+        columna por nivel; los intervalos sin consultas quedan en 0
+    """
+    columnas = [DATETIME_COLUMN] + [c for c in (TRIAGE_COLUMN,) if c in df.columns]
+    consultas = df[columnas].copy()
+    consultas[DATETIME_COLUMN] = to_local_time(consultas[DATETIME_COLUMN], tz)
+    if TRIAGE_COLUMN in consultas.columns:
+        consultas[TRIAGE_COLUMN] = _normalize_triage_column(consultas[TRIAGE_COLUMN])
+    conteos = VisitCounts(frecuencia)
+    conteos.add(consultas)
+    return conteos.series()
+
+
+class VisitCSVReader:
+    """Itera un CSV de consultas por bloques, con solo las columnas usadas"""
+
+    def __init__(self, csv_file, chunk_size: Optional[int] = None, datetime_format: Optional[str] = None):
+        """
+        Args:
+            csv_file: Ruta o archivo (p. ej. st.file_uploader)
+            chunk_size: Filas por bloque (default: config.HISTORICAL_CSV_CHUNK_ROWS)
+            datetime_format: Formato de fecha_hora (default: config.HISTORICAL_DATETIME_FORMAT)
+        """
+        self.csv_file = csv_file
+        self.chunk_size = chunk_size or config.HISTORICAL_CSV_CHUNK_ROWS
+        self.datetime_format = datetime_format
+        self.filas_leidas = 0
+        self.filas_descartadas = 0
+
+    def __iter__(self) -> Iterator[pd.DataFrame]:
+        """
+        Bloques con fecha_hora (datetime64 en hora local) y, si existen, triage_asignado y la
+        columna de sede como categorías; se descartan las filas sin fecha válida
+
+        Raises:
+            ValueError: El CSV no tiene la columna fecha_hora
+        """
+        columnas = {DATETIME_COLUMN, TRIAGE_COLUMN, config.SITE_COLUMN}
+        reader = pd.read_csv(
+            self.csv_file,
+            usecols=lambda columna: columna in columnas,
+            dtype={DATETIME_COLUMN: str, TRIAGE_COLUMN: str, config.SITE_COLUMN: str},
+            chunksize=self.chunk_size
+        )
+        with reader:
+            for chunk in reader:
+                if DATETIME_COLUMN not in chunk.columns:
+                    raise ValueError(f"Columnas faltantes en CSV: {[DATETIME_COLUMN]}")
+
+                self.filas_leidas += len(chunk)
+                chunk[DATETIME_COLUMN] = parse_datetimes(chunk[DATETIME_COLUMN], self.datetime_format)
+                validas = chunk[DATETIME_COLUMN].notna()
+                if not validas.all():
+                    self.filas_descartadas += int((~validas).sum())
+                    chunk = chunk[validas]
+
+                if TRIAGE_COLUMN in chunk.columns:
+                    chunk[TRIAGE_COLUMN] = _normalize_triage_column(chunk[TRIAGE_COLUMN])
+                if config.SITE_COLUMN in chunk.columns:
+                    chunk[config.SITE_COLUMN] = chunk[config.SITE_COLUMN].astype("category")
+                yield chunk
+
+
+class VisitCounts:
+    """Conteos por intervalo acumulados bloque a bloque (por sede y nivel de triage)"""
+
+    # Bloques parciales que se acumulan antes de combinarlos
+    COMPACT_EVERY = 16
+
+    def __init__(self, frecuencia: str = "dia"):
+        """
+        Args:
+            frecuencia: Intervalo de los conteos ("hora", "turno", "dia" o alias de pandas)
+        """
+        self.frecuencia = frecuencia
+        self.freq = aggregation_freq(frecuencia)
+        self._partials: List[pd.Series] = []
+        self._keys: Optional[List[str]] = None
+
+    @property
+    def empty(self) -> bool:
+        return not self._partials
+
+    def add(self, chunk: pd.DataFrame):
+        """
+        Suma los conteos de un bloque de consultas
+
+        Args:
+            chunk: Bloque con fecha_hora (hora local) y opcionalmente sede y triage_asignado
+        """
+        if chunk.empty:
+            return
+        claves = [chunk[DATETIME_COLUMN].dt.floor(self.freq).rename("fecha")]
+        for columna in (config.SITE_COLUMN, TRIAGE_COLUMN):
+            if columna in chunk.columns:
+                valores = chunk[columna]
+                if valores.hasnans:
+                    # Sin dato: cuenta en el total pero no en ningún nivel
+                    valores = valores.astype("category").cat.add_categories([""]).fillna("")
+                claves.append(valores)
+        if self._keys is None:
+            self._keys = [clave.name for clave in claves]
+
+        self._partials.append(pd.concat(claves, axis=1).groupby(self._keys, observed=True, sort=False).size())
+        if len(self._partials) >= self.COMPACT_EVERY:
+            self._compact()
+
+    @classmethod
+    def from_counts(cls, conteos: pd.DataFrame, frecuencia: str = "dia") -> "VisitCounts":
+        """
+        Reconstruye el acumulador desde conteos en formato largo (long_counts)
+
+        Args:
+            conteos: DataFrame con fecha, sede, triage_asignado y pacientes ("" = sin dato)
+            frecuencia: Intervalo de los conteos
+        """
+        acumulador = cls(frecuencia)
+        if conteos.empty:
+            return acumulador
+        claves = ["fecha"] + [
+            columna for columna in (config.SITE_COLUMN, TRIAGE_COLUMN)
+            if (conteos[columna] != "").any()
+        ]
+        acumulador._keys = claves
+        if len(claves) == 3:
+            # Ya viene agregado por fecha, sede y nivel
+            acumulador._partials = [conteos.set_index(claves)["pacientes"]]
+        else:
+            acumulador._partials = [conteos.groupby(claves, observed=True, sort=False)["pacientes"].sum()]
+        return acumulador
+
+    def long_counts(self) -> pd.DataFrame:
+        """
+        Conteos en formato largo, con sede y nivel siempre presentes
+
+        Returns:
+            DataFrame con fecha, sede, triage_asignado y pacientes ("" = sin dato)
+        """
+        columnas = ["fecha", config.SITE_COLUMN, TRIAGE_COLUMN, "pacientes"]
+        if self.empty:
+            return pd.DataFrame(columns=columnas)
+        conteos = self._compact().rename("pacientes").reset_index()
+        for columna in (config.SITE_COLUMN, TRIAGE_COLUMN):
+            conteos[columna] = conteos[columna].astype(str) if columna in conteos.columns else ""
+        return conteos[columnas]
+
+    def _compact(self) -> pd.Series:
+        """Combina los parciales en una sola serie de conteos"""
+        if len(self._partials) > 1:
+            conteos = pd.concat(self._partials).groupby(level=self._keys, observed=True, sort=False).sum()
+            self._partials = [conteos]
+        return self._partials[0]
+
+    def rollup(self, frecuencia: str) -> "VisitCounts":
+        """
+        Conteos reagrupados en un intervalo más largo (hora -> turno -> día)
+
+        Args:
+            frecuencia: Intervalo destino; debe ser múltiplo del actual
+
+        Returns:
+            Nuevo acumulador con los conteos reagrupados
+
+        Raises:
+            ValueError: El intervalo destino es más corto que el actual
+        """
+        destino = aggregation_freq(frecuencia)
+        if destino == self.freq:
+            return self
+        if _freq_duration(destino) < _freq_duration(self.freq):
+            raise ValueError(f"No se puede pasar de {self.frecuencia} a un intervalo más corto ({frecuencia})")
+        acumulador = type(self)(frecuencia)
+        if self.empty:
+            return acumulador
+        conteos = self._compact()
+        fechas = conteos.index.get_level_values("fecha").floor(destino)
+        otras = [conteos.index.get_level_values(clave) for clave in self._keys[1:]]
+        acumulador._keys = list(self._keys)
+        acumulador._partials = [
+            conteos.groupby([fechas] + otras, observed=True, sort=False).sum().rename_axis(self._keys)
+        ]
+        return acumulador
+
+    def _series_table(self, conteos: pd.Series, niveles: List[str], rango: pd.DatetimeIndex) -> pd.DataFrame:
+        """Total y columnas por nivel, una fila por intervalo del rango (sin huecos)"""
+        tabla = conteos.groupby(level="fecha").sum().rename("pacientes_total").to_frame()
+        if TRIAGE_COLUMN in self._keys:
+            por_nivel = conteos.groupby(level=["fecha", TRIAGE_COLUMN], observed=True).sum().unstack(fill_value=0)
+            tabla = tabla.join(por_nivel.reindex(columns=niveles, fill_value=0), how="left")
+        # Los intervalos sin consultas quedan en 0
+        tabla = tabla.reindex(rango, fill_value=0)
+        tabla.columns = list(tabla.columns)
+        return tabla.rename_axis("fecha").reset_index()
+
+    def _range(self, conteos: pd.Series) -> pd.DatetimeIndex:
+        fechas = conteos.index.get_level_values("fecha")
+        return pd.date_range(fechas.min(), fechas.max(), freq=self.freq)
+
+    def _levels(self, conteos: pd.Series) -> List[str]:
+        if TRIAGE_COLUMN not in self._keys:
+            return []
+        return sorted(str(nivel) for nivel in conteos.index.get_level_values(TRIAGE_COLUMN).unique() if nivel != "")
+
+    def series(self) -> pd.DataFrame:
+        """
+        Conteos por intervalo
+
+        Returns:
+            DataFrame con fecha (inicio del intervalo), pacientes_total y una columna por nivel de triage
+        """
+        if self.empty:
+            return pd.DataFrame()
+        conteos = self._compact()
+        return self._series_table(conteos, self._levels(conteos), self._range(conteos))
+
+    def series_by_site(self) -> Optional[pd.DataFrame]:
+        """
+        Conteos por intervalo y sede (mismas columnas de nivel en todas las sedes)
+
+        Returns:
+            DataFrame con fecha, pacientes_total, niveles y sede; None sin columna de sede
+        """
+        if self.empty or config.SITE_COLUMN not in self._keys:
+            return None
+        conteos = self._compact()
+        niveles = self._levels(conteos)
+        rango = self._range(conteos)
+        return pd.concat(
+            [
+                self._series_table(conteos_sede.droplevel(config.SITE_COLUMN), niveles, rango)
+                .assign(**{config.SITE_COLUMN: sede})
+                for sede, conteos_sede in conteos.groupby(level=config.SITE_COLUMN, observed=True, sort=True)
+            ],
+            ignore_index=True
+        )
+
+    def daily(self) -> pd.DataFrame:
+        """Conteos por día (ver series)"""
+        return self.rollup("dia").series()
+
+    def daily_by_site(self) -> Optional[pd.DataFrame]:
+        """Conteos por día y sede (ver series_by_site)"""
+        return self.rollup("dia").series_by_site()
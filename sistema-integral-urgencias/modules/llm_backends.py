@@ -0,0 +1,314 @@
+"""
+Backends intercambiables de modelos de lenguaje para MedEngine
+Todos exponen generate_content(prompt, stream=False, system=None) con respuestas
+que tienen .text (como google.generativeai), y aplican el timeout y el límite de
+solicitudes concurrentes configurados para cada backend. El prefijo de sistema
+se envía como instrucción de sistema del proveedor, separado del contenido.
+
+Backends disponibles (config.LLM_BACKEND):
+    - gemini: Gemini API (google.generativeai)
+    - vertex: Vertex AI (google-cloud-aiplatform, dependencia opcional)
+    - openai: Endpoint HTTP compatible con OpenAI (vLLM, llama.cpp server, Ollama...)
+    - stub: Modelo local determinista, sin red ni API key
+"""
+import json
+import threading
+from typing import Iterator, Optional
+import config
+from modules.stub_model import StubModel
+
+
+class LLMResponse:
+    """Respuesta mínima con el texto generado"""
+
+    def __init__(self, text: str):
+        self.text = text
+
+
+_http_session = None
+_http_session_lock = threading.Lock()
+
+
+def get_http_session():
+    """
+    Sesión HTTP compartida por todos los backends HTTP (pool de conexiones keep-alive)
+
+    Returns:
+        requests.Session con el pool dimensionado por config.LLM_HTTP_POOL_SIZE
+    """
+    global _http_session
+    with _http_session_lock:
+        if _http_session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=config.LLM_HTTP_POOL_SIZE,
+                pool_maxsize=config.LLM_HTTP_POOL_SIZE
+            )
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _http_session = session
+        return _http_session
+
+
+class LLMBackend:
+    """Interfaz común: timeout por solicitud y límite de solicitudes en vuelo"""
+
+    name = ""
+
+    def __init__(self, model_name: str, timeout_s: Optional[float] = None, max_concurrency: Optional[int] = None):
+        """
+        Args:
+            model_name: Modelo a usar (también forma parte de la clave de caché)
+            timeout_s: Timeout por solicitud (default: config.LLM_BACKEND_SETTINGS)
+            max_concurrency: Solicitudes simultáneas permitidas (default: config.LLM_BACKEND_SETTINGS)
+        """
+        settings = config.LLM_BACKEND_SETTINGS.get(self.name, {})
+        self.model_name = model_name
+        self.timeout_s = timeout_s or settings.get("timeout_s", 30)
+        self.max_concurrency = max_concurrency or settings.get("max_concurrency", 8)
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+
+    def generate_content(self, prompt: str, stream: bool = False, system: Optional[str] = None, **kwargs):
+        """
+        Genera la respuesta del modelo
+
+        Args:
+            prompt: Contenido del usuario (o prompt completo si no hay system)
+            stream: Si es True retorna un iterador de fragmentos con .text
+            system: Instrucción de sistema, idéntica entre llamadas
+
+        Returns:
+            Respuesta con .text, o iterador de fragmentos si stream=True
+        """
+        if stream:
+            return self._stream_with_slot(prompt, system)
+        with self._slots:
+            return LLMResponse(self._generate(prompt, system))
+
+    def _stream_with_slot(self, prompt: str, system: Optional[str]) -> Iterator[LLMResponse]:
+        """El cupo de concurrencia se mantiene hasta consumir el stream"""
+        with self._slots:
+            for texto in self._stream(prompt, system):
+                yield LLMResponse(texto)
+
+    def warmup(self):
+        """Carga el cliente del backend (importaciones pesadas) antes de la primera solicitud"""
+
+    def _generate(self, prompt: str, system: Optional[str] = None) -> str:
+        raise NotImplementedError
+
+    def _stream(self, prompt: str, system: Optional[str] = None) -> Iterator[str]:
+        # Sin streaming nativo: un único fragmento
+        yield self._generate(prompt, system)
+
+
+class GeminiBackend(LLMBackend):
+    """Gemini API mediante google.generativeai"""
+
+    name = "gemini"
+
+    def __init__(self, model_name: Optional[str] = None, api_key: Optional[str] = None, **kwargs):
+        super().__init__(model_name or config.GEMINI_MODEL, **kwargs)
+        self.api_key = api_key or config.GEMINI_API_KEY
+        if not self.api_key:
+            raise ValueError("GEMINI_API_KEY no configurada")
+        self._models = {}
+        self._model_lock = threading.Lock()
+
+    def model(self, system: Optional[str] = None):
+        """
+        Cliente de genai para una instrucción de sistema, creado en la primera
+        llamada (importar genai tarda ~1 s); en genai la instrucción de sistema
+        es parte del modelo, y el prefijo de triage es siempre el mismo
+        """
+        if system not in self._models:
+            with self._model_lock:
+                if system not in self._models:
+                    import google.generativeai as genai
+
+                    genai.configure(api_key=self.api_key)
+                    self._models[system] = genai.GenerativeModel(self.model_name, system_instruction=system)
+        return self._models[system]
+
+    def warmup(self):
+        self.model()
+
+    def _generate(self, prompt: str, system: Optional[str] = None) -> str:
+        return self.model(system).generate_content(prompt, request_options={"timeout": self.timeout_s}).text
+
+    def _stream(self, prompt: str, system: Optional[str] = None) -> Iterator[str]:
+        respuesta = self.model(system).generate_content(
+            prompt, stream=True, request_options={"timeout": self.timeout_s}
+        )
+        for chunk in respuesta:
+            if chunk.text:
+                yield chunk.text
+
+
+class VertexBackend(LLMBackend):
+    """
+    Vertex AI (requiere pip install google-cloud-aiplatform)
+
+    Usa el cliente PredictionService en lugar de vertexai.GenerativeModel
+    porque este no acepta timeout por solicitud.
+    """
+
+    name = "vertex"
+
+    def __init__(self, model_name: Optional[str] = None, project: Optional[str] = None,
+                 location: Optional[str] = None, **kwargs):
+        try:
+            from google.cloud.aiplatform_v1 import PredictionServiceClient
+        except ImportError as e:
+            raise ImportError("Vertex AI requiere el paquete google-cloud-aiplatform") from e
+
+        super().__init__(model_name or config.VERTEX_AI_MODEL, **kwargs)
+        project = project or config.GCP_PROJECT_ID
+        if not project:
+            raise ValueError("GCP_PROJECT_ID requerido para Vertex AI")
+        location = location or config.GCP_LOCATION
+        self.client = PredictionServiceClient(
+            client_options={"api_endpoint": f"{location}-aiplatform.googleapis.com"}
+        )
+        # Nombre corto de un modelo publicado por Google, o ruta completa de un endpoint propio
+        self.resource = (
+            self.model_name if self.model_name.startswith("projects/")
+            else f"projects/{project}/locations/{location}/publishers/google/models/{self.model_name}"
+        )
+
+    def _request(self, prompt: str, system: Optional[str]):
+        from google.cloud.aiplatform_v1.types import Content, GenerateContentRequest, Part
+
+        request = GenerateContentRequest(
+            model=self.resource,
+            contents=[Content(role="user", parts=[Part(text=prompt)])]
+        )
+        if system:
+            request.system_instruction = Content(parts=[Part(text=system)])
+        return request
+
+    @staticmethod
+    def _text(response) -> str:
+        if not response.candidates:
+            return ""
+        return "".join(part.text for part in response.candidates[0].content.parts)
+
+    def _generate(self, prompt: str, system: Optional[str] = None) -> str:
+        request = self._request(prompt, system)
+        return self._text(self.client.generate_content(request=request, timeout=self.timeout_s))
+
+    def _stream(self, prompt: str, system: Optional[str] = None) -> Iterator[str]:
+        request = self._request(prompt, system)
+        for chunk in self.client.stream_generate_content(request=request, timeout=self.timeout_s):
+            texto = self._text(chunk)
+            if texto:
+                yield texto
+
+
+class OpenAICompatibleBackend(LLMBackend):
+    """
+    Endpoint /chat/completions compatible con OpenAI
+
+    Sirve también para modelos locales sin red externa (llama.cpp server,
+    vLLM u Ollama escuchando en localhost).
+    """
+
+    name = "openai"
+
+    def __init__(self, model_name: Optional[str] = None, base_url: Optional[str] = None,
+                 api_key: Optional[str] = None, **kwargs):
+        super().__init__(model_name or config.OPENAI_COMPAT_MODEL, **kwargs)
+        self.base_url = (base_url or config.OPENAI_COMPAT_BASE_URL).rstrip("/")
+        self.api_key = api_key if api_key is not None else config.OPENAI_COMPAT_API_KEY
+        self.session = get_http_session()
+
+    def _request(self, prompt: str, system: Optional[str], stream: bool):
+        messages = [{"role": "user", "content": prompt}]
+        if system:
+            messages.insert(0, {"role": "system", "content": system})
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        response = self.session.post(
+            f"{self.base_url}/chat/completions",
+            headers=headers,
+            json={
+                "model": self.model_name,
+                "messages": messages,
+                "temperature": 0,
+                "stream": stream
+            },
+            timeout=self.timeout_s,
+            stream=stream
+        )
+        response.raise_for_status()
+        return response
+
+    def _generate(self, prompt: str, system: Optional[str] = None) -> str:
+        data = self._request(prompt, system, stream=False).json()
+        return data["choices"][0]["message"]["content"] or ""
+
+    def _stream(self, prompt: str, system: Optional[str] = None) -> Iterator[str]:
+        # Server-sent events: líneas "data: {...}" terminadas en "data: [DONE]"
+        with self._request(prompt, system, stream=True) as response:
+            for linea in response.iter_lines(decode_unicode=True):
+                if not linea or not linea.startswith("data:"):
+                    continue
+                payload = linea[len("data:"):].strip()
+                if payload == "[DONE]":
+                    break
+                texto = json.loads(payload)["choices"][0].get("delta", {}).get("content")
+                if texto:
+                    yield texto
+
+
+class StubBackend(LLMBackend):
+    """Modelo local determinista (StubModel) para pruebas de carga sin red"""
+
+    name = "stub"
+
+    def __init__(self, model_name: Optional[str] = None, latency_s: Optional[float] = None,
+                 jitter_s: float = 0.0, failure_rate: float = 0.0, seed: Optional[int] = 0, **kwargs):
+        super().__init__(model_name or "stub-local", **kwargs)
+        self.model = StubModel(
+            latency_s=config.STUB_MODEL_LATENCY_S if latency_s is None else latency_s,
+            jitter_s=jitter_s,
+            failure_rate=failure_rate,
+            seed=seed
+        )
+
+    # El stub responde según el caso: la instrucción de sistema no cambia la respuesta
+    def _generate(self, prompt: str, system: Optional[str] = None) -> str:
+        return self.model.generate_content(prompt).text
+
+    def _stream(self, prompt: str, system: Optional[str] = None) -> Iterator[str]:
+        for chunk in self.model.generate_content(prompt, stream=True):
+            yield chunk.text
+
+
+# Registro de backends seleccionables con config.LLM_BACKEND
+LLM_BACKENDS = {
+    backend.name: backend
+    for backend in [GeminiBackend, VertexBackend, OpenAICompatibleBackend, StubBackend]
+}
+
+
+def create_backend(name: Optional[str] = None, **kwargs) -> LLMBackend:
+    """
+    Crea un backend por nombre
+
+    Args:
+        name: Nombre registrado en LLM_BACKENDS (default: config.LLM_BACKEND)
+        **kwargs: Parámetros del constructor del backend
+
+    Returns:
+        Backend listo para usar
+    """
+    name = name or config.LLM_BACKEND
+    if name not in LLM_BACKENDS:
+        raise ValueError(f"Backend de modelo desconocido: {name}. Opciones: {', '.join(LLM_BACKENDS)}")
+    return LLM_BACKENDS[name](**kwargs)
+
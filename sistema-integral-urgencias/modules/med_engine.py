@@ -2,40 +2,71 @@
 Motor de IA para clasificación de triage usando Gemini API
 Preparado para migración a Vertex AI / Med-Gemma
 """
-import google.generativeai as genai
 import streamlit as st
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, Iterator, List, Tuple, Optional
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import random
 import re
+import time
 import config
+from modules.alarm_matcher import AlarmSignMatcher
+from modules.llm_backends import create_backend
+from modules.metrics import METRICS
+from modules.prompt_builder import PromptBuilder, count_tokens
+from modules.resilience import ResilientModel
+from modules.response_parser import parse_triage_response
+from modules.triage_cache import TriageCache
+from modules.triage_rules import TriageRuleEngine
+
+
+# Línea "Nivel de Triage: XX" completa (termina en salto de línea) durante el streaming
+_STREAM_LEVEL_PATTERN = re.compile(r"Nivel de Triage:\W*(01|02|03|07)\b[^\n]*\n", re.IGNORECASE)
 
 
 class MedEngine:
     """Motor de IA para clasificación inteligente de triage"""
     
-    def __init__(self):
-        """Inicializa el motor de IA"""
-        self.model = None
-        self._initialize_model()
+    def __init__(self, model=None, cache: Optional[TriageCache] = None, fallback_model=None):
+        """
+        Inicializa el motor de IA
+        
+        Args:
+            model: Modelo a usar en lugar del backend configurado
+                (cualquier objeto con generate_content(prompt, stream=False, system=None))
+            cache: Caché de respuestas (default: según config.TRIAGE_CACHE_*)
+            fallback_model: Modelo alternativo si el principal falla (default: config.LLM_FALLBACK_BACKEND)
+        """
+        self.model = model
+        self.fallback_model = fallback_model
+        self.cache = cache
+        if self.cache is None and config.TRIAGE_CACHE_ENABLED:
+            self.cache = TriageCache(
+                max_entries=config.TRIAGE_CACHE_MAX_ENTRIES,
+                ttl_s=config.TRIAGE_CACHE_TTL_S,
+                db_path=config.TRIAGE_CACHE_DB_PATH or None
+            )
+        self.prompt_builder = PromptBuilder()
+        self.alarm_matcher = AlarmSignMatcher(config.SIGNOS_ALARMA, config.SIGNOS_ALARMA_VARIANTES)
+        self.rule_engine = TriageRuleEngine() if config.TRIAGE_FAST_PATH_ENABLED else None
+        if self.model is None:
+            self._initialize_model()
+        if self.model is not None and config.TRIAGE_RESILIENCE_ENABLED:
+            # Plazo por llamada, circuit breaker y hedging
+            self.model = ResilientModel(self.model)
     
     def _initialize_model(self):
-        """Inicializa el modelo de Gemini"""
+        """Inicializa el backend configurado (config.LLM_BACKEND) y el alternativo"""
         try:
-            if config.USE_VERTEX_AI:
-                # TODO: Implementar Vertex AI cuando se migre
-                st.warning("Vertex AI no implementado aún. Usando Gemini API.")
-                self._init_gemini()
-            else:
-                self._init_gemini()
+            self.model = create_backend(config.LLM_BACKEND)
         except Exception as e:
             st.error(f"Error al inicializar el modelo: {str(e)}")
-    
-    def _init_gemini(self):
-        """Inicializa Gemini API"""
-        if not config.GEMINI_API_KEY:
-            raise ValueError("GEMINI_API_KEY no configurada")
         
-        genai.configure(api_key=config.GEMINI_API_KEY)
-        self.model = genai.GenerativeModel(config.GEMINI_MODEL)
+        if self.fallback_model is None and config.LLM_FALLBACK_BACKEND:
+            try:
+                self.fallback_model = create_backend(config.LLM_FALLBACK_BACKEND)
+            except Exception as e:
+                st.error(f"Error al inicializar el modelo alternativo: {str(e)}")
     
     def classify_triage(
         self,
@@ -58,139 +89,347 @@ class MedEngine:
                 - razonamiento: str
                 - confianza: float
         """
+        inicio = time.perf_counter()
+        resultado = self._classify_triage(caso_clinico, sintoma_principal, protocolo)
+        METRICS.observe("triage_classify_seconds", time.perf_counter() - inicio)
+        return resultado
+    
+    def _classify_triage(self, caso_clinico: str, sintoma_principal: str, protocolo: Dict) -> Dict:
+        """Cuerpo de classify_triage (sin la medición de la duración total)"""
         try:
             # Detectar signos de alarma en el caso clínico
-            signos_detectados = self.detect_alarm_signs(caso_clinico)
+            signos_detectados = self.detect_alarm_signs(caso_clinico, protocolo)
             
-            # Generar prompt para Gemini
-            prompt = config.get_triage_prompt(caso_clinico, protocolo, sintoma_principal)
+            # Fast-path: casos evidentes se resuelven con reglas locales
+            resultado_reglas = self._fast_path(caso_clinico, sintoma_principal, protocolo, signos_detectados)
+            if resultado_reglas is not None:
+                return resultado_reglas
             
-            # Llamar al modelo
-            response = self.model.generate_content(prompt)
-            response_text = response.text
+            # Generar prompt para el modelo
+            prompt = self._build_prompt(caso_clinico, protocolo, sintoma_principal)
             
-            # Parsear la respuesta
-            nivel_triage = self._extract_triage_level(response_text)
-            razonamiento = self._extract_reasoning(response_text)
-            signos_en_respuesta = self._extract_alarm_signs_from_response(response_text)
+            # Llamar al modelo (si no está disponible se clasifica localmente)
+            try:
+                response_text = self._generate(prompt)
+            except Exception as e:
+                if not config.TRIAGE_LOCAL_FALLBACK_ENABLED:
+                    raise
+                st.warning(f"Modelo no disponible, se usa la clasificación local: {str(e)}")
+                return self._local_fallback(caso_clinico, sintoma_principal, protocolo, signos_detectados, e)
             
-            # Combinar signos detectados
-            todos_signos = list(set(signos_detectados + signos_en_respuesta))
+            return self._build_result(response_text, signos_detectados, protocolo)
+        
+        except Exception as e:
+            st.error(f"Error en clasificación de triage: {str(e)}")
+            return self._error_result(e)
+    
+    def classify_triage_stream(
+        self,
+        caso_clinico: str,
+        sintoma_principal: str,
+        protocolo: Dict
+    ) -> Iterator[Dict]:
+        """
+        Variante de classify_triage que emite la respuesta a medida que llega
+        
+        Args:
+            caso_clinico: Descripción de síntomas y signos del paciente
+            sintoma_principal: Síntoma principal (ej: "Dolor Torácico")
+            protocolo: Diccionario con el protocolo médico relevante
+        
+        Yields:
+            Eventos como diccionarios con la clave "tipo":
+                - "parcial": {"texto": respuesta acumulada hasta el momento}
+                - "nivel": {"nivel_triage": str} apenas se completa la línea "Nivel de Triage:"
+                - "final": {"resultado": mismo diccionario que classify_triage}
+        """
+        try:
+            signos_detectados = self.detect_alarm_signs(caso_clinico, protocolo)
             
-            # Calcular confianza basada en la presencia de signos de alarma
-            confianza = self._calculate_confidence(nivel_triage, todos_signos, protocolo)
+            resultado_reglas = self._fast_path(caso_clinico, sintoma_principal, protocolo, signos_detectados)
+            if resultado_reglas is not None:
+                yield {"tipo": "nivel", "nivel_triage": resultado_reglas["nivel_triage"]}
+                yield {"tipo": "final", "resultado": resultado_reglas}
+                return
             
-            return {
-                "nivel_triage": nivel_triage,
-                "signos_alarma": todos_signos,
-                "razonamiento": razonamiento,
-                "confianza": confianza,
-                "respuesta_completa": response_text
-            }
+            prompt = self._build_prompt(caso_clinico, protocolo, sintoma_principal)
+            
+            response_text = ""
+            nivel_emitido = False
+            try:
+                for chunk in self._generate_stream(prompt):
+                    response_text += chunk
+                    yield {"tipo": "parcial", "texto": response_text}
+                    
+                    if not nivel_emitido:
+                        match = _STREAM_LEVEL_PATTERN.search(response_text)
+                        if match:
+                            nivel_emitido = True
+                            yield {"tipo": "nivel", "nivel_triage": match.group(1)}
+            except Exception as e:
+                if not config.TRIAGE_LOCAL_FALLBACK_ENABLED:
+                    raise
+                st.warning(f"Modelo no disponible, se usa la clasificación local: {str(e)}")
+                resultado = self._local_fallback(caso_clinico, sintoma_principal, protocolo, signos_detectados, e)
+                yield {"tipo": "nivel", "nivel_triage": resultado["nivel_triage"]}
+                yield {"tipo": "final", "resultado": resultado}
+                return
+            
+            resultado = self._build_result(response_text, signos_detectados, protocolo)
+            if not nivel_emitido:
+                yield {"tipo": "nivel", "nivel_triage": resultado["nivel_triage"]}
+            yield {"tipo": "final", "resultado": resultado}
         
         except Exception as e:
             st.error(f"Error en clasificación de triage: {str(e)}")
-            return {
-                "nivel_triage": "03",  # Nivel por defecto en caso de error
-                "signos_alarma": [],
-                "razonamiento": f"Error en clasificación: {str(e)}",
-                "confianza": 0.0,
-                "respuesta_completa": ""
-            }
+            yield {"tipo": "final", "resultado": self._error_result(e)}
     
-    def detect_alarm_signs(self, texto: str) -> List[str]:
+    def _fast_path(
+        self,
+        caso_clinico: str,
+        sintoma_principal: str,
+        protocolo: Optional[Dict],
+        signos_detectados: List[str]
+    ) -> Optional[Dict]:
         """
-        Detecta signos de alarma en el texto del caso clínico
+        Evalúa el motor de reglas locales si está activo
+        
+        Returns:
+            Resultado de clasificación o None si el caso requiere el LLM
+        """
+        if self.rule_engine is None:
+            return None
+        resultado = self.rule_engine.evaluate(caso_clinico, sintoma_principal, protocolo, signos_detectados)
+        if resultado is not None:
+            METRICS.inc("triage_fast_path_total")
+        return resultado
+    
+    def _build_prompt(self, caso_clinico: str, protocolo: Optional[Dict], sintoma_principal: str) -> Tuple[str, str]:
+        """
+        Arma el prompt registrando su duración y tokens estimados
+
+        Returns:
+            Tupla (prefijo de sistema, contenido del caso); el prefijo se envía
+            como instrucción de sistema del backend
+        """
+        with METRICS.timer("triage_prompt_build_seconds"):
+            prompt = self.prompt_builder.build_parts(caso_clinico, protocolo, sintoma_principal)
+        tokens = sum(count_tokens(parte) for parte in prompt)
+        METRICS.observe("triage_prompt_tokens", tokens)
+        METRICS.inc("triage_tokens_total", tokens, tipo="prompt")
+        return prompt
+    
+    def _record_response(self, response_text: str):
+        tokens = count_tokens(response_text)
+        METRICS.observe("triage_response_tokens", tokens)
+        METRICS.inc("triage_tokens_total", tokens, tipo="respuesta")
+    
+    def _generate(self, prompt: Tuple[str, str]) -> str:
+        """
+        Llama al modelo y retorna el texto generado, usando la caché si está activa
         
         Args:
-            texto: Texto a analizar
+            prompt: Tupla (prefijo de sistema, contenido) de _build_prompt
         
         Returns:
-            Lista de signos de alarma detectados
+            Texto de la respuesta del modelo
         """
-        texto_lower = texto.lower()
-        signos_detectados = []
+        model_name = getattr(self.model, "model_name", config.GEMINI_MODEL)
+        key = None
+        if self.cache is not None:
+            key = TriageCache.make_key("\n\n".join(prompt), model_name)
+            cached = self.cache.get(key)
+            if cached is not None:
+                METRICS.inc("triage_cache_hits_total")
+                return cached
+            METRICS.inc("triage_cache_misses_total")
         
-        for signo in config.SIGNOS_ALARMA:
-            if signo.lower() in texto_lower:
-                signos_detectados.append(signo.capitalize())
+        sistema, contenido = prompt
+        try:
+            with METRICS.timer("triage_model_call_seconds", modelo=model_name):
+                response_text = self.model.generate_content(contenido, system=sistema).text
+        except Exception:
+            METRICS.inc("triage_errors_total", modelo=model_name)
+            if self.fallback_model is None:
+                raise
+            # Las respuestas del modelo alternativo no se guardan en caché
+            METRICS.inc("triage_fallbacks_total", tipo="modelo_alternativo")
+            fallback_name = getattr(self.fallback_model, "model_name", "alternativo")
+            with METRICS.timer("triage_model_call_seconds", modelo=fallback_name):
+                response_text = self.fallback_model.generate_content(contenido, system=sistema).text
+            self._record_response(response_text)
+            return response_text
         
-        return list(set(signos_detectados))  # Eliminar duplicados
+        self._record_response(response_text)
+        if key is not None:
+            self.cache.set(key, response_text)
+        return response_text
     
-    def _extract_triage_level(self, response_text: str) -> str:
+    def _generate_stream(self, prompt: Tuple[str, str]) -> Iterator[str]:
         """
-        Extrae el nivel de triage de la respuesta del modelo
+        Llama al modelo en modo streaming y emite los fragmentos de texto
+        
+        Una respuesta en caché se emite completa en un solo fragmento.
         
         Args:
-            response_text: Texto de respuesta del modelo
+            prompt: Tupla (prefijo de sistema, contenido) de _build_prompt
         
-        Returns:
-            Nivel de triage (01, 02, 03, 07)
-        """
-        # Buscar patrones como "Nivel de Triage: 01" o "Triage: 02"
-        patterns = [
-            r"Nivel de Triage:\s*(\d{2})",
-            r"Triage:\s*(\d{2})",
-            r"Nivel:\s*(\d{2})",
-            r"\b(01|02|03|07)\b"
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, response_text, re.IGNORECASE)
-            if match:
-                nivel = match.group(1)
-                if nivel in ["01", "02", "03", "07"]:
-                    return nivel
-        
-        # Si no se encuentra, retornar nivel por defecto
-        return "03"
+        Yields:
+            Fragmentos de texto de la respuesta
+        """
+        model_name = getattr(self.model, "model_name", config.GEMINI_MODEL)
+        key = None
+        if self.cache is not None:
+            key = TriageCache.make_key("\n\n".join(prompt), model_name)
+            cached = self.cache.get(key)
+            if cached is not None:
+                METRICS.inc("triage_cache_hits_total")
+                yield cached
+                return
+            METRICS.inc("triage_cache_misses_total")
+        
+        sistema, contenido = prompt
+        partes = []
+        inicio = time.perf_counter()
+        try:
+            for chunk in self.model.generate_content(contenido, stream=True, system=sistema):
+                if chunk.text:
+                    partes.append(chunk.text)
+                    yield chunk.text
+        except Exception:
+            METRICS.inc("triage_errors_total", modelo=model_name)
+            # Solo se cambia al modelo alternativo si aún no se emitió texto
+            if self.fallback_model is None or partes:
+                raise
+            METRICS.inc("triage_fallbacks_total", tipo="modelo_alternativo")
+            for chunk in self.fallback_model.generate_content(contenido, stream=True, system=sistema):
+                if chunk.text:
+                    partes.append(chunk.text)
+                    yield chunk.text
+            self._record_response("".join(partes))
+            return
+        
+        METRICS.observe("triage_model_call_seconds", time.perf_counter() - inicio, modelo=model_name)
+        self._record_response("".join(partes))
+        if key is not None:
+            self.cache.set(key, "".join(partes))
     
-    def _extract_reasoning(self, response_text: str) -> str:
+    def _build_result(
+        self,
+        response_text: str,
+        signos_detectados: List[str],
+        protocolo: Dict
+    ) -> Dict:
         """
-        Extrae el razonamiento médico de la respuesta
+        Construye el diccionario de resultado a partir de la respuesta del modelo
         
         Args:
             response_text: Texto de respuesta del modelo
+            signos_detectados: Signos detectados localmente en el caso
+            protocolo: Protocolo utilizado
         
         Returns:
-            Razonamiento extraído
-        """
-        # Buscar sección de razonamiento
-        patterns = [
-            r"Razonamiento:\s*(.+?)(?:\n\n|\Z)",
-            r"Explicación:\s*(.+?)(?:\n\n|\Z)",
-            r"Justificación:\s*(.+?)(?:\n\n|\Z)"
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, response_text, re.IGNORECASE | re.DOTALL)
-            if match:
-                return match.group(1).strip()
-        
-        # Si no se encuentra sección específica, retornar todo el texto
-        return response_text.strip()
+            Diccionario de resultado de clasificación
+        """
+        # Parsear la respuesta en una sola pasada
+        with METRICS.timer("triage_parse_seconds"):
+            parsed = parse_triage_response(response_text)
+        nivel_triage = parsed["nivel_triage"]
+        razonamiento = parsed["razonamiento"]
+        signos_en_respuesta = parsed["signos_alarma"]
+        
+        # Combinar signos detectados
+        todos_signos = list(set(signos_detectados + signos_en_respuesta))
+        
+        # Calcular confianza basada en la presencia de signos de alarma
+        confianza = self._calculate_confidence(nivel_triage, todos_signos, protocolo)
+        
+        return {
+            "nivel_triage": nivel_triage,
+            "signos_alarma": todos_signos,
+            "razonamiento": razonamiento,
+            "confianza": confianza,
+            "respuesta_completa": response_text
+        }
     
-    def _extract_alarm_signs_from_response(self, response_text: str) -> List[str]:
+    def _local_fallback(
+        self,
+        caso_clinico: str,
+        sintoma_principal: str,
+        protocolo: Optional[Dict],
+        signos_detectados: List[str],
+        error: Exception
+    ) -> Dict:
         """
-        Extrae signos de alarma mencionados en la respuesta
+        Clasificación local cuando el modelo no responde (circuito abierto, plazo o error)
+        
+        Usa las reglas del protocolo sin umbral de confianza y, si ninguna aplica,
+        el número de signos de alarma. Nunca asigna 03 si hay signos de alarma.
+        
+        Returns:
+            Diccionario de resultado marcado como clasificación de respaldo
+        """
+        METRICS.inc("triage_fallbacks_total", tipo="local")
+        aviso = f"Modelo no disponible ({str(error)}); clasificación local de respaldo, verificar manualmente."
+        resultado = (self.rule_engine or TriageRuleEngine()).evaluate(
+            caso_clinico, sintoma_principal, protocolo, signos_detectados, min_confidence=0.0
+        )
+        if resultado is not None:
+            resultado["razonamiento"] = f"{aviso} {resultado['razonamiento']}"
+            resultado["confianza"] = min(resultado["confianza"], 0.6)
+            return resultado
+        
+        n_signos = len(signos_detectados)
+        nivel = "01" if n_signos >= 3 else "02" if n_signos else "03"
+        lista = "\n".join(f"- {s}" for s in signos_detectados) if signos_detectados else "- Ninguno"
+        razonamiento = f"{aviso} {n_signos} signos de alarma detectados en el caso."
+        return {
+            "nivel_triage": nivel,
+            "signos_alarma": list(signos_detectados),
+            "razonamiento": razonamiento,
+            "confianza": 0.3,
+            "respuesta_completa": (
+                f"Nivel de Triage: {nivel}\n"
+                f"Signos de Alarma Detectados:\n{lista}\n\n"
+                f"Razonamiento: {razonamiento}"
+            )
+        }
+    
+    def _error_result(self, error: Exception) -> Dict:
+        """
+        Resultado por defecto cuando la clasificación falla
         
         Args:
-            response_text: Texto de respuesta del modelo
+            error: Excepción capturada
         
         Returns:
-            Lista de signos de alarma
+            Diccionario de resultado con nivel por defecto
+        """
+        return {
+            "nivel_triage": "03",  # Nivel por defecto en caso de error
+            "signos_alarma": [],
+            "razonamiento": f"Error en clasificación: {str(error)}",
+            "confianza": 0.0,
+            "respuesta_completa": ""
+        }
+    
+    def detect_alarm_signs(self, texto: str, protocolo: Optional[Dict] = None) -> List[str]:
         """
-        # Buscar sección de signos de alarma
-        pattern = r"Signos de Alarma Detectados:\s*(.+?)(?:\n\n|\n[A-Z]|\Z)"
-        match = re.search(pattern, response_text, re.IGNORECASE | re.DOTALL)
+        Detecta signos de alarma en el texto del caso clínico
+        
+        Ignora tildes, respeta límites de palabra y descarta signos negados
+        ("niega disnea", "sin vómito").
         
-        if match:
-            signos_text = match.group(1)
-            # Extraer items de lista
-            signos = re.findall(r"[-•]\s*(.+?)(?:\n|$)", signos_text)
-            return [s.strip() for s in signos if s.strip()]
+        Args:
+            texto: Texto a analizar
+            protocolo: Protocolo cuyos signos_alarma se detectan además de los globales
         
-        return []
+        Returns:
+            Lista de signos de alarma detectados
+        """
+        if protocolo:
+            return self.alarm_matcher.detect(texto, self.alarm_matcher.register_protocol(protocolo))
+        return self.alarm_matcher.detect(texto)
     
     def _calculate_confidence(
         self,
@@ -242,27 +481,133 @@ class MedEngine:
     
     def batch_classify(
         self,
-        casos: List[Dict]
+        casos: List[Dict],
+        max_concurrency: Optional[int] = None,
+        timeout_s: Optional[float] = None,
+        max_retries: Optional[int] = None
     ) -> List[Dict]:
         """
-        Clasifica múltiples casos en batch
+        Clasifica múltiples casos en batch con solicitudes concurrentes
         
         Args:
             casos: Lista de diccionarios con {caso_clinico, sintoma_principal, protocolo}
+            max_concurrency: Solicitudes simultáneas al modelo (default: config)
+            timeout_s: Timeout por solicitud en segundos (default: config)
+            max_retries: Reintentos por caso tras un error o timeout (default: config)
+        
+        Se puede llamar también desde código con un event loop en ejecución
+        (Jupyter, servidores async): en ese caso el batch corre en un loop
+        propio dentro de un thread aparte. Desde código async conviene usar
+        directamente abatch_classify.
         
         Returns:
-            Lista de resultados de clasificación
-        """
-        resultados = []
-        for caso in casos:
-            resultado = self.classify_triage(
-                caso["caso_clinico"],
-                caso["sintoma_principal"],
-                caso["protocolo"]
-            )
-            resultados.append(resultado)
+            Lista de resultados de clasificación, en el mismo orden de entrada
+        """
+        corrutina = self.abatch_classify(casos, max_concurrency, timeout_s, max_retries)
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(corrutina)
+        # asyncio.run no puede anidarse en un loop activo
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="batch") as executor:
+            return executor.submit(asyncio.run, corrutina).result()
+    
+    async def abatch_classify(
+        self,
+        casos: List[Dict],
+        max_concurrency: Optional[int] = None,
+        timeout_s: Optional[float] = None,
+        max_retries: Optional[int] = None
+    ) -> List[Dict]:
+        """
+        Versión asíncrona de batch_classify
+        
+        Mantiene hasta max_concurrency llamadas en vuelo; cada llamada bloqueante
+        al modelo corre en un pool de threads.
+        
+        Args:
+            casos: Lista de diccionarios con {caso_clinico, sintoma_principal, protocolo}
+            max_concurrency: Solicitudes simultáneas al modelo (default: config)
+            timeout_s: Timeout por solicitud en segundos (default: config)
+            max_retries: Reintentos por caso tras un error o timeout (default: config)
+        
+        Returns:
+            Lista de resultados de clasificación, en el mismo orden de entrada
+        """
+        max_concurrency = max_concurrency or config.BATCH_MAX_CONCURRENCY
+        timeout_s = timeout_s or config.BATCH_REQUEST_TIMEOUT_S
+        max_retries = config.BATCH_MAX_RETRIES if max_retries is None else max_retries
+        
+        semaphore = asyncio.Semaphore(max_concurrency)
+        # Las llamadas que exceden el timeout siguen ocupando su thread hasta
+        # terminar, por eso el pool se dimensiona para todos los intentos posibles
+        executor = ThreadPoolExecutor(max_workers=max_concurrency * (max_retries + 1))
+        
+        try:
+            tareas = [
+                self._classify_with_retries(caso, semaphore, executor, timeout_s, max_retries)
+                for caso in casos
+            ]
+            return await asyncio.gather(*tareas)
+        finally:
+            executor.shutdown(wait=False)
+    
+    async def _classify_with_retries(
+        self,
+        caso: Dict,
+        semaphore: asyncio.Semaphore,
+        executor: ThreadPoolExecutor,
+        timeout_s: float,
+        max_retries: int
+    ) -> Dict:
+        """
+        Clasifica un caso con timeout por intento y reintentos con backoff exponencial
+        
+        Args:
+            caso: Diccionario con {caso_clinico, sintoma_principal, protocolo}
+            semaphore: Semáforo que limita las solicitudes en vuelo
+            executor: Pool de threads para las llamadas bloqueantes
+            timeout_s: Timeout por intento
+            max_retries: Reintentos permitidos
         
-        return resultados
+        Returns:
+            Diccionario de resultado de clasificación
+        """
+        loop = asyncio.get_running_loop()
+        signos_detectados = self.detect_alarm_signs(caso["caso_clinico"], caso["protocolo"])
+        resultado_reglas = self._fast_path(
+            caso["caso_clinico"], caso["sintoma_principal"], caso["protocolo"], signos_detectados
+        )
+        if resultado_reglas is not None:
+            return resultado_reglas
+        
+        prompt = self._build_prompt(caso["caso_clinico"], caso["protocolo"], caso["sintoma_principal"])
+        
+        ultimo_error = None
+        for intento in range(max_retries + 1):
+            if intento > 0:
+                # Backoff exponencial con jitter completo
+                espera = config.BATCH_BACKOFF_BASE_S * (2 ** (intento - 1))
+                await asyncio.sleep(random.uniform(0, espera))
+            
+            try:
+                async with semaphore:
+                    response_text = await asyncio.wait_for(
+                        loop.run_in_executor(executor, self._generate, prompt),
+                        timeout=timeout_s
+                    )
+                return self._build_result(response_text, signos_detectados, caso["protocolo"])
+            except asyncio.TimeoutError:
+                ultimo_error = TimeoutError(f"Timeout de {timeout_s}s excedido")
+            except Exception as e:
+                ultimo_error = e
+        
+        if config.TRIAGE_LOCAL_FALLBACK_ENABLED:
+            return self._local_fallback(
+                caso["caso_clinico"], caso["sintoma_principal"], caso["protocolo"],
+                signos_detectados, ultimo_error
+            )
+        return self._error_result(ultimo_error)
 
 
 @st.cache_resource
@@ -0,0 +1,241 @@
+"""
+Métricas de latencia y throughput del sistema
+Histogramas (con ventana de muestras para p50/p95/p99) y contadores con
+etiquetas, exportables en formato de texto de Prometheus por HTTP o a archivo.
+Las métricas se registran en el proceso del servidor y son compartidas por
+todas las sesiones.
+"""
+import bisect
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+import config
+
+
+# Límites de los buckets de latencia (segundos) y de tokens
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+TOKEN_BUCKETS = (50, 100, 250, 500, 1000, 2000, 4000, 8000, 16000)
+
+# Métricas conocidas: nombre -> (tipo, descripción, buckets)
+METRIC_DEFINITIONS = {
+    "triage_classify_seconds": ("histogram", "Duración total de classify_triage", LATENCY_BUCKETS),
+    "triage_prompt_build_seconds": ("histogram", "Armado del prompt de triage", LATENCY_BUCKETS),
+    "triage_model_call_seconds": ("histogram", "Llamada al modelo (incluye plazos y hedging)", LATENCY_BUCKETS),
+    "triage_parse_seconds": ("histogram", "Parseo de la respuesta del modelo", LATENCY_BUCKETS),
+    "triage_prompt_tokens": ("histogram", "Tokens estimados del prompt", TOKEN_BUCKETS),
+    "triage_response_tokens": ("histogram", "Tokens estimados de la respuesta", TOKEN_BUCKETS),
+    "triage_cache_hits_total": ("counter", "Respuestas servidas desde la caché", None),
+    "triage_cache_misses_total": ("counter", "Consultas a la caché sin respuesta", None),
+    "triage_fast_path_total": ("counter", "Casos resueltos por reglas locales sin LLM", None),
+    "triage_fallbacks_total": ("counter", "Respuestas del modelo alternativo o de la clasificación local", None),
+    "triage_errors_total": ("counter", "Errores al llamar al modelo", None),
+    "triage_tokens_total": ("counter", "Tokens estimados enviados y recibidos", None),
+    "llm_circuit_rejections_total": ("counter", "Llamadas rechazadas con el circuito abierto", None),
+    "llm_deadline_exceeded_total": ("counter", "Llamadas que superaron su plazo", None),
+    "llm_hedged_requests_total": ("counter", "Solicitudes duplicadas por latencia alta", None),
+    "forecast_fit_seconds": ("histogram", "Ajuste del modelo de predicción", LATENCY_BUCKETS),
+    "forecast_predict_seconds": ("histogram", "Predicción del modelo", LATENCY_BUCKETS),
+    "forecast_by_level_seconds": ("histogram", "Predicción por nivel de triage (todas las series)", LATENCY_BUCKETS),
+    "protocol_excel_load_seconds": ("histogram", "Carga del Excel de protocolos", LATENCY_BUCKETS),
+    "protocol_snapshot_load_seconds": ("histogram", "Carga del snapshot compilado de protocolos", LATENCY_BUCKETS),
+}
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Histograma acumulado con una ventana de las últimas muestras para percentiles"""
+
+    def __init__(self, buckets: Tuple[float, ...], window: int = 1024):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # último: +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.samples = deque(maxlen=window)
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        self.samples.append(value)
+
+    def percentiles(self, qs=(50, 95, 99)) -> Dict[str, Optional[float]]:
+        if not self.samples:
+            return {f"p{q}": None for q in qs}
+        import numpy as np
+
+        valores = np.percentile(np.fromiter(self.samples, dtype=float), qs)
+        return {f"p{q}": float(v) for q, v in zip(qs, valores)}
+
+
+class MetricsRegistry:
+    """Registro de histogramas y contadores con etiquetas"""
+
+    def __init__(self):
+        self._histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(labels: Dict[str, str]) -> LabelKey:
+        return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def observe(self, name: str, value: float, **labels):
+        """Registra una muestra en un histograma"""
+        buckets = METRIC_DEFINITIONS.get(name, ("histogram", "", LATENCY_BUCKETS))[2] or LATENCY_BUCKETS
+        key = self._key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            if key not in series:
+                series[key] = Histogram(buckets)
+            series[key].observe(value)
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        """Incrementa un contador"""
+        key = self._key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """Mide la duración del bloque y la registra en el histograma name"""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - inicio, **labels)
+
+    def summary(self) -> List[Dict]:
+        """
+        Resumen para la interfaz
+
+        Returns:
+            Lista de {metrica, etiquetas, tipo, n, media, p50, p95, p99} o {..., valor} para contadores
+        """
+        filas = []
+        with self._lock:
+            for name, series in sorted(self._histograms.items()):
+                for key, hist in series.items():
+                    filas.append({
+                        "metrica": name,
+                        "etiquetas": ", ".join(f"{k}={v}" for k, v in key),
+                        "tipo": "histogram",
+                        "n": hist.count,
+                        "media": hist.sum / hist.count if hist.count else None,
+                        **hist.percentiles()
+                    })
+            for name, series in sorted(self._counters.items()):
+                for key, valor in series.items():
+                    filas.append({
+                        "metrica": name,
+                        "etiquetas": ", ".join(f"{k}={v}" for k, v in key),
+                        "tipo": "counter",
+                        "valor": valor
+                    })
+        return filas
+
+    def render_prometheus(self) -> str:
+        """Exposición en formato de texto de Prometheus (versión 0.0.4)"""
+        lineas = []
+        with self._lock:
+            for name, series in sorted(self._histograms.items()):
+                lineas.append(f"# HELP {name} {METRIC_DEFINITIONS.get(name, ('', name))[1]}")
+                lineas.append(f"# TYPE {name} histogram")
+                for key, hist in series.items():
+                    acumulado = 0
+                    for limite, n in zip(list(hist.buckets) + ["+Inf"], hist.counts):
+                        acumulado += n
+                        lineas.append(f"{name}_bucket{_labels(key, le=limite)} {acumulado}")
+                    lineas.append(f"{name}_sum{_labels(key)} {hist.sum}")
+                    lineas.append(f"{name}_count{_labels(key)} {hist.count}")
+            for name, series in sorted(self._counters.items()):
+                lineas.append(f"# HELP {name} {METRIC_DEFINITIONS.get(name, ('', name))[1]}")
+                lineas.append(f"# TYPE {name} counter")
+                for key, valor in series.items():
+                    lineas.append(f"{name}{_labels(key)} {valor}")
+        return "\n".join(lineas) + "\n"
+
+    def write_file(self, path: Optional[str] = None) -> str:
+        """
+        Escribe la exposición de Prometheus en un archivo (node_exporter textfile)
+
+        Args:
+            path: Ruta de salida (default: config.METRICS_EXPORT_PATH)
+
+        Returns:
+            Ruta escrita
+        """
+        path = path or config.METRICS_EXPORT_PATH
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.render_prometheus())
+        os.replace(tmp_path, path)
+        return path
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+
+def _labels(key: LabelKey, **extra) -> str:
+    pares = list(key) + [(k, str(v)) for k, v in extra.items()]
+    if not pares:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pares) + "}"
+
+
+# Registro compartido por todo el proceso
+METRICS = MetricsRegistry()
+
+_exporters_started = False
+_exporters_lock = threading.Lock()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") != "/metrics":
+            self.send_response(404)
+            self.end_headers()
+            return
+        data = METRICS.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_exporters():
+    """
+    Inicia (una sola vez por proceso) el endpoint HTTP /metrics si
+    config.METRICS_PROMETHEUS_PORT > 0 y el volcado periódico a archivo si
+    config.METRICS_EXPORT_INTERVAL_S > 0
+    """
+    global _exporters_started
+    with _exporters_lock:
+        if _exporters_started:
+            return
+        _exporters_started = True
+
+    if config.METRICS_PROMETHEUS_PORT > 0:
+        server = ThreadingHTTPServer(("0.0.0.0", config.METRICS_PROMETHEUS_PORT), _MetricsHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True, name="metrics-http").start()
+
+    if config.METRICS_EXPORT_INTERVAL_S > 0:
+        def volcar():
+            while True:
+                time.sleep(config.METRICS_EXPORT_INTERVAL_S)
+                METRICS.write_file()
+
+        threading.Thread(target=volcar, daemon=True, name="metrics-file").start()
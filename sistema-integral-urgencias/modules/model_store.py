@@ -0,0 +1,167 @@
+"""
+Almacén local de modelos Prophet entrenados
+Los modelos se serializan en JSON y se indexan por hash de los datos de
+entrenamiento y de los parámetros, para reutilizarlos o hacer warm-start.
+"""
+import hashlib
+import json
+import os
+import threading
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+
+
+class ModelStore:
+    """Almacén de modelos Prophet en disco"""
+
+    def __init__(self, store_dir: str):
+        """
+        Args:
+            store_dir: Directorio donde se guardan los modelos
+        """
+        self.store_dir = store_dir
+        os.makedirs(store_dir, exist_ok=True)
+
+    @staticmethod
+    def hash_data(prophet_df: pd.DataFrame) -> str:
+        """
+        Hash del contenido de un DataFrame de entrenamiento
+
+        Args:
+            prophet_df: DataFrame con columnas ds, y y regresores
+
+        Returns:
+            Hash SHA-256 hexadecimal
+        """
+        row_hashes = pd.util.hash_pandas_object(prophet_df, index=False).values
+        return hashlib.sha256(row_hashes.tobytes()).hexdigest()
+
+    @staticmethod
+    def hash_params(params: Dict, regresores: List[str], target_col: str) -> str:
+        """
+        Hash de la configuración del modelo
+
+        Args:
+            params: Parámetros de Prophet (config.PROPHET_PARAMS)
+            regresores: Regresores agregados al modelo
+            target_col: Columna objetivo
+
+        Returns:
+            Hash SHA-256 hexadecimal
+        """
+        payload = json.dumps(
+            {"params": params, "regresores": sorted(regresores), "target": target_col},
+            sort_keys=True
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _model_path(self, params_key: str, data_key: str) -> str:
+        return os.path.join(self.store_dir, f"{params_key[:16]}_{data_key[:16]}.json")
+
+    def _latest_path(self, params_key: str, serie: str = "") -> str:
+        # Un puntero por serie: las series por nivel y sede comparten parámetros y
+        # columna objetivo, y con un solo puntero cada una pisaría a las demás
+        if not serie:
+            return os.path.join(self.store_dir, f"{params_key[:16]}_latest.json")
+        serie_key = hashlib.sha256(serie.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.store_dir, f"{params_key[:16]}_{serie_key}_latest.json")
+
+    def load(self, params_key: str, data_key: str) -> Optional["Prophet"]:
+        """
+        Carga un modelo entrenado con exactamente estos datos y parámetros
+
+        Returns:
+            Modelo Prophet o None si no existe
+        """
+        from prophet.serialize import model_from_json
+
+        path = self._model_path(params_key, data_key)
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            return model_from_json(f.read())
+
+    def save(self, params_key: str, prophet_df: pd.DataFrame, model: "Prophet", serie: str = ""):
+        """
+        Guarda un modelo entrenado y lo marca como el más reciente de su serie
+
+        Args:
+            params_key: Hash de parámetros (hash_params)
+            prophet_df: Datos con los que se entrenó
+            model: Modelo entrenado
+            serie: Identidad de la serie (por ejemplo "sede|nivel")
+        """
+        from prophet.serialize import model_to_json
+
+        data_key = self.hash_data(prophet_df)
+        self._write_atomic(self._model_path(params_key, data_key), model_to_json(model))
+        latest = {
+            "data_key": data_key,
+            "n_rows": len(prophet_df),
+            "last_ds": str(prophet_df["ds"].max())
+        }
+        self._write_atomic(self._latest_path(params_key, serie), json.dumps(latest))
+
+    def find_warm_start(self, params_key: str, prophet_df: pd.DataFrame, serie: str = "") -> Optional[Dict]:
+        """
+        Busca un modelo previo de la serie entrenado con un prefijo de estos
+        datos (solo se agregaron días nuevos) y retorna sus parámetros como
+        inicialización
+
+        Args:
+            params_key: Hash de parámetros (hash_params)
+            prophet_df: Datos nuevos de entrenamiento
+            serie: Identidad de la serie (la misma usada en save)
+
+        Returns:
+            Diccionario init para Prophet.fit o None
+        """
+        latest_path = self._latest_path(params_key, serie)
+        if not os.path.exists(latest_path):
+            return None
+        with open(latest_path, encoding="utf-8") as f:
+            latest = json.load(f)
+
+        n_rows = latest["n_rows"]
+        if n_rows >= len(prophet_df):
+            return None
+        if self.hash_data(prophet_df.iloc[:n_rows]) != latest["data_key"]:
+            return None
+
+        previous = self.load(params_key, latest["data_key"])
+        if previous is None:
+            return None
+        return warm_start_params(previous)
+
+    @staticmethod
+    def _write_atomic(path: str, content: str):
+        # Temporal propio del thread: varias sesiones comparten el almacén
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+
+def warm_start_params(model: "Prophet") -> Dict:
+    """
+    Extrae los parámetros ajustados de un modelo para inicializar otro
+
+    Args:
+        model: Modelo Prophet entrenado
+
+    Returns:
+        Diccionario con k, m, sigma_obs, delta y beta
+    """
+    params = {}
+    for pname in ["k", "m", "sigma_obs"]:
+        if model.mcmc_samples == 0:
+            params[pname] = model.params[pname][0][0]
+        else:
+            params[pname] = np.mean(model.params[pname])
+    for pname in ["delta", "beta"]:
+        if model.mcmc_samples == 0:
+            params[pname] = model.params[pname][0]
+        else:
+            params[pname] = np.mean(model.params[pname], axis=0)
+    return params
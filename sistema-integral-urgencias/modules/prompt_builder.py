@@ -0,0 +1,176 @@
+"""
+Construcción de prompts de triage con presupuesto de tokens
+El prefijo de sistema (TRIAGE_SYSTEM_PROMPT + formato de respuesta) se arma una
+sola vez, es idéntico en todas las llamadas y se envía como instrucción de
+sistema del backend; del protocolo solo se envían las filas relacionadas con el
+caso, compactadas y dentro de un presupuesto de tokens.
+"""
+import math
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+import config
+from modules.protocol_search import analyze
+
+
+# Palabras y signos de puntuación para la estimación de tokens
+_TOKEN_PIECE_PATTERN = re.compile(r"\w+|[^\w\s]")
+# Código de nivel dentro de una fila ("01 - ...", "Nivel 02")
+_LEVEL_CODE_PATTERN = re.compile(r"\b(01|02|03|07)\b")
+# Caracteres medios por token de subpalabra en texto en español
+CHARS_PER_TOKEN = 4
+
+
+def count_tokens(text: str) -> int:
+    """
+    Estima localmente los tokens de un texto (sin llamar a la API)
+
+    Cada palabra cuenta como ceil(len / CHARS_PER_TOKEN) tokens y cada signo de
+    puntuación como uno; la estimación queda levemente por encima del conteo
+    real de tokenizadores de subpalabras.
+
+    Args:
+        text: Texto a medir
+
+    Returns:
+        Número estimado de tokens
+    """
+    return sum(
+        math.ceil(len(pieza) / CHARS_PER_TOKEN) if pieza[0].isalnum() or pieza[0] == "_" else 1
+        for pieza in _TOKEN_PIECE_PATTERN.findall(text)
+    )
+
+
+@lru_cache(maxsize=8192)
+def _row_terms(fila: str) -> frozenset:
+    """Términos de una fila del protocolo (las filas se repiten entre llamadas)"""
+    return frozenset(analyze(fila))
+
+
+class PromptBuilder:
+    """Arma el prompt de triage con prefijo reutilizable y protocolo recortado"""
+
+    def __init__(self, max_protocol_tokens: Optional[int] = None, response_format: Optional[str] = None):
+        """
+        Args:
+            max_protocol_tokens: Presupuesto para las filas del protocolo
+                (default: config.TRIAGE_PROMPT_MAX_PROTOCOL_TOKENS)
+            response_format: "texto" o "json" (default: config.TRIAGE_RESPONSE_FORMAT)
+        """
+        self.max_protocol_tokens = max_protocol_tokens or config.TRIAGE_PROMPT_MAX_PROTOCOL_TOKENS
+        response_format = response_format or config.TRIAGE_RESPONSE_FORMAT
+
+        formato = f"\n{config.TRIAGE_JSON_FORMAT_PROMPT}" if response_format == "json" else ""
+        self.system_prefix = f"{config.TRIAGE_SYSTEM_PROMPT}{formato}"
+        self.prefix_tokens = count_tokens(self.system_prefix)
+
+    def select_rows(self, caso_clinico: str, protocolo: Optional[Dict]) -> Tuple[List[str], int]:
+        """
+        Elige las filas del protocolo más relacionadas con el caso
+
+        Las filas con código de nivel (criterios de triage) tienen prioridad; las
+        que no comparten términos con el caso se omiten salvo que ninguna coincida.
+
+        Args:
+            caso_clinico: Descripción del caso
+            protocolo: Protocolo de ProtocolLoader
+
+        Returns:
+            Tupla (filas elegidas en su orden original, total de filas del protocolo)
+        """
+        filas = self._protocol_rows(protocolo)
+        if not filas:
+            return [], 0
+
+        # Sin filas repetidas y con un largo máximo por fila
+        max_chars = config.TRIAGE_PROMPT_MAX_ROW_CHARS
+        filas = [
+            f if len(f) <= max_chars else f[:max_chars].rstrip() + "…"
+            for f in dict.fromkeys(filas)
+        ]
+
+        terminos_caso = set(analyze(caso_clinico))
+        puntajes = []
+        for fila in filas:
+            puntaje = len(terminos_caso.intersection(_row_terms(fila)))
+            if _LEVEL_CODE_PATTERN.search(fila):
+                puntaje += 1
+            puntajes.append(puntaje)
+
+        candidatas = [i for i, puntaje in enumerate(puntajes) if puntaje > 0] or list(range(len(filas)))
+        candidatas.sort(key=lambda i: (-puntajes[i], i))
+
+        elegidas, usados = [], 0
+        for i in candidatas:
+            tokens = count_tokens(filas[i]) + 1
+            if usados + tokens > self.max_protocol_tokens:
+                continue
+            elegidas.append(i)
+            usados += tokens
+
+        return [filas[i] for i in sorted(elegidas)], len(filas)
+
+    @staticmethod
+    def _protocol_rows(protocolo: Optional[Dict]) -> List[str]:
+        """Filas compactas del protocolo (o sus listas si no hay tabla original)"""
+        if not protocolo:
+            return []
+        filas = protocolo.get("filas")
+        if filas:
+            return list(filas)
+
+        filas = []
+        for clave, etiqueta in [
+            ("criterios_triage", "Criterio"),
+            ("signos_alarma", "Signo de alarma"),
+            ("preguntas", "Pregunta")
+        ]:
+            filas.extend(f"{etiqueta}: {' '.join(str(v).split())}" for v in protocolo.get(clave, []))
+        return filas
+
+    def build_protocol_context(self, caso_clinico: str, protocolo: Optional[Dict], sintoma_principal: str) -> str:
+        """
+        Sección del protocolo para el prompt
+
+        Returns:
+            Texto con el nombre del protocolo y las filas elegidas
+        """
+        filas, total = self.select_rows(caso_clinico, protocolo)
+        if not filas:
+            return f"PROTOCOLO APLICABLE: {sintoma_principal}\nNo disponible"
+
+        lineas = [f"PROTOCOLO APLICABLE: {sintoma_principal}"]
+        lineas.extend(f"- {fila}" for fila in filas)
+        if len(filas) < total:
+            lineas.append(f"({len(filas)} de {total} filas; se omitieron las no relacionadas con el caso)")
+        return "\n".join(lineas)
+
+    def build_parts(self, caso_clinico: str, protocolo: Optional[Dict], sintoma_principal: str) -> Tuple[str, str]:
+        """
+        Prompt separado en prefijo de sistema (constante) y parte específica del caso
+
+        MedEngine envía el prefijo como instrucción de sistema (system_instruction
+        en Gemini/Vertex, mensaje "system" en backends compatibles con OpenAI).
+
+        Returns:
+            Tupla (system_prefix, contenido del usuario)
+        """
+        contenido = f"""{self.build_protocol_context(caso_clinico, protocolo, sintoma_principal)}
+
+CASO CLÍNICO:
+{caso_clinico}
+
+Por favor, clasifica este caso siguiendo el formato especificado.
+"""
+        return self.system_prefix, contenido
+
+    def build(self, caso_clinico: str, protocolo: Optional[Dict], sintoma_principal: str) -> str:
+        """
+        Prompt completo en un solo texto (prefijo de sistema + protocolo + caso),
+        para modelos sin instrucción de sistema y para medir tokens
+
+        Returns:
+            Prompt en un solo texto
+        """
+        prefijo, contenido = self.build_parts(caso_clinico, protocolo, sintoma_principal)
+        return f"{prefijo}\n\n{contenido}"
@@ -1,10 +1,81 @@
 """
 Módulo para carga y gestión de protocolos médicos desde Excel
 """
-import pandas as pd
+import hashlib
+import io
+import json
+import os
+import pickle
+import tempfile
 import streamlit as st
 from typing import Dict, List, Optional
+import time
 import config
+from modules import protocol_store
+from modules.metrics import METRICS
+from modules.protocol_search import ProtocolSearchIndex
+
+
+# Versión del formato de caché; incrementar si cambia _parse_protocol
+PROTOCOL_CACHE_VERSION = 2
+
+
+class Protocol(dict):
+    """
+    Protocolo estructurado con vistas de texto perezosas
+    
+    "contenido_completo" (df.to_string()) y "filas" (filas compactas para el
+    prompt) solo se construyen la primera vez que se consultan.
+    """
+    
+    def __init__(self, *args, df: Optional["pd.DataFrame"] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._df = df
+    
+    def __missing__(self, key):
+        if key == "contenido_completo" and self._df is not None:
+            self[key] = self._df.to_string()
+            return self[key]
+        if key == "filas" and self._df is not None:
+            self[key] = compact_rows(self._df)
+            return self[key]
+        raise KeyError(key)
+    
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+
+def compact_rows(df: "pd.DataFrame") -> List[str]:
+    """
+    Convierte cada fila de la pestaña en texto compacto "Columna: valor; ..."
+    
+    A diferencia de to_string() no agrega relleno ni celdas vacías.
+    
+    Args:
+        df: DataFrame de una pestaña del Excel
+    
+    Returns:
+        Lista de filas no vacías
+    """
+    columnas = [
+        "" if str(col).startswith("Unnamed") else " ".join(str(col).split())
+        for col in df.columns
+    ]
+    filas = []
+    for valores in df.itertuples(index=False, name=None):
+        celdas = []
+        for columna, valor in zip(columnas, valores):
+            if valor is None or valor != valor:  # None / NaN
+                continue
+            texto = " ".join(str(valor).split())
+            if texto:
+                celdas.append(f"{columna}: {texto}" if columna else texto)
+        if celdas:
+            filas.append("; ".join(celdas))
+    return filas
 
 
 class ProtocolLoader:
@@ -13,34 +84,145 @@ class ProtocolLoader:
     def __init__(self):
         self.protocols = {}
         self.sheet_names = []
+        self.snapshot_version = None
+        self.search_index = ProtocolSearchIndex()
+    
+    def load_snapshot(self, store_dir: Optional[str] = None, version: Optional[str] = None) -> Dict[str, Dict]:
+        """
+        Carga el snapshot compilado activo (sin pandas ni openpyxl)
+        
+        Args:
+            store_dir: Directorio del almacén (default: config.PROTOCOL_STORE_DIR)
+            version: Versión publicada a cargar (default: la activa)
+        
+        Returns:
+            Diccionario con {sintoma: protocolo}, vacío si no hay snapshot publicado
+        """
+        try:
+            with METRICS.timer("protocol_snapshot_load_seconds"):
+                snapshot = protocol_store.load_snapshot(store_dir, version)
+        except Exception as e:
+            st.error(f"Error al cargar el snapshot de protocolos: {str(e)}")
+            return {}
+        
+        if snapshot is None:
+            return {}
+        
+        self.protocols = {
+            sintoma: Protocol(protocolo) for sintoma, protocolo in snapshot["protocolos"].items()
+        }
+        self.sheet_names = list(self.protocols.keys())
+        self.search_index = ProtocolSearchIndex.from_dict(snapshot["indice"])
+        self.snapshot_version = snapshot["version"]
+        return self.protocols
+    
+    def refresh_snapshot(self, store_dir: Optional[str] = None) -> bool:
+        """
+        Recarga el snapshot si se publicó una versión nueva (hot-swap)
+        
+        Args:
+            store_dir: Directorio del almacén (default: config.PROTOCOL_STORE_DIR)
+        
+        Returns:
+            True si se cargó una versión distinta
+        """
+        current = protocol_store.read_current_version(store_dir)
+        if current is None or current["version"] == self.snapshot_version:
+            return False
+        return bool(self.load_snapshot(store_dir))
     
-    def load_from_excel(self, excel_file) -> Dict[str, pd.DataFrame]:
+    def load_from_excel(self, excel_file) -> Dict[str, Dict]:
         """
         Carga protocolos desde un archivo Excel con múltiples pestañas
         
+        El libro se parsea una sola vez (todas las pestañas juntas) y el resultado
+        se guarda en disco indexado por el hash del contenido del archivo.
+        
         Args:
-            excel_file: Archivo Excel cargado con st.file_uploader
+            excel_file: Archivo Excel cargado con st.file_uploader (o ruta)
         
         Returns:
-            Diccionario con {nombre_pestaña: DataFrame}
+            Diccionario con {nombre_pestaña: protocolo}
         """
         try:
-            # Leer todas las pestañas del Excel
-            excel_data = pd.ExcelFile(excel_file)
-            self.sheet_names = excel_data.sheet_names
+            inicio = time.perf_counter()
+            data = self._read_bytes(excel_file)
+            cache_path = self._cache_path(data)
             
-            # Cargar cada pestaña como un protocolo
-            for sheet_name in self.sheet_names:
-                df = pd.read_excel(excel_file, sheet_name=sheet_name)
-                self.protocols[sheet_name] = self._parse_protocol(sheet_name, df)
+            protocols = self._load_cache(cache_path)
+            origen = "cache" if protocols is not None else "excel"
+            if protocols is None:
+                import pandas as pd
+                
+                # Leer todas las pestañas del Excel en un solo parseo
+                sheets = pd.read_excel(io.BytesIO(data), sheet_name=None)
+                protocols = {
+                    sheet_name: self._parse_protocol(sheet_name, df)
+                    for sheet_name, df in sheets.items()
+                }
+                self._save_cache(cache_path, protocols)
             
+            self.protocols = protocols
+            self.sheet_names = list(protocols.keys())
+            self.snapshot_version = None
+            self.search_index = ProtocolSearchIndex.build(protocols)
+            METRICS.observe("protocol_excel_load_seconds", time.perf_counter() - inicio, origen=origen)
             return self.protocols
         
         except Exception as e:
             st.error(f"Error al cargar el archivo Excel: {str(e)}")
             return {}
     
-    def _parse_protocol(self, sheet_name: str, df: pd.DataFrame) -> Dict:
+    @staticmethod
+    def _read_bytes(excel_file) -> bytes:
+        """Obtiene el contenido del archivo (UploadedFile, objeto tipo archivo o ruta)"""
+        if hasattr(excel_file, "getvalue"):
+            return excel_file.getvalue()
+        if hasattr(excel_file, "read"):
+            return excel_file.read()
+        with open(excel_file, "rb") as f:
+            return f.read()
+    
+    @staticmethod
+    def _cache_path(data: bytes) -> Optional[str]:
+        """Ruta de caché según el hash del archivo y la configuración de columnas"""
+        if not config.PROTOCOL_CACHE_DIR:
+            return None
+        digest = hashlib.sha256(data)
+        digest.update(json.dumps(config.PROTOCOL_COLUMNS, sort_keys=True).encode("utf-8"))
+        digest.update(str(PROTOCOL_CACHE_VERSION).encode("utf-8"))
+        return os.path.join(config.PROTOCOL_CACHE_DIR, f"{digest.hexdigest()}.pkl")
+    
+    @staticmethod
+    def _load_cache(cache_path: Optional[str]) -> Optional[Dict]:
+        """Carga protocolos parseados desde la caché en disco"""
+        if cache_path is None or not os.path.exists(cache_path):
+            return None
+        try:
+            with open(cache_path, "rb") as f:
+                return pickle.load(f)
+        except Exception:
+            return None  # Caché corrupta: se vuelve a parsear
+    
+    @staticmethod
+    def _save_cache(cache_path: Optional[str], protocols: Dict):
+        """Guarda los protocolos parseados en disco (escritura atómica)"""
+        if cache_path is None:
+            return
+        directorio = os.path.dirname(cache_path)
+        os.makedirs(directorio, exist_ok=True)
+        # Temporal único: dos sesiones que suben el mismo libro no comparten archivo
+        with tempfile.NamedTemporaryFile(
+            "wb", dir=directorio, prefix=f"{os.path.basename(cache_path)}.", suffix=".tmp", delete=False
+        ) as f:
+            pickle.dump(protocols, f, protocol=pickle.HIGHEST_PROTOCOL)
+        try:
+            os.replace(f.name, cache_path)
+        except OSError:
+            os.remove(f.name)
+            raise
+    
+    def _parse_protocol(self, sheet_name: str, df: "pd.DataFrame") -> Dict:
         """
         Parsea una pestaña del Excel en un protocolo estructurado
         
@@ -49,31 +231,37 @@ class ProtocolLoader:
             df: DataFrame con el contenido de la pestaña
         
         Returns:
-            Diccionario con el protocolo estructurado
-        """
-        protocol = {
-            "sintoma": sheet_name,
-            "preguntas": [],
-            "signos_alarma": [],
-            "criterios_triage": [],
-            "contenido_completo": df.to_string()
-        }
+            Protocolo estructurado ("contenido_completo" se genera al consultarlo)
+        """
+        protocol = Protocol(
+            {
+                "sintoma": sheet_name,
+                "preguntas": [],
+                "signos_alarma": [],
+                "criterios_triage": [],
+                "columnas": {}
+            },
+            df=df
+        )
         
         # Intentar extraer columnas específicas si existen
         for col in df.columns:
-            col_lower = col.lower().strip()
+            col_lower = str(col).lower().strip()
             
             # Detectar columna de preguntas
             if any(keyword in col_lower for keyword in config.PROTOCOL_COLUMNS["pregunta"]):
                 protocol["preguntas"] = df[col].dropna().tolist()
+                protocol["columnas"]["preguntas"] = str(col)
             
             # Detectar columna de signos de alarma
             elif any(keyword in col_lower for keyword in config.PROTOCOL_COLUMNS["signos_alarma"]):
                 protocol["signos_alarma"] = df[col].dropna().tolist()
+                protocol["columnas"]["signos_alarma"] = str(col)
             
             # Detectar columna de criterios de triage
             elif any(keyword in col_lower for keyword in config.PROTOCOL_COLUMNS["criterio_triage"]):
                 protocol["criterios_triage"] = df[col].dropna().tolist()
+                protocol["columnas"]["criterios_triage"] = str(col)
         
         return protocol
     
@@ -98,26 +286,35 @@ class ProtocolLoader:
         """
         return list(self.protocols.keys())
     
-    def search_protocols(self, query: str) -> List[Dict]:
+    def search_protocols(self, query: str, limit: Optional[int] = None) -> List[Dict]:
         """
-        Busca protocolos que contengan el término de búsqueda
+        Busca protocolos relevantes para el término de búsqueda
         
         Args:
-            query: Término a buscar
+            query: Término a buscar (el último término puede estar incompleto)
+            limit: Máximo de resultados
         
         Returns:
-            Lista de protocolos que coinciden
+            Lista de protocolos ordenada por relevancia
+        """
+        return [hit["protocolo"] for hit in self.search(query, limit)]
+    
+    def search(self, query: str, limit: Optional[int] = None) -> List[Dict]:
         """
-        query_lower = query.lower()
-        results = []
+        Busca en el índice invertido con ranking BM25
         
-        for sintoma, protocol in self.protocols.items():
-            if query_lower in sintoma.lower():
-                results.append(protocol)
-            elif query_lower in protocol["contenido_completo"].lower():
-                results.append(protocol)
+        Args:
+            query: Término a buscar (el último término puede estar incompleto)
+            limit: Máximo de resultados
         
-        return results
+        Returns:
+            Lista de {"sintoma", "score", "campos", "protocolo"} ordenada por relevancia;
+            campos indica dónde hubo coincidencias (preguntas, signos_alarma, criterios_triage...)
+        """
+        hits = self.search_index.search(query, limit)
+        for hit in hits:
+            hit["protocolo"] = self.protocols[hit["sintoma"]]
+        return hits
     
     def get_protocol_summary(self, sintoma: str) -> str:
         """
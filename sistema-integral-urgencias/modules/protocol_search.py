@@ -0,0 +1,201 @@
+"""
+Índice invertido de protocolos con ranking BM25
+Tokeniza sin tildes, elimina stop-words y aplica un stemming ligero en español.
+El último término de la consulta se expande por prefijo (búsqueda mientras se escribe).
+"""
+import bisect
+import math
+import re
+from typing import Dict, List, Optional
+from modules.alarm_matcher import fold_accents
+
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9ñ]+")
+
+STOP_WORDS = frozenset("""
+a al algo algun alguna algunas alguno algunos ante antes como con contra cual cuando de del desde
+donde durante e el ella ellas ellos en entre era es esa esas ese eso esos esta estas este esto estos
+fue ha hay la las le les lo los mas me mi mientras muy no nos o otra otro para pero poco por porque
+que se segun ser si sin sobre su sus tambien tan te tiene tienen todo todos tras u un una unas uno
+unos y ya
+""".split())
+
+# Sufijos de mayor a menor longitud; solo se quitan si el stem conserva 4+ letras
+_SUFFIXES = sorted(
+    [
+        "amientos", "imientos", "amiento", "imiento", "aciones", "uciones", "acion", "ucion",
+        "mente", "idades", "idad", "ciones", "cion", "ivas", "ivos", "iva", "ivo", "ando",
+        "iendo", "ados", "idos", "adas", "idas", "ado", "ido", "ada", "ida", "es", "os", "as",
+        "s", "a", "o", "e"
+    ],
+    key=len,
+    reverse=True
+)
+
+# Campos indexados y su peso en el puntaje
+FIELD_WEIGHTS = {
+    "sintoma": 3.0,
+    "signos_alarma": 2.0,
+    "criterios_triage": 2.0,
+    "preguntas": 1.5,
+    "contenido": 1.0
+}
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+MAX_PREFIX_EXPANSIONS = 50
+
+
+def stem(token: str) -> str:
+    """
+    Stemming ligero en español (quita plurales y sufijos frecuentes)
+
+    Args:
+        token: Palabra normalizada (sin tildes, minúsculas)
+
+    Returns:
+        Raíz aproximada
+    """
+    for suffix in _SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 4:
+            return token[:-len(suffix)]
+    return token
+
+
+def analyze(texto: str) -> List[str]:
+    """
+    Convierte texto en términos indexables
+
+    Args:
+        texto: Texto libre
+
+    Returns:
+        Lista de términos (sin tildes, sin stop-words, con stemming)
+    """
+    return [stem(t) for t in _TOKEN_PATTERN.findall(fold_accents(texto)) if t not in STOP_WORDS]
+
+
+class ProtocolSearchIndex:
+    """Índice invertido BM25 por campos sobre los protocolos cargados"""
+
+    def __init__(self):
+        self.postings: Dict[str, Dict[str, Dict[str, int]]] = {}  # termino -> sintoma -> campo -> tf
+        self.field_lengths: Dict[str, Dict[str, int]] = {}  # sintoma -> campo -> longitud
+        self.avg_lengths: Dict[str, float] = {}
+        self.vocabulary: List[str] = []
+
+    @classmethod
+    def build(cls, protocols: Dict[str, Dict]) -> "ProtocolSearchIndex":
+        """
+        Construye el índice a partir de los protocolos
+
+        Args:
+            protocols: Diccionario {sintoma: protocolo}
+
+        Returns:
+            Índice construido
+        """
+        index = cls()
+        for sintoma, protocolo in protocols.items():
+            campos = {
+                "sintoma": sintoma,
+                "signos_alarma": " ".join(map(str, protocolo.get("signos_alarma", []))),
+                "criterios_triage": " ".join(map(str, protocolo.get("criterios_triage", []))),
+                "preguntas": " ".join(map(str, protocolo.get("preguntas", []))),
+                "contenido": searchable_text(protocolo)
+            }
+            index.field_lengths[sintoma] = {}
+            for campo, texto in campos.items():
+                terminos = analyze(texto)
+                index.field_lengths[sintoma][campo] = len(terminos)
+                for termino in terminos:
+                    tf = index.postings.setdefault(termino, {}).setdefault(sintoma, {})
+                    tf[campo] = tf.get(campo, 0) + 1
+        index._finalize()
+        return index
+
+    def _finalize(self):
+        n_docs = max(len(self.field_lengths), 1)
+        for campo in FIELD_WEIGHTS:
+            total = sum(longitudes.get(campo, 0) for longitudes in self.field_lengths.values())
+            self.avg_lengths[campo] = total / n_docs or 1.0
+        self.vocabulary = sorted(self.postings)
+
+    def to_dict(self) -> Dict:
+        """Serializa el índice (para los snapshots de protocol_store)"""
+        return {"postings": self.postings, "field_lengths": self.field_lengths}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "ProtocolSearchIndex":
+        """Reconstruye un índice serializado con to_dict()"""
+        index = cls()
+        index.postings = data["postings"]
+        index.field_lengths = data["field_lengths"]
+        index._finalize()
+        return index
+
+    def _expand(self, query: str) -> List[str]:
+        """Términos de la consulta; el último también se expande por prefijo"""
+        tokens = [t for t in _TOKEN_PATTERN.findall(fold_accents(query))]
+        if not tokens:
+            return []
+
+        terminos = [stem(t) for t in tokens[:-1] if t not in STOP_WORDS]
+        ultimo = tokens[-1]
+        if ultimo not in STOP_WORDS or len(tokens) == 1:
+            terminos.append(stem(ultimo))
+            inicio = bisect.bisect_left(self.vocabulary, ultimo)
+            for termino in self.vocabulary[inicio:inicio + MAX_PREFIX_EXPANSIONS]:
+                if not termino.startswith(ultimo):
+                    break
+                terminos.append(termino)
+        return list(dict.fromkeys(terminos))
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[Dict]:
+        """
+        Busca protocolos por relevancia
+
+        Args:
+            query: Texto de búsqueda (puede estar incompleto)
+            limit: Máximo de resultados
+
+        Returns:
+            Lista ordenada de {"sintoma", "score", "campos"} donde campos son
+            los campos en los que hubo coincidencias
+        """
+        n_docs = len(self.field_lengths)
+        scores: Dict[str, float] = {}
+        campos_match: Dict[str, set] = {}
+
+        for termino in self._expand(query):
+            docs = self.postings.get(termino)
+            if not docs:
+                continue
+            idf = math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            for sintoma, tfs in docs.items():
+                for campo, tf in tfs.items():
+                    norm = 1 - BM25_B + BM25_B * self.field_lengths[sintoma][campo] / self.avg_lengths[campo]
+                    score = idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * norm)
+                    scores[sintoma] = scores.get(sintoma, 0.0) + FIELD_WEIGHTS[campo] * score
+                    campos_match.setdefault(sintoma, set()).add(campo)
+
+        ranking = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        if limit is not None:
+            ranking = ranking[:limit]
+        return [
+            {
+                "sintoma": sintoma,
+                "score": round(score, 4),
+                "campos": [c for c in FIELD_WEIGHTS if c in campos_match[sintoma]]
+            }
+            for sintoma, score in ranking
+        ]
+
+
+def searchable_text(protocolo: Dict) -> str:
+    """Texto completo del protocolo sin construir la tabla de to_string() si es posible"""
+    df = getattr(protocolo, "_df", None)
+    if df is not None:
+        valores = [str(v) for v in df.to_numpy().ravel() if v == v and v is not None]
+        return " ".join([str(c) for c in df.columns] + valores)
+    return protocolo.get("contenido_completo", "")
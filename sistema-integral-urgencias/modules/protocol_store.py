@@ -0,0 +1,169 @@
+"""
+Snapshots compilados de protocolos
+Compila el Excel de protocolos una vez a un JSON versionado (con mapeo de
+columnas e índice de búsqueda BM25) que se carga en milisegundos sin pandas ni
+openpyxl. La publicación de una nueva versión es atómica (puntero current.json).
+
+Uso:
+    python -m modules.protocol_store protocolos.xlsx --version 2026-10
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import tempfile
+from datetime import datetime
+from typing import Dict, Optional
+import config
+from modules.protocol_search import ProtocolSearchIndex
+
+
+SNAPSHOT_FORMAT = 2
+CURRENT_POINTER = "current.json"
+
+
+def compile_snapshot(protocols: Dict[str, Dict], version: str, source_hash: str = "") -> Dict:
+    """
+    Convierte los protocolos parseados en un snapshot serializable
+
+    Args:
+        protocols: Diccionario {sintoma: protocolo} de ProtocolLoader
+        version: Identificador de la versión publicada
+        source_hash: SHA-256 del Excel de origen
+
+    Returns:
+        Diccionario listo para guardar en JSON
+    """
+    protocolos = {}
+    for sintoma, protocolo in protocols.items():
+        protocolos[sintoma] = {
+            "sintoma": sintoma,
+            "preguntas": [str(p) for p in protocolo.get("preguntas", [])],
+            "signos_alarma": [str(s) for s in protocolo.get("signos_alarma", [])],
+            "criterios_triage": [str(c) for c in protocolo.get("criterios_triage", [])],
+            "columnas": protocolo.get("columnas", {}),
+            "filas": protocolo.get("filas") or [],
+            "contenido_completo": protocolo["contenido_completo"]
+        }
+
+    return {
+        "formato": SNAPSHOT_FORMAT,
+        "version": version,
+        "generado": datetime.now().isoformat(timespec="seconds"),
+        "origen_sha256": source_hash,
+        "protocolos": protocolos,
+        "indice": ProtocolSearchIndex.build(protocols).to_dict()
+    }
+
+
+def publish_snapshot(snapshot: Dict, store_dir: Optional[str] = None) -> str:
+    """
+    Guarda el snapshot y lo activa de forma atómica
+
+    Los procesos que ya leyeron la versión anterior no se ven afectados; las
+    siguientes lecturas del puntero obtienen la nueva versión completa.
+
+    Args:
+        snapshot: Snapshot de compile_snapshot()
+        store_dir: Directorio del almacén (default: config.PROTOCOL_STORE_DIR)
+
+    Returns:
+        Ruta del archivo del snapshot
+    """
+    store_dir = store_dir or config.PROTOCOL_STORE_DIR
+    os.makedirs(store_dir, exist_ok=True)
+
+    nombre = f"protocolos-{_safe_name(snapshot['version'])}.json"
+    path = os.path.join(store_dir, nombre)
+    _write_atomic(path, json.dumps(snapshot, ensure_ascii=False))
+    _write_atomic(
+        os.path.join(store_dir, CURRENT_POINTER),
+        json.dumps({"version": snapshot["version"], "archivo": nombre})
+    )
+    return path
+
+
+def read_current_version(store_dir: Optional[str] = None) -> Optional[Dict]:
+    """
+    Lee el puntero a la versión activa
+
+    Args:
+        store_dir: Directorio del almacén (default: config.PROTOCOL_STORE_DIR)
+
+    Returns:
+        Diccionario {version, archivo} o None si no hay snapshot publicado
+    """
+    pointer = os.path.join(store_dir or config.PROTOCOL_STORE_DIR, CURRENT_POINTER)
+    if not os.path.exists(pointer):
+        return None
+    with open(pointer, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_snapshot(store_dir: Optional[str] = None, version: Optional[str] = None) -> Optional[Dict]:
+    """
+    Carga el snapshot activo, o el de una versión publicada
+
+    Args:
+        store_dir: Directorio del almacén (default: config.PROTOCOL_STORE_DIR)
+        version: Versión a cargar (default: la activa)
+
+    Returns:
+        Snapshot o None si no hay versión publicada (o no existe la pedida)
+    """
+    store_dir = store_dir or config.PROTOCOL_STORE_DIR
+    if version is None:
+        current = read_current_version(store_dir)
+        if current is None:
+            return None
+        nombre = current["archivo"]
+    else:
+        nombre = f"protocolos-{_safe_name(version)}.json"
+    path = os.path.join(store_dir, nombre)
+    if version is not None and not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        snapshot = json.load(f)
+    if snapshot.get("formato") != SNAPSHOT_FORMAT:
+        raise ValueError(f"Formato de snapshot no soportado: {snapshot.get('formato')}")
+    return snapshot
+
+
+def _safe_name(version: str) -> str:
+    return re.sub(r"[^\w.-]", "_", version)
+
+
+def _write_atomic(path: str, content: str):
+    # Temporal único en el mismo directorio: dos publicaciones simultáneas no
+    # escriben en el mismo archivo y os.replace no cruza sistemas de archivos
+    with tempfile.NamedTemporaryFile(
+        "w", encoding="utf-8", dir=os.path.dirname(path) or ".",
+        prefix=f"{os.path.basename(path)}.", suffix=".tmp", delete=False
+    ) as f:
+        f.write(content)
+    try:
+        os.replace(f.name, path)
+    except OSError:
+        os.remove(f.name)
+        raise
+
+
+if __name__ == "__main__":
+    from modules.protocol_loader import ProtocolLoader
+
+    parser = argparse.ArgumentParser(description="Compila y publica un snapshot de protocolos")
+    parser.add_argument("excel", help="Archivo Excel de protocolos")
+    parser.add_argument("--version", default=datetime.now().strftime("%Y%m%d-%H%M%S"))
+    parser.add_argument("--store-dir", default=None)
+    args = parser.parse_args()
+
+    with open(args.excel, "rb") as f:
+        source_hash = hashlib.sha256(f.read()).hexdigest()
+
+    protocols = ProtocolLoader().load_from_excel(args.excel)
+    if not protocols:
+        raise SystemExit("No se pudieron cargar protocolos del Excel")
+
+    path = publish_snapshot(compile_snapshot(protocols, args.version, source_hash), args.store_dir)
+    print(f"Snapshot {args.version} publicado en {path} ({len(protocols)} protocolos)")
@@ -0,0 +1,340 @@
+"""
+Resiliencia de las llamadas al modelo de triage
+Plazo máximo por llamada, circuit breaker que corta las llamadas tras fallos
+consecutivos (MedEngine pasa entonces al modelo alternativo o a la
+clasificación local) y solicitudes duplicadas (hedging) cuando una llamada
+supera el percentil de latencia observado.
+"""
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, Iterator, Optional
+import config
+from modules.metrics import METRICS
+
+
+# Contadores de ResilientModel.stats que se publican también como métricas
+_STAT_METRICS = {
+    "rechazadas_circuito": "llm_circuit_rejections_total",
+    "plazos_excedidos": "llm_deadline_exceeded_total",
+    "duplicadas": "llm_hedged_requests_total"
+}
+
+
+class CircuitOpenError(RuntimeError):
+    """El circuito está abierto: no se llama al modelo"""
+
+
+class DeadlineExceededError(TimeoutError):
+    """La llamada superó su plazo máximo"""
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker de tres estados
+
+    - cerrado: las llamadas pasan; failure_threshold fallos consecutivos lo abren
+    - abierto: las llamadas se rechazan durante reset_timeout_s
+    - semiabierto: se permite una llamada de prueba; si funciona se cierra
+    """
+
+    CERRADO = "cerrado"
+    ABIERTO = "abierto"
+    SEMIABIERTO = "semiabierto"
+
+    def __init__(self, failure_threshold: Optional[int] = None, reset_timeout_s: Optional[float] = None):
+        """
+        Args:
+            failure_threshold: Fallos consecutivos para abrir (default: config.CIRCUIT_BREAKER_FAILURE_THRESHOLD)
+            reset_timeout_s: Segundos abierto antes de probar (default: config.CIRCUIT_BREAKER_RESET_TIMEOUT_S)
+        """
+        self.failure_threshold = failure_threshold or config.CIRCUIT_BREAKER_FAILURE_THRESHOLD
+        self.reset_timeout_s = config.CIRCUIT_BREAKER_RESET_TIMEOUT_S if reset_timeout_s is None else reset_timeout_s
+        self._state = self.CERRADO
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.ABIERTO and time.monotonic() - self._opened_at >= self.reset_timeout_s:
+                return self.SEMIABIERTO
+            return self._state
+
+    def allow(self) -> bool:
+        """Indica si se puede llamar al modelo (reserva la llamada de prueba en semiabierto)"""
+        with self._lock:
+            if self._state == self.ABIERTO:
+                if time.monotonic() - self._opened_at < self.reset_timeout_s:
+                    return False
+                self._state = self.SEMIABIERTO
+                self._trial_in_flight = False
+            if self._state == self.SEMIABIERTO:
+                if self._trial_in_flight:
+                    return False
+                self._trial_in_flight = True
+            return True
+
+    def release(self):
+        """Libera la llamada de prueba sin registrar resultado (llamada abandonada)"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CERRADO
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.SEMIABIERTO or self._failures >= self.failure_threshold:
+                self._state = self.ABIERTO
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+
+class LatencyTracker:
+    """Ventana móvil de latencias exitosas"""
+
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Percentil q (0-100) de la ventana, o None si no hay muestras"""
+        with self._lock:
+            if not self._samples:
+                return None
+            import numpy as np
+
+            return float(np.percentile(self._samples, q))
+
+
+class ResilientModel:
+    """
+    Envoltorio de un modelo con generate_content que agrega plazo por llamada,
+    circuit breaker y hedging; el resto de los atributos se delegan al modelo
+    """
+
+    def __init__(
+        self,
+        model,
+        deadline_s: Optional[float] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        hedge_enabled: Optional[bool] = None,
+        max_workers: int = 64
+    ):
+        """
+        Args:
+            model: Modelo o backend con generate_content
+            deadline_s: Plazo máximo por llamada (default: config.TRIAGE_DEADLINE_S)
+            breaker: Circuit breaker (default: uno nuevo con la configuración)
+            hedge_enabled: Duplicar llamadas lentas (default: config.HEDGE_ENABLED)
+            max_workers: Llamadas en vuelo como máximo (incluye duplicadas y las
+                que superaron el plazo pero el backend aún no terminó: esas
+                siguen ocupando su thread hasta el timeout del backend)
+        """
+        self.model = model
+        self.deadline_s = deadline_s or config.TRIAGE_DEADLINE_S
+        self.breaker = breaker or CircuitBreaker()
+        self.hedge_enabled = config.HEDGE_ENABLED if hedge_enabled is None else hedge_enabled
+        self.latencies = LatencyTracker()
+        self.stats = {
+            "llamadas": 0, "exitos": 0, "fallos": 0, "plazos_excedidos": 0,
+            "rechazadas_circuito": 0, "duplicadas": 0, "duplicadas_ganadoras": 0, "saturadas": 0
+        }
+        self._stats_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm")
+        self._slots = threading.BoundedSemaphore(max_workers)
+
+    def __getattr__(self, name):
+        if name == "model":
+            raise AttributeError(name)
+        return getattr(self.model, name)
+
+    def _count(self, clave: str):
+        with self._stats_lock:
+            self.stats[clave] += 1
+        if clave in _STAT_METRICS:
+            METRICS.inc(_STAT_METRICS[clave])
+
+    def hedge_delay(self) -> Optional[float]:
+        """Espera antes de duplicar la llamada (None si no hay muestras suficientes)"""
+        if not self.hedge_enabled or len(self.latencies) < config.HEDGE_MIN_SAMPLES:
+            return None
+        return max(self.latencies.percentile(config.HEDGE_PERCENTILE), config.HEDGE_MIN_DELAY_S)
+
+    def generate_content(self, prompt: str, stream: bool = False, **kwargs):
+        """
+        Llama al modelo con las protecciones activas
+
+        Con stream=True el circuito se consulta al iterar el primer fragmento:
+        un stream que nunca se itera no reserva la llamada de prueba. Los demás
+        argumentos (por ejemplo system) se pasan tal cual al modelo.
+
+        Raises:
+            CircuitOpenError: El circuito está abierto
+            DeadlineExceededError: La llamada superó deadline_s
+        """
+        if stream:
+            return self._stream(prompt, kwargs)
+
+        self._admit()
+        try:
+            response = self._call_with_hedge(prompt, kwargs)
+        except Exception:
+            self.breaker.record_failure()
+            self._count("fallos")
+            raise
+        self.breaker.record_success()
+        self._count("exitos")
+        return response
+
+    def _admit(self):
+        """Consulta el circuito (reserva la llamada de prueba en semiabierto)"""
+        if not self.breaker.allow():
+            self._count("rechazadas_circuito")
+            raise CircuitOpenError("Circuito abierto: el modelo falló repetidamente")
+        self._count("llamadas")
+
+    def _submit(self, func, *args):
+        """
+        Envía la llamada al executor si queda un thread libre, o None: las
+        llamadas que superan el plazo no se pueden cancelar y, sin este límite,
+        se encolarían detrás de ellas hasta agotar el plazo sin llegar a correr
+        """
+        if not self._slots.acquire(blocking=False):
+            self._count("saturadas")
+            return None
+        futuro = self._executor.submit(func, *args)
+        futuro.add_done_callback(lambda _: self._slots.release())
+        return futuro
+
+    def _timed_call(self, prompt: str, kwargs: Dict):
+        inicio = time.perf_counter()
+        response = self.model.generate_content(prompt, **kwargs)
+        return response, time.perf_counter() - inicio
+
+    def _call_with_hedge(self, prompt: str, kwargs: Dict):
+        """Llamada con plazo; si supera el percentil de latencia se lanza una duplicada"""
+        inicio = time.monotonic()
+        limite = inicio + self.deadline_s
+        principal = self._submit(self._timed_call, prompt, kwargs)
+        if principal is None:
+            self._count("plazos_excedidos")
+            raise DeadlineExceededError("Todos los threads están ocupados por llamadas sin terminar")
+        pendientes = {principal}
+        espera_duplicada = self.hedge_delay()
+        ultimo_error = None
+
+        while pendientes:
+            ahora = time.monotonic()
+            if ahora >= limite:
+                break
+            timeout = limite - ahora
+            if espera_duplicada is not None:
+                timeout = min(timeout, max(inicio + espera_duplicada - ahora, 0))
+
+            listos, pendientes = wait(pendientes, timeout=timeout, return_when=FIRST_COMPLETED)
+            for futuro in listos:
+                try:
+                    response, latencia = futuro.result()
+                except Exception as e:
+                    ultimo_error = e
+                    continue
+                self.latencies.record(latencia)
+                if futuro is not principal:
+                    self._count("duplicadas_ganadoras")
+                return response
+
+            if espera_duplicada is not None and pendientes and time.monotonic() - inicio >= espera_duplicada:
+                # La llamada es más lenta que el percentil: se duplica una sola vez
+                duplicada = self._submit(self._timed_call, prompt, kwargs)
+                if duplicada is not None:
+                    pendientes.add(duplicada)
+                    self._count("duplicadas")
+                espera_duplicada = None
+
+        if ultimo_error is not None and not pendientes:
+            raise ultimo_error
+        self._count("plazos_excedidos")
+        raise DeadlineExceededError(f"Plazo de {self.deadline_s}s excedido")
+
+    def _stream(self, prompt: str, kwargs: Dict) -> Iterator:
+        """
+        Stream con plazo total; el modelo se consume en un thread aparte
+
+        Si el stream se cierra antes de terminar (por ejemplo, un rerun de
+        Streamlit cierra el generador), se deja de consumir el modelo y se
+        libera la llamada de prueba del circuito sin contarla como fallo.
+        """
+        self._admit()
+        fragmentos = queue.Queue()
+        fin = object()
+        cancelado = threading.Event()
+
+        def producir():
+            try:
+                for chunk in self.model.generate_content(prompt, stream=True, **kwargs):
+                    if cancelado.is_set():
+                        return
+                    fragmentos.put(chunk)
+                fragmentos.put(fin)
+            except Exception as e:
+                fragmentos.put(e)
+
+        terminado = False
+        try:
+            if self._submit(producir) is None:
+                terminado = True
+                self.breaker.record_failure()
+                self._count("plazos_excedidos")
+                self._count("fallos")
+                raise DeadlineExceededError("Todos los threads están ocupados por llamadas sin terminar")
+            limite = time.monotonic() + self.deadline_s
+            while True:
+                try:
+                    item = fragmentos.get(timeout=max(limite - time.monotonic(), 0))
+                except queue.Empty:
+                    terminado = True
+                    self.breaker.record_failure()
+                    self._count("plazos_excedidos")
+                    self._count("fallos")
+                    raise DeadlineExceededError(f"Plazo de {self.deadline_s}s excedido")
+                if item is fin:
+                    terminado = True
+                    self.breaker.record_success()
+                    self._count("exitos")
+                    return
+                if isinstance(item, Exception):
+                    terminado = True
+                    self.breaker.record_failure()
+                    self._count("fallos")
+                    raise item
+                yield item
+        finally:
+            cancelado.set()
+            if not terminado:
+                self.breaker.release()
+
+    def get_stats(self) -> Dict:
+        """Contadores, estado del circuito y latencias observadas"""
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats["circuito"] = self.breaker.state
+        stats["latencia_p50_s"] = self.latencies.percentile(50)
+        stats["latencia_p95_s"] = self.latencies.percentile(95)
+        return stats
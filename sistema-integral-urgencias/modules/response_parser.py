@@ -0,0 +1,163 @@
+"""
+Parser de las respuestas del modelo de triage
+Extrae nivel, signos de alarma y razonamiento en una sola pasada por las líneas,
+con patrones compilados a nivel de módulo. Soporta también respuestas en JSON.
+"""
+import json
+import re
+from typing import Dict, List, Optional
+
+
+NIVELES_VALIDOS = ("01", "02", "03", "07")
+NIVEL_POR_DEFECTO = "03"
+
+# Encabezado de sección al inicio de línea, tolerando markdown ("**Nivel de Triage:** 01")
+_HEADER_PATTERN = re.compile(
+    r"^[\s*#>-]*"
+    r"(?P<header>nivel de triage|triage|nivel|signos de alarma detectados|signos de alarma"
+    r"|razonamiento|explicaci[oó]n|justificaci[oó]n)"
+    r"[\s*]*:[\s*]*(?P<resto>.*)$",
+    re.IGNORECASE
+)
+# Código de nivel al comienzo del valor de un encabezado ("01", "[02]", "Nivel 07")
+_LEVEL_VALUE_PATTERN = re.compile(r"^\W*(?:nivel\s*)?(\d{2})\b", re.IGNORECASE)
+# Código aislado: no forma parte de fechas, horas ni otros números ("01/02/2024", "10:03")
+_ISOLATED_LEVEL_PATTERN = re.compile(r"(?<![\w/.:-])(01|02|03|07)(?![\w/.:-]|\s*[/.:-]\s*\d)")
+# Ítem de lista ("- Palidez", "• Disnea", "* Vómito")
+_LIST_ITEM_PATTERN = re.compile(r"^\s*[-•*]\s*(.+?)\s*$")
+_JSON_FENCE_PATTERN = re.compile(r"^\s*```(?:json)?\s*|\s*```\s*$", re.IGNORECASE)
+_INLINE_SPLIT_PATTERN = re.compile(r",|;|\sy\s")
+
+# Regla que produjo el nivel, por encabezado (de más a menos específico)
+_LEVEL_HEADERS = {"nivel de triage": "nivel_de_triage", "triage": "triage", "nivel": "nivel"}
+_REASONING_HEADERS = ("razonamiento", "explicacion", "explicación", "justificacion", "justificación")
+_SIGNS_HEADERS = ("signos de alarma detectados", "signos de alarma")
+
+
+def parse_triage_response(response_text: str) -> Dict:
+    """
+    Extrae los campos de la respuesta del modelo
+
+    Args:
+        response_text: Texto de respuesta del modelo (formato texto o JSON)
+
+    Returns:
+        Diccionario con:
+            - nivel_triage: str (01, 02, 03, 07)
+            - signos_alarma: List[str]
+            - razonamiento: str
+            - regla_nivel: str (regla que determinó el nivel: "json",
+              "nivel_de_triage", "triage", "nivel", "codigo_aislado" o "por_defecto")
+    """
+    stripped = response_text.lstrip()
+    if stripped.startswith("{") or stripped.startswith("```"):
+        parsed = _parse_json(response_text)
+        if parsed is not None:
+            return parsed
+    return _parse_text(response_text)
+
+
+def _parse_json(response_text: str) -> Optional[Dict]:
+    """Interpreta una respuesta JSON; retorna None si no es JSON válido"""
+    try:
+        data = json.loads(_JSON_FENCE_PATTERN.sub("", response_text))
+    except ValueError:
+        return None
+    if not isinstance(data, dict):
+        return None
+
+    nivel = str(data.get("nivel_triage", "")).strip().zfill(2)
+    signos = data.get("signos_alarma") or []
+    if isinstance(signos, str):
+        signos = [s.strip() for s in signos.split(",")]
+
+    valido = nivel in NIVELES_VALIDOS
+    return {
+        "nivel_triage": nivel if valido else NIVEL_POR_DEFECTO,
+        "signos_alarma": [str(s).strip() for s in signos if str(s).strip()],
+        "razonamiento": str(data.get("razonamiento", "")).strip() or response_text.strip(),
+        "regla_nivel": "json" if valido else "por_defecto"
+    }
+
+
+def _parse_text(response_text: str) -> Dict:
+    """Recorre las líneas una vez asignando cada una a su sección"""
+    niveles = {}  # regla -> nivel (se conserva la primera aparición de cada regla)
+    nivel_aislado = None
+    signos: List[str] = []
+    razonamiento: List[str] = []
+    seccion = None
+
+    for linea in response_text.splitlines():
+        match = _HEADER_PATTERN.match(linea)
+        if match:
+            header = match.group("header").lower()
+            resto = match.group("resto").strip()
+
+            if header in _LEVEL_HEADERS:
+                seccion = None
+                value = _LEVEL_VALUE_PATTERN.match(resto)
+                if value and value.group(1) in NIVELES_VALIDOS:
+                    niveles.setdefault(_LEVEL_HEADERS[header], value.group(1))
+                continue
+
+            if header in _SIGNS_HEADERS:
+                seccion = "signos"
+                if resto:
+                    signos.extend(_split_inline_signs(resto))
+                continue
+
+            if header in _REASONING_HEADERS and not razonamiento:
+                seccion = "razonamiento"
+                if resto:
+                    razonamiento.append(resto)
+                continue
+
+        if not linea.strip():
+            # Línea en blanco: termina la sección (como el formato solicitado)
+            if seccion == "razonamiento" and razonamiento:
+                seccion = "cerrada"
+            elif seccion == "signos":
+                seccion = None
+            continue
+
+        if seccion == "signos":
+            item = _LIST_ITEM_PATTERN.match(linea)
+            if item:
+                signos.append(item.group(1))
+                continue
+            seccion = None
+        elif seccion == "razonamiento":
+            razonamiento.append(linea.strip())
+            continue
+
+        if nivel_aislado is None:
+            aislado = _ISOLATED_LEVEL_PATTERN.search(linea)
+            if aislado:
+                nivel_aislado = aislado.group(1)
+
+    for regla in ("nivel_de_triage", "triage", "nivel"):
+        if regla in niveles:
+            nivel, regla_nivel = niveles[regla], regla
+            break
+    else:
+        if nivel_aislado is not None:
+            nivel, regla_nivel = nivel_aislado, "codigo_aislado"
+        else:
+            nivel, regla_nivel = NIVEL_POR_DEFECTO, "por_defecto"
+
+    signos = [s for s in signos if s.lower() not in ("ninguno", "ninguna", "no")]
+
+    return {
+        "nivel_triage": nivel,
+        "signos_alarma": signos,
+        "razonamiento": "\n".join(razonamiento).strip() or response_text.strip(),
+        "regla_nivel": regla_nivel
+    }
+
+
+def _split_inline_signs(texto: str) -> List[str]:
+    """Separa una lista en línea ("Palidez, diaforesis y náuseas")"""
+    texto = texto.strip("[]. ")
+    partes = _INLINE_SPLIT_PATTERN.split(texto)
+    return [p.strip(" -•*") for p in partes if p.strip(" -•*")]
@@ -0,0 +1,143 @@
+"""
+Recursos compartidos por todas las sesiones del proceso de Streamlit
+Los objetos costosos y de solo lectura (motor de IA, snapshots de protocolos,
+router de síntomas, almacenes de modelos y de consultas) se crean una vez por proceso con
+st.cache_resource; el estado de cada usuario (forecaster entrenado, datos
+históricos, protocolos subidos desde Excel) vive en st.session_state.
+"""
+import threading
+from typing import Optional
+import streamlit as st
+import config
+from modules import protocol_store
+from modules.med_engine import get_med_engine
+from modules.protocol_loader import ProtocolLoader
+
+
+@st.cache_resource
+def get_model_store():
+    """
+    Almacén de modelos Prophet compartido (None si está deshabilitado)
+
+    Returns:
+        Instancia de ModelStore
+    """
+    if not config.FORECAST_MODEL_STORE_ENABLED:
+        return None
+    from modules.model_store import ModelStore
+
+    return ModelStore(config.FORECAST_MODEL_STORE_DIR)
+
+
+@st.cache_resource
+def get_visit_store():
+    """
+    Almacén columnar de consultas compartido (None si está deshabilitado)
+
+    Returns:
+        Instancia de VisitStore
+    """
+    if not config.VISIT_STORE_ENABLED:
+        return None
+    from modules.visit_store import VisitStore
+
+    return VisitStore(config.VISIT_STORE_DIR)
+
+
+@st.cache_resource(max_entries=2)
+def get_protocol_snapshot(version: str) -> ProtocolLoader:
+    """
+    Loader con el snapshot publicado, compartido y de solo lectura
+
+    Las sesiones que usan el snapshot referencian este loader; las que suben
+    un Excel crean su propio ProtocolLoader.
+
+    Args:
+        version: Versión publicada a cargar (también es la clave de la caché, así
+            que se carga esa versión aunque el puntero ya apunte a otra)
+
+    Returns:
+        ProtocolLoader con el snapshot cargado (vacío si no se pudo leer)
+    """
+    loader = ProtocolLoader()
+    loader.load_snapshot(version=version)
+    return loader
+
+
+@st.cache_resource(max_entries=2)
+def get_symptom_router(version: str):
+    """
+    Router de síntomas ajustado sobre el snapshot publicado
+
+    Args:
+        version: Versión publicada del snapshot
+
+    Returns:
+        SymptomRouter ajustado, o None si está deshabilitado o no hay protocolos
+    """
+    protocols = get_protocol_snapshot(version).protocols
+    if not config.SYMPTOM_ROUTER_ENABLED or not protocols:
+        return None
+    from modules.symptom_router import SymptomRouter, load_past_cases
+
+    return SymptomRouter().fit(protocols, load_past_cases())
+
+
+def create_session_forecaster():
+    """
+    Forecaster de la sesión: su modelo entrenado y sus datos históricos son
+    propios del usuario; solo comparte los almacenes de modelos y de consultas
+    del proceso
+
+    Returns:
+        Instancia nueva de Forecaster
+    """
+    from modules.forecaster import Forecaster
+
+    return Forecaster(model_store=get_model_store(), visit_store=get_visit_store())
+
+
+def current_snapshot_version() -> Optional[str]:
+    """Versión publicada activa del almacén de protocolos (None si no hay)"""
+    current = protocol_store.read_current_version()
+    return current["version"] if current else None
+
+
+def _warm_imports(engine):
+    """Importa en segundo plano el cliente del modelo, Prophet y scikit-learn"""
+    for model in (engine.model, engine.fallback_model):
+        if model is not None and hasattr(model, "warmup"):
+            try:
+                model.warmup()
+            except Exception:
+                pass  # El error se informa en la primera clasificación
+    try:
+        if config.FORECAST_BACKEND == "prophet":
+            from prophet import Prophet  # noqa: F401
+        if config.SYMPTOM_ROUTER_ENABLED:
+            from sklearn.feature_extraction.text import TfidfVectorizer  # noqa: F401
+    except Exception:
+        pass  # Sin la dependencia el error se informa al usar la función
+
+
+@st.cache_resource
+def preload_resources() -> threading.Thread:
+    """
+    Precarga, una sola vez por proceso, los recursos pesados
+
+    El motor de IA y el snapshot de protocolos se crean en la primera ejecución
+    del script (sin importar todavía las librerías pesadas); el cliente del
+    modelo (genai), Prophet y scikit-learn se importan en un thread de fondo
+    para no demorar el primer render.
+
+    Returns:
+        Thread de precarga
+    """
+    engine = get_med_engine()
+    version = current_snapshot_version()
+    if version:
+        get_protocol_snapshot(version)
+
+    thread = threading.Thread(target=_warm_imports, args=(engine,), daemon=True, name="preload-imports")
+    thread.start()
+    return thread
@@ -0,0 +1,292 @@
+"""
+Dimensionamiento de personal médico con teoría de colas
+Cada hora y nivel de triage se modela como una cola M/M/c estacionaria
+(Erlang C): con la tasa de llegadas predicha y la duración media de atención
+se busca el mínimo de médicos que atiende al menos la fracción objetivo de
+pacientes dentro del tiempo máximo de espera del nivel (tiempo_atencion_min).
+Todas las horas y niveles se resuelven a la vez con NumPy. La simulación de
+eventos discretos valida el plan con llegadas aleatorias y la atención por
+prioridad real, que Erlang C solo aproxima.
+"""
+import heapq
+from typing import Dict, Optional
+import numpy as np
+import pandas as pd
+import config
+
+
+# Orden de atención por nivel de triage (menor = primero)
+PRIORIDAD_TRIAGE = {"01": 0, "02": 1, "07": 2, "03": 3}
+
+
+def waiting_targets() -> Dict[str, float]:
+    """Tiempo máximo de espera (minutos) de cada nivel de triage"""
+    return {nivel: float(datos["tiempo_atencion_min"]) for nivel, datos in config.TRIAGE_LEVELS.items()}
+
+
+def _erlang_c_from_b(erlang_b: np.ndarray, carga: np.ndarray, servidores) -> np.ndarray:
+    """P(esperar) a partir de Erlang B; 1 si la cola es inestable (carga >= servidores)"""
+    estable = servidores > carga
+    denominador = np.where(estable, servidores - carga * (1 - erlang_b), 1.0)
+    return np.where(carga <= 0, 0.0, np.where(estable, servidores * erlang_b / denominador, 1.0))
+
+
+def erlang_c(carga, servidores) -> np.ndarray:
+    """
+    Probabilidad de que un paciente espere en una cola M/M/c (Erlang C)
+
+    Args:
+        carga: Carga ofrecida en erlangs (llegadas por hora × horas de atención)
+        servidores: Médicos disponibles (enteros, mismo tamaño que carga o escalar)
+
+    Returns:
+        Array con P(espera > 0) por elemento
+    """
+    carga, servidores = np.broadcast_arrays(np.asarray(carga, dtype=float), np.asarray(servidores, dtype=int))
+    # Recurrencia de Erlang B: estable numéricamente, sin factoriales
+    erlang_b = np.ones(carga.shape)
+    for k in range(1, int(servidores.max(initial=0)) + 1):
+        erlang_b = np.where(k <= servidores, carga * erlang_b / (k + carga * erlang_b), erlang_b)
+    return _erlang_c_from_b(erlang_b, carga, servidores)
+
+
+def service_level(carga, servidores, servicio_min, objetivo_min) -> np.ndarray:
+    """
+    Fracción de pacientes atendidos antes de objetivo_min:
+    1 − C · exp(−(c − a) · t / s)
+
+    Args:
+        carga: Carga ofrecida en erlangs
+        servidores: Médicos disponibles
+        servicio_min: Duración media de la atención (minutos)
+        objetivo_min: Tiempo máximo de espera (minutos)
+
+    Returns:
+        Array con el nivel de servicio (0 si la cola es inestable)
+    """
+    carga = np.asarray(carga, dtype=float)
+    servidores = np.asarray(servidores, dtype=int)
+    holgura = np.maximum(servidores - carga, 0)
+    return 1 - erlang_c(carga, servidores) * np.exp(-holgura * np.asarray(objetivo_min) / np.asarray(servicio_min))
+
+
+def mean_wait(carga, servidores, servicio_min) -> np.ndarray:
+    """
+    Espera media en cola (minutos): C · s / (c − a); infinita si la cola es inestable
+    """
+    carga = np.asarray(carga, dtype=float)
+    servidores = np.asarray(servidores, dtype=int)
+    holgura = servidores - carga
+    with np.errstate(divide="ignore", invalid="ignore"):
+        espera = erlang_c(carga, servidores) * np.asarray(servicio_min) / holgura
+    return np.where(carga <= 0, 0.0, np.where(holgura > 0, espera, np.inf))
+
+
+def min_servers(llegadas_hora, servicio_min, objetivo_min, nivel_servicio: float) -> np.ndarray:
+    """
+    Mínimo de médicos que cumple el nivel de servicio en cada elemento
+
+    Avanza c = 1, 2, ... para todos los elementos a la vez, actualizando Erlang B
+    con la recurrencia, y fija cada uno en el primer c que cumple; el número de
+    iteraciones es el máximo de médicos, no el de horas.
+
+    Args:
+        llegadas_hora: Pacientes por hora (array de cualquier forma)
+        servicio_min: Duración media de la atención (minutos, se difunde)
+        objetivo_min: Tiempo máximo de espera (minutos, se difunde)
+        nivel_servicio: Fracción de pacientes a atender dentro del objetivo (0-1)
+
+    Returns:
+        Array de enteros con los médicos necesarios (0 donde no hay llegadas)
+    """
+    if not 0 < nivel_servicio < 1:
+        raise ValueError(f"El nivel de servicio debe estar entre 0 y 1: {nivel_servicio}")
+    llegadas = np.nan_to_num(np.asarray(llegadas_hora, dtype=float)).clip(min=0)
+    servicio, objetivo = np.broadcast_arrays(
+        np.asarray(servicio_min, dtype=float), np.asarray(objetivo_min, dtype=float)
+    )
+    carga = llegadas * servicio / 60
+    servicio, objetivo = np.broadcast_to(servicio, carga.shape), np.broadcast_to(objetivo, carga.shape)
+
+    medicos = np.zeros(carga.shape, dtype=int)
+    pendiente = carga > 0
+    erlang_b = np.ones(carga.shape)
+    k = 0
+    while pendiente.any():
+        k += 1
+        erlang_b = carga * erlang_b / (k + carga * erlang_b)
+        nivel = 1 - _erlang_c_from_b(erlang_b, carga, k) * np.exp(-np.maximum(k - carga, 0) * objetivo / servicio)
+        cumple = pendiente & (k > carga) & (nivel >= nivel_servicio)
+        medicos[cumple] = k
+        pendiente &= ~cumple
+    return medicos
+
+
+def staff_by_hour(
+    llegadas: pd.DataFrame,
+    nivel_servicio: Optional[float] = None,
+    servicio_min: Optional[Dict[str, float]] = None,
+    minimo: Optional[int] = None
+) -> pd.DataFrame:
+    """
+    Médicos por hora para un solo grupo que atiende por prioridad de triage
+
+    Un paciente solo espera detrás de los de su nivel o de mayor prioridad,
+    así que cada nivel se evalúa como una cola M/M/c con la carga acumulada de
+    esos niveles (y su duración media de atención ponderada) contra su propio
+    tiempo objetivo; la hora necesita el máximo de médicos entre niveles, con
+    al menos `minimo` de guardia.
+
+    Args:
+        llegadas: Pacientes por hora con una columna por nivel de triage ("01", ...)
+        nivel_servicio: Fracción objetivo (por defecto STAFFING_SERVICE_LEVEL)
+        servicio_min: Minutos de atención por nivel (por defecto STAFFING_SERVICE_MINUTES)
+        minimo: Médicos mínimos por hora (por defecto STAFFING_MIN_PHYSICIANS)
+
+    Returns:
+        DataFrame con medicos_<nivel> (los que exige cada nivel), medicos, carga
+        (erlangs), nivel_servicio (el del nivel peor atendido con esos médicos)
+        y espera_media_min (ponderada por llegadas)
+    """
+    nivel_servicio = config.STAFFING_SERVICE_LEVEL if nivel_servicio is None else nivel_servicio
+    servicio_min = servicio_min or config.STAFFING_SERVICE_MINUTES
+    minimo = config.STAFFING_MIN_PHYSICIANS if minimo is None else minimo
+    niveles = sorted(llegadas.columns, key=lambda nivel: PRIORIDAD_TRIAGE.get(nivel, len(PRIORIDAD_TRIAGE)))
+    objetivos = waiting_targets()
+
+    tasas = np.nan_to_num(llegadas[niveles].to_numpy(dtype=float)).clip(min=0)
+    servicio = np.array([servicio_min[nivel] for nivel in niveles], dtype=float)
+    objetivo = np.array([objetivos[nivel] for nivel in niveles], dtype=float)
+
+    # Llegadas y duración media de cada nivel sumado a los de mayor prioridad
+    acumuladas = np.cumsum(tasas, axis=1)
+    minutos = np.cumsum(tasas * servicio, axis=1)
+    servicio_acumulado = np.where(acumuladas > 0, minutos / np.where(acumuladas > 0, acumuladas, 1), servicio)
+    carga_acumulada = minutos / 60
+
+    por_nivel = min_servers(acumuladas, servicio_acumulado, objetivo, nivel_servicio)
+    medicos = np.maximum(por_nivel.max(axis=1, initial=0), minimo)
+    niveles_hora = np.where(
+        carga_acumulada > 0,
+        service_level(carga_acumulada, medicos[:, None], servicio_acumulado, objetivo),
+        1.0
+    )
+    esperas = mean_wait(carga_acumulada, medicos[:, None], servicio_acumulado)
+    total_llegadas = tasas.sum(axis=1)
+    with np.errstate(invalid="ignore"):
+        espera_media = np.where(total_llegadas > 0, (esperas * tasas).sum(axis=1) / total_llegadas, 0.0)
+
+    resultado = pd.DataFrame(por_nivel, columns=[f"medicos_{nivel}" for nivel in niveles], index=llegadas.index)
+    resultado["medicos"] = medicos
+    resultado["carga"] = carga_acumulada[:, -1] if niveles else 0.0
+    resultado["nivel_servicio"] = niveles_hora.min(axis=1, initial=1.0)
+    resultado["espera_media_min"] = espera_media
+    return resultado
+
+
+def simulate(
+    llegadas: pd.DataFrame,
+    medicos,
+    servicio_min: Optional[Dict[str, float]] = None,
+    replicas: Optional[int] = None,
+    seed: int = 0
+) -> pd.DataFrame:
+    """
+    Simulación de eventos discretos de un plan de personal
+
+    Llegadas de Poisson con la tasa de cada hora y nivel, atención exponencial
+    y un solo grupo de médicos (medicos[h] disponibles en la hora h) que toma
+    siempre al paciente de mayor prioridad; un médico que sale con un paciente
+    en curso lo termina antes de irse.
+
+    Args:
+        llegadas: Pacientes por hora con una columna por nivel de triage
+        medicos: Médicos disponibles en cada hora (mismo largo que llegadas)
+        servicio_min: Minutos de atención por nivel (por defecto STAFFING_SERVICE_MINUTES)
+        replicas: Corridas independientes (por defecto STAFFING_SIMULATION_REPLICAS)
+        seed: Semilla del generador
+
+    Returns:
+        DataFrame por nivel con pacientes (por réplica), nivel_servicio
+        (fracción atendida dentro del objetivo), espera_media_min y espera_p90_min
+    """
+    servicio_min = servicio_min or config.STAFFING_SERVICE_MINUTES
+    replicas = replicas or config.STAFFING_SIMULATION_REPLICAS
+    niveles = list(llegadas.columns)
+    objetivos = waiting_targets()
+    tasas = np.nan_to_num(llegadas.to_numpy(dtype=float)).clip(min=0)
+    capacidad = np.asarray(medicos, dtype=int).tolist()
+    rng = np.random.default_rng(seed)
+
+    esperas = {nivel: [] for nivel in niveles}
+    for _ in range(replicas):
+        # Llegadas de todos los niveles en minutos desde el inicio, ordenadas
+        conteos = rng.poisson(tasas)
+        nivel_idx = np.repeat(np.tile(np.arange(len(niveles)), len(tasas)), conteos.ravel())
+        hora = np.repeat(np.repeat(np.arange(len(tasas)), len(niveles)), conteos.ravel())
+        tiempos = (hora + rng.random(len(hora))) * 60
+        orden = np.argsort(tiempos, kind="stable")
+        tiempos, nivel_idx = tiempos[orden], nivel_idx[orden]
+        duraciones = rng.exponential(np.array([servicio_min[nivel] for nivel in niveles])[nivel_idx])
+        espera = _simulate_queue(
+            tiempos.tolist(),
+            [PRIORIDAD_TRIAGE.get(niveles[i], len(PRIORIDAD_TRIAGE)) for i in nivel_idx],
+            duraciones.tolist(),
+            capacidad
+        )
+        for i, nivel in enumerate(niveles):
+            esperas[nivel].append(espera[nivel_idx == i])
+
+    filas = []
+    for nivel in niveles:
+        espera = np.concatenate(esperas[nivel]) if esperas[nivel] else np.array([])
+        filas.append({
+            "nivel": nivel,
+            "pacientes": len(espera) / replicas,
+            "objetivo_min": objetivos[nivel],
+            "nivel_servicio": float((espera <= objetivos[nivel]).mean()) if len(espera) else 1.0,
+            "espera_media_min": float(espera.mean()) if len(espera) else 0.0,
+            "espera_p90_min": float(np.percentile(espera, 90)) if len(espera) else 0.0
+        })
+    return pd.DataFrame(filas)
+
+
+def _simulate_queue(tiempos: list, prioridades: list, duraciones: list, capacidad: list) -> np.ndarray:
+    """
+    Cola con prioridad y capacidad por hora; devuelve la espera de cada llegada
+
+    Eventos: llegadas (ya ordenadas), fin de atenciones (heap) y cambios de
+    hora, que solo importan si hay pacientes esperando. Después del horizonte
+    se mantiene la capacidad de la última hora (al menos un médico) hasta
+    vaciar la cola.
+    """
+    n = len(tiempos)
+    horas = len(capacidad)
+    ultima = max(capacidad[-1], 1) if horas else 1
+    espera = np.zeros(n)
+    fines = []
+    cola = []
+    siguiente = 0
+    reloj = 0.0
+    inf = float("inf")
+
+    while siguiente < n or cola:
+        t_llegada = tiempos[siguiente] if siguiente < n else inf
+        t_fin = fines[0] if fines else inf
+        t_hora = (int(reloj // 60) + 1) * 60.0 if cola else inf
+        if t_fin <= t_llegada and t_fin <= t_hora:
+            reloj = heapq.heappop(fines)
+        elif t_llegada <= t_hora:
+            reloj = t_llegada
+            heapq.heappush(cola, (prioridades[siguiente], t_llegada, siguiente))
+            siguiente += 1
+        else:
+            reloj = t_hora
+
+        hora = int(reloj // 60)
+        disponibles = capacidad[hora] if hora < horas else ultima
+        while cola and len(fines) < disponibles:
+            _, llegada, i = heapq.heappop(cola)
+            espera[i] = reloj - llegada
+            heapq.heappush(fines, reloj + duraciones[i])
+    return espera
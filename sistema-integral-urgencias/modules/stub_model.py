@@ -0,0 +1,101 @@
+"""
+Modelo stub local que imita la interfaz de Gemini (generate_content)
+Permite medir throughput y probar el flujo de triage sin red ni API key
+"""
+import random
+import threading
+import time
+from typing import Optional
+import config
+from modules.alarm_matcher import AlarmSignMatcher
+
+
+class StubResponse:
+    """Respuesta mínima compatible con la de google.generativeai"""
+
+    def __init__(self, text: str):
+        self.text = text
+
+
+class StubModel:
+    """Modelo determinista con latencia simulada"""
+
+    def __init__(
+        self,
+        latency_s: float = 0.5,
+        jitter_s: float = 0.0,
+        failure_rate: float = 0.0,
+        seed: Optional[int] = None
+    ):
+        """
+        Args:
+            latency_s: Latencia base simulada por solicitud (segundos)
+            jitter_s: Variación aleatoria máxima de la latencia (segundos)
+            failure_rate: Probabilidad de lanzar un error transitorio (0.0 - 1.0)
+            seed: Semilla para reproducibilidad
+        """
+        self.latency_s = latency_s
+        self.jitter_s = jitter_s
+        self.failure_rate = failure_rate
+        self.model_name = "stub-local"
+        self.calls = 0
+        self._rng = random.Random(seed)
+        self._matcher = AlarmSignMatcher(config.SIGNOS_ALARMA, config.SIGNOS_ALARMA_VARIANTES)
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt: str, stream: bool = False, **kwargs):
+        """
+        Genera una respuesta en el formato de TRIAGE_SYSTEM_PROMPT
+
+        Args:
+            prompt: Prompt completo de triage
+            stream: Si es True retorna un iterador de fragmentos (como Gemini)
+            **kwargs: Ignorados (compatibilidad con generate_content)
+
+        Returns:
+            StubResponse con el texto generado, o iterador de StubResponse si stream=True
+        """
+        with self._lock:
+            self.calls += 1
+            delay = self.latency_s + self._rng.uniform(0, self.jitter_s)
+            fail = self._rng.random() < self.failure_rate
+
+        if stream:
+            return self._stream(prompt, delay, fail)
+
+        time.sleep(delay)
+        if fail:
+            raise ConnectionError("Error transitorio simulado por StubModel")
+
+        return StubResponse(self.render(prompt))
+
+    def _stream(self, prompt: str, delay: float, fail: bool):
+        """Emite la respuesta línea a línea repartiendo la latencia entre fragmentos"""
+        if fail:
+            time.sleep(delay)
+            raise ConnectionError("Error transitorio simulado por StubModel")
+
+        lineas = self.render(prompt).splitlines(keepends=True)
+        for linea in lineas:
+            time.sleep(delay / len(lineas))
+            yield StubResponse(linea)
+
+    def render(self, prompt: str) -> str:
+        """Construye la respuesta a partir de los signos presentes en el caso"""
+        caso = prompt.split("CASO CLÍNICO:", 1)[-1]
+        signos = sorted(self._matcher.detect(caso))
+
+        if len(signos) >= 3:
+            nivel = "01"
+        elif signos:
+            nivel = "02"
+        else:
+            nivel = "03"
+
+        lista = "\n".join(f"- {s}" for s in signos) if signos else "- Ninguno"
+        return (
+            f"Nivel de Triage: {nivel}\n"
+            f"Signos de Alarma Detectados:\n{lista}\n\n"
+            f"Razonamiento: Clasificación simulada por el modelo stub "
+            f"({len(signos)} signos de alarma en el caso)."
+        )
@@ -0,0 +1,176 @@
+"""
+Sugerencia automática del protocolo a partir del caso clínico en texto libre
+TF-IDF de n-gramas de caracteres (robusto a tildes, errores de tipeo y
+flexiones) entrenado con el contenido de los protocolos y casos previos.
+Cada protocolo se representa por un centroide; el puntaje de un caso es su
+similitud coseno con cada centroide, calculada en bloque para lotes grandes.
+"""
+import csv
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+import config
+from modules.alarm_matcher import fold_accents
+from modules.protocol_search import searchable_text
+
+
+class SymptomRouter:
+    """Clasificador local caso clínico -> protocolo"""
+
+    def __init__(self, ngram_range: Optional[Tuple[int, int]] = None, min_score: Optional[float] = None):
+        """
+        Args:
+            ngram_range: Rango de n-gramas de caracteres (default: config.SYMPTOM_ROUTER_NGRAM_RANGE)
+            min_score: Similitud mínima para sugerir un protocolo (default: config.SYMPTOM_ROUTER_MIN_SCORE)
+        """
+        self.ngram_range = ngram_range or config.SYMPTOM_ROUTER_NGRAM_RANGE
+        self.min_score = config.SYMPTOM_ROUTER_MIN_SCORE if min_score is None else min_score
+        self.symptoms: List[str] = []
+        self.vectorizer = None
+        self.centroids = None  # matriz dispersa (features x protocolos)
+
+    def fit(self, protocols: Dict[str, Dict], casos: Optional[Iterable[Tuple[str, str]]] = None) -> "SymptomRouter":
+        """
+        Entrena el clasificador
+
+        Args:
+            protocols: Diccionario {sintoma: protocolo}
+            casos: Casos previos como pares (caso_clinico, sintoma_principal);
+                los de síntomas sin protocolo se ignoran
+
+        Returns:
+            El mismo router entrenado
+        """
+        from scipy import sparse
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        from sklearn.preprocessing import normalize
+
+        self.symptoms = list(protocols.keys())
+        posiciones = {sintoma: i for i, sintoma in enumerate(self.symptoms)}
+
+        documentos, etiquetas = [], []
+        for sintoma, protocolo in protocols.items():
+            documentos.append(self._protocol_text(sintoma, protocolo))
+            etiquetas.append(posiciones[sintoma])
+        for caso, sintoma in casos or []:
+            if sintoma in posiciones and caso:
+                documentos.append(caso)
+                etiquetas.append(posiciones[sintoma])
+
+        self.vectorizer = TfidfVectorizer(
+            analyzer="char_wb",
+            ngram_range=self.ngram_range,
+            preprocessor=fold_accents,
+            sublinear_tf=True,
+            dtype=np.float32
+        )
+        X = self.vectorizer.fit_transform(documentos)
+
+        # Centroide por protocolo: suma de sus documentos normalizada (una multiplicación dispersa)
+        pertenencia = sparse.csr_matrix(
+            (np.ones(len(etiquetas), dtype=np.float32), (etiquetas, np.arange(len(etiquetas)))),
+            shape=(len(self.symptoms), len(etiquetas))
+        )
+        self.centroids = normalize(pertenencia @ X).T.tocsr()
+        return self
+
+    @staticmethod
+    def _protocol_text(sintoma: str, protocolo: Dict) -> str:
+        """Texto de entrenamiento de un protocolo (el nombre y los signos pesan más)"""
+        partes = [sintoma] * 3
+        partes += [str(s) for s in protocolo.get("signos_alarma", [])] * 2
+        partes += [str(c) for c in protocolo.get("criterios_triage", [])]
+        partes += [str(p) for p in protocolo.get("preguntas", [])]
+        partes.append(searchable_text(protocolo))
+        return " \n".join(partes)
+
+    @property
+    def is_fitted(self) -> bool:
+        return self.centroids is not None
+
+    def score_matrix(self, casos: List[str]) -> np.ndarray:
+        """
+        Similitud de cada caso con cada protocolo
+
+        Args:
+            casos: Textos de casos clínicos
+
+        Returns:
+            Matriz (casos x protocolos) en el orden de self.symptoms
+        """
+        if not self.is_fitted:
+            raise ValueError("El router no está entrenado")
+        return (self.vectorizer.transform(casos) @ self.centroids).toarray()
+
+    def rank(self, caso: str, top_k: Optional[int] = None) -> List[Dict]:
+        """
+        Protocolos más relevantes para un caso
+
+        Args:
+            caso: Descripción del caso clínico
+            top_k: Número de sugerencias (default: config.SYMPTOM_ROUTER_TOP_K)
+
+        Returns:
+            Lista de {"sintoma", "score"} ordenada por relevancia, sin los que
+            no superan min_score
+        """
+        top_k = top_k or config.SYMPTOM_ROUTER_TOP_K
+        if not self.is_fitted or not caso.strip():
+            return []
+
+        scores = self.score_matrix([caso])[0]
+        orden = np.argsort(-scores)[:top_k]
+        return [
+            {"sintoma": self.symptoms[i], "score": round(float(scores[i]), 4)}
+            for i in orden
+            if scores[i] >= self.min_score
+        ]
+
+    def route_batch(self, casos: List[str], chunk_size: int = 4096) -> Tuple[List[Optional[str]], np.ndarray]:
+        """
+        Asigna el protocolo más probable a cada caso de un lote
+
+        Args:
+            casos: Textos de casos clínicos
+            chunk_size: Casos vectorizados por bloque (limita la memoria)
+
+        Returns:
+            Tupla (síntomas sugeridos o None si no superan min_score, puntajes)
+        """
+        if not self.is_fitted:
+            raise ValueError("El router no está entrenado")
+
+        mejores = np.empty(len(casos), dtype=np.int64)
+        puntajes = np.empty(len(casos), dtype=np.float32)
+        for inicio in range(0, len(casos), chunk_size):
+            bloque = self.score_matrix(casos[inicio:inicio + chunk_size])
+            mejores[inicio:inicio + len(bloque)] = bloque.argmax(axis=1)
+            puntajes[inicio:inicio + len(bloque)] = bloque.max(axis=1)
+
+        sintomas = [
+            self.symptoms[i] if puntaje >= self.min_score else None
+            for i, puntaje in zip(mejores.tolist(), puntajes.tolist())
+        ]
+        return sintomas, puntajes
+
+
+def load_past_cases(path: Optional[str] = None) -> List[Tuple[str, str]]:
+    """
+    Lee casos previos para entrenar el router
+
+    Args:
+        path: CSV con columnas caso_clinico y sintoma_principal
+            (default: config.SYMPTOM_ROUTER_CASES_PATH)
+
+    Returns:
+        Lista de pares (caso_clinico, sintoma_principal); vacía si no hay archivo
+    """
+    path = path or config.SYMPTOM_ROUTER_CASES_PATH
+    if not path or not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8", newline="") as f:
+        return [
+            (fila["caso_clinico"], fila["sintoma_principal"])
+            for fila in csv.DictReader(f)
+            if fila.get("caso_clinico") and fila.get("sintoma_principal")
+        ]
@@ -0,0 +1,141 @@
+"""
+Caché de respuestas del modelo de triage direccionada por contenido
+LRU en memoria con TTL y persistencia opcional en SQLite
+"""
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+class TriageCache:
+    """Caché LRU con expiración para respuestas de generate_content"""
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_s: float = 3600,
+        db_path: Optional[str] = None
+    ):
+        """
+        Args:
+            max_entries: Máximo de entradas en memoria (evicción LRU)
+            ttl_s: Tiempo de vida de cada entrada en segundos
+            db_path: Ruta del archivo SQLite para persistir entre reinicios (opcional)
+        """
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.db_path = db_path
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (timestamp, texto)
+        self._lock = threading.Lock()
+        self._db = None
+
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS triage_cache "
+                "(key TEXT PRIMARY KEY, created REAL NOT NULL, response TEXT NOT NULL)"
+            )
+            self._db.execute(
+                "DELETE FROM triage_cache WHERE created < ?", (time.time() - ttl_s,)
+            )
+            self._db.commit()
+
+    @staticmethod
+    def make_key(prompt: str, model_name: str) -> str:
+        """
+        Genera la clave de caché a partir del prompt renderizado y el modelo
+
+        Args:
+            prompt: Prompt completo enviado al modelo
+            model_name: Nombre del modelo
+
+        Returns:
+            Hash SHA-256 hexadecimal
+        """
+        return hashlib.sha256(f"{model_name}\x00{prompt}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Busca una respuesta en caché
+
+        Args:
+            key: Clave generada con make_key
+
+        Returns:
+            Texto de la respuesta o None si no existe o expiró
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                created, response = entry
+                if now - created <= self.ttl_s:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return response
+                del self._entries[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT created, response FROM triage_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and now - row[0] <= self.ttl_s:
+                    self._store_memory(key, row[0], row[1])
+                    self.hits += 1
+                    return row[1]
+
+            self.misses += 1
+            return None
+
+    def set(self, key: str, response: str):
+        """
+        Guarda una respuesta en caché
+
+        Args:
+            key: Clave generada con make_key
+            response: Texto de la respuesta del modelo
+        """
+        now = time.time()
+        with self._lock:
+            self._store_memory(key, now, response)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO triage_cache (key, created, response) VALUES (?, ?, ?)",
+                    (key, now, response)
+                )
+                self._db.commit()
+
+    def _store_memory(self, key: str, created: float, response: str):
+        """Inserta en memoria y aplica la evicción LRU (requiere el lock)"""
+        self._entries[key] = (created, response)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        """Vacía la caché en memoria y en disco"""
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM triage_cache")
+                self._db.commit()
+
+    def get_stats(self) -> Dict:
+        """
+        Obtiene estadísticas de uso de la caché
+
+        Returns:
+            Diccionario con hits, misses, tasa de aciertos y entradas en memoria
+        """
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entradas": len(self._entries)
+        }
@@ -0,0 +1,194 @@
+"""
+Motor de reglas deterministas para clasificar casos evidentes sin llamar al LLM
+Las reglas se construyen a partir de criterios_triage y signos_alarma de cada protocolo
+"""
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+import config
+from modules.alarm_matcher import AlarmSignMatcher, fold_accents
+
+
+# Código de nivel dentro de un criterio ("01 - ...", "Nivel 02: ...")
+_LEVEL_PATTERN = re.compile(r"\b(01|02|03|07)\b")
+# Separadores entre términos requeridos de un criterio ("dolor torácico + diaforesis, palidez")
+_TERM_SPLIT_PATTERN = re.compile(r"\s*(?:[,;+]|\by\b|\bcon\b)\s*")
+# Separadores entre alternativas de un mismo término ("diaforesis o palidez")
+_ALTERNATIVE_SPLIT_PATTERN = re.compile(r"\s*(?:/|\bo\b)\s*")
+_STRIP_CHARS = " .:-–()\"'"
+# Niveles que una regla nunca resuelve sin el LLM: su confianza queda por debajo
+# de cualquier umbral del fast-path y solo se usan en la clasificación de respaldo
+_LOW_ACUITY_LEVELS = ("03", "07")
+_LOW_ACUITY_CONFIDENCE = 0.5
+
+
+class CompiledProtocolRules:
+    """Reglas precompiladas de un protocolo"""
+
+    def __init__(self, protocolo: Dict):
+        self.sintoma = str(protocolo.get("sintoma", ""))
+        self.criterios = self._parse_criterios(protocolo.get("criterios_triage", []))
+        sintoma_folded = fold_accents(self.sintoma)
+        self.es_cardiovascular = any(
+            fold_accents(palabra) in sintoma_folded for palabra in config.PROTOCOLOS_CARDIOVASCULARES
+        )
+
+    @staticmethod
+    def _parse_criterios(criterios: List) -> List[Tuple[str, List[List[str]], str, AlarmSignMatcher]]:
+        """
+        Convierte cada criterio de texto en (nivel, grupos, texto original, matcher)
+
+        Cada grupo es un término requerido con sus alternativas ("diaforesis o
+        palidez" es un grupo que se cumple con cualquiera de las dos). El matcher
+        busca las alternativas por palabras completas, reporta el índice de su
+        grupo y marca las negadas ("niega diaforesis"), igual que los signos de
+        alarma. Se descartan los criterios sin código de nivel explícito.
+        """
+        parsed = []
+        for criterio in criterios:
+            texto = str(criterio).strip()
+            match = _LEVEL_PATTERN.search(texto)
+            if not match:
+                continue
+            resto = fold_accents(texto[:match.start()] + " " + texto[match.end():])
+            resto = re.sub(r"\b(nivel|triage)\b", " ", resto)
+            grupos = []
+            for termino in _TERM_SPLIT_PATTERN.split(resto):
+                alternativas = [a.strip(_STRIP_CHARS) for a in _ALTERNATIVE_SPLIT_PATTERN.split(termino)]
+                alternativas = [a for a in alternativas if len(a) > 2]
+                if alternativas:
+                    grupos.append(alternativas)
+            if grupos:
+                matcher = AlarmSignMatcher(variantes={
+                    alternativa: str(i) for i, grupo in enumerate(grupos) for alternativa in grupo
+                })
+                parsed.append((match.group(1), grupos, texto, matcher))
+        return parsed
+
+
+class TriageRuleEngine:
+    """Clasificador local de alta certeza para el fast-path de triage"""
+
+    def __init__(self, min_confidence: Optional[float] = None, max_protocolos: Optional[int] = None):
+        """
+        Args:
+            min_confidence: Confianza mínima para resolver sin LLM (default: config)
+            max_protocolos: Protocolos compilados en memoria (default: config.PROTOCOL_COMPILED_MAX_ENTRIES)
+        """
+        self.min_confidence = (
+            config.TRIAGE_FAST_PATH_MIN_CONFIDENCE if min_confidence is None else min_confidence
+        )
+        self.max_protocolos = max_protocolos or config.PROTOCOL_COMPILED_MAX_ENTRIES
+        self._compiled = OrderedDict()  # Del menos al más usado
+        self._lock = threading.Lock()
+
+    def compile_protocols(self, protocols: Dict[str, Dict]):
+        """
+        Precompila las reglas de todos los protocolos cargados
+
+        Args:
+            protocols: Diccionario {sintoma: protocolo} de ProtocolLoader
+        """
+        for protocolo in protocols.values():
+            self._get_rules(protocolo)
+
+    def _get_rules(self, protocolo: Dict) -> CompiledProtocolRules:
+        """Obtiene (o compila) las reglas de un protocolo; descarta las menos usadas"""
+        key = (
+            protocolo.get("sintoma"),
+            tuple(map(str, protocolo.get("criterios_triage", []))),
+            tuple(map(str, protocolo.get("signos_alarma", [])))
+        )
+        with self._lock:
+            rules = self._compiled.get(key)
+            if rules is not None:
+                self._compiled.move_to_end(key)
+                return rules
+        rules = CompiledProtocolRules(protocolo)
+        with self._lock:
+            self._compiled[key] = rules
+            while len(self._compiled) > self.max_protocolos:
+                self._compiled.popitem(last=False)
+        return rules
+
+    def evaluate(
+        self,
+        caso_clinico: str,
+        sintoma_principal: str,
+        protocolo: Optional[Dict],
+        signos_detectados: List[str],
+        min_confidence: Optional[float] = None
+    ) -> Optional[Dict]:
+        """
+        Intenta clasificar el caso con reglas locales
+
+        Args:
+            caso_clinico: Descripción del caso
+            sintoma_principal: Síntoma principal seleccionado
+            protocolo: Protocolo aplicable
+            signos_detectados: Signos de alarma (globales y del protocolo) detectados en el caso
+            min_confidence: Umbral para esta evaluación (default: el del motor)
+
+        Los criterios de nivel 03/07 tienen confianza _LOW_ACUITY_CONFIDENCE:
+        bajar la prioridad de un caso lo decide siempre el LLM, y la regla solo
+        se usa como respaldo cuando el modelo no responde (min_confidence=0).
+
+        Returns:
+            Diccionario de resultado (mismo formato que classify_triage) si la
+            confianza supera el umbral, o None si el caso debe ir al LLM
+        """
+        protocolo = protocolo or {"sintoma": sintoma_principal}
+        rules = self._get_rules(protocolo)
+        signos = list(signos_detectados)
+
+        candidatos = []
+
+        # Criterios explícitos del protocolo: una alternativa de cada término
+        # presente y no negada
+        for nivel, grupos, texto_criterio, matcher in rules.criterios:
+            matches = matcher.find(caso_clinico)
+            presentes = {m.signo for m in matches if not m.negado}
+            if len(presentes) < len(grupos):
+                continue
+            if nivel in _LOW_ACUITY_LEVELS:
+                # Nunca bajar a 03/07 por regla si hay signos de alarma o si
+                # algún término del criterio aparece también negado
+                if signos or any(m.negado for m in matches):
+                    continue
+                confianza = _LOW_ACUITY_CONFIDENCE
+            else:
+                confianza = 0.95 if len(grupos) >= 2 else 0.8
+            candidatos.append((nivel, confianza, f"criterio del protocolo: \"{texto_criterio}\""))
+
+        # Combinación de signos de alarma
+        n_signos = len(signos)
+        if rules.es_cardiovascular and n_signos >= 2:
+            candidatos.append(("01", 0.95, f"protocolo cardiovascular con {n_signos} signos de alarma"))
+        elif rules.es_cardiovascular and n_signos == 1:
+            candidatos.append(("02", 0.85, "protocolo cardiovascular con 1 signo de alarma"))
+        elif n_signos >= 3:
+            candidatos.append(("01", 0.9, f"{n_signos} signos de alarma simultáneos"))
+
+        if not candidatos:
+            return None
+
+        # Prioridad: nivel más grave y luego mayor confianza
+        prioridad = {"01": 0, "02": 1, "07": 2, "03": 3}
+        nivel, confianza, motivo = min(candidatos, key=lambda c: (prioridad[c[0]], -c[1]))
+        if confianza < (self.min_confidence if min_confidence is None else min_confidence):
+            return None
+
+        razonamiento = f"Clasificación por regla local ({motivo})."
+        lista = "\n".join(f"- {s}" for s in signos) if signos else "- Ninguno"
+        return {
+            "nivel_triage": nivel,
+            "signos_alarma": signos,
+            "razonamiento": razonamiento,
+            "confianza": confianza,
+            "respuesta_completa": (
+                f"Nivel de Triage: {nivel}\n"
+                f"Signos de Alarma Detectados:\n{lista}\n\n"
+                f"Razonamiento: {razonamiento}"
+            )
+        }
@@ -0,0 +1,400 @@
+"""
+Almacén columnar local de consultas históricas
+Las consultas ingeridas se agregan a archivos Parquet particionados por sede y
+mes (sede=<sede>/mes=<AAAA-MM>/), y los conteos por hora se materializan junto
+a ellas en un archivo Arrow (Feather sin compresión) que se lee con memory-map.
+Recargar los datos para predecir (por hora o por día) no vuelve a parsear el CSV.
+Cada partición pertenece al último archivo que la trajo: un archivo que repite
+meses ya ingeridos los reemplaza en lugar de sumarlos dos veces.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+import pandas as pd
+import config
+from modules.historical_ingest import DATETIME_COLUMN, TRIAGE_COLUMN, VisitCounts, VisitCSVReader
+
+
+MANIFEST_FILE = "manifest.json"
+COUNTS_FILE = "conteos_horarios.arrow"
+VISITS_DIR = "visitas"
+NO_SITE = "sin_sede"  # Partición de archivos sin columna de sede
+
+
+def hash_file(csv_file) -> str:
+    """
+    SHA-256 del contenido (UploadedFile, objeto tipo archivo o ruta)
+
+    Los objetos tipo archivo quedan posicionados al inicio para poder leerlos.
+    """
+    digest = hashlib.sha256()
+    if hasattr(csv_file, "getvalue"):
+        digest.update(csv_file.getvalue())
+    elif hasattr(csv_file, "read"):
+        for bloque in iter(lambda: csv_file.read(1 << 20), b""):
+            digest.update(bloque if isinstance(bloque, bytes) else bloque.encode("utf-8"))
+        csv_file.seek(0)
+    else:
+        with open(csv_file, "rb") as f:
+            for bloque in iter(lambda: f.read(1 << 20), b""):
+                digest.update(bloque)
+    return digest.hexdigest()
+
+
+def _write_json(path: str, data: Dict):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+
+
+def _partition_name(valor: str) -> str:
+    """
+    Nombre de directorio seguro para el valor de una partición
+
+    Si hay que reemplazar caracteres se agrega un hash del valor original, para
+    que dos sedes distintas ("Sede Norte", "Sede/Norte") no compartan directorio.
+    """
+    nombre = re.sub(r"[^\w.-]+", "_", valor)
+    if nombre == valor and nombre:
+        return nombre
+    return f"{nombre or NO_SITE}-{hashlib.sha1(valor.encode('utf-8')).hexdigest()[:8]}"
+
+
+def _partition_key(sede: str, mes: str) -> str:
+    return f"{sede}|{mes}"
+
+
+class _PartitionWriters:
+    """Un ParquetWriter abierto por partición (sede, mes) durante una ingesta"""
+
+    def __init__(self, visits_dir: str, ingest_id: str):
+        self.visits_dir = visits_dir
+        self.ingest_id = ingest_id
+        self._writers = {}
+
+    def write(self, chunk: pd.DataFrame):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        fechas = chunk[DATETIME_COLUMN]
+        sedes = (
+            chunk[config.SITE_COLUMN] if config.SITE_COLUMN in chunk.columns
+            else pd.Series(NO_SITE, index=chunk.index)
+        )
+        # AAAAMM como entero: strftime fila por fila es el paso más lento del bloque
+        meses = (fechas.dt.year * 100 + fechas.dt.month).to_numpy()
+        tabla = pa.table({
+            DATETIME_COLUMN: pa.array(fechas.to_numpy(dtype="datetime64[s]")),
+            TRIAGE_COLUMN: pa.array(
+                chunk[TRIAGE_COLUMN].astype(str).to_numpy() if TRIAGE_COLUMN in chunk.columns
+                else [""] * len(chunk),
+                type=pa.string()
+            )
+        })
+        particiones = pd.Series(meses).groupby([sedes.to_numpy(), meses], sort=False, observed=True, dropna=False).indices
+        for (sede, mes), posiciones in particiones.items():
+            parte = tabla.take(posiciones)
+            clave = (str(sede) if pd.notna(sede) else NO_SITE, f"{mes // 100:04d}-{mes % 100:02d}")
+            writer = self._writers.get(clave)
+            if writer is None:
+                directorio = os.path.join(self.visits_dir, f"sede={_partition_name(clave[0])}", f"mes={clave[1]}")
+                os.makedirs(directorio, exist_ok=True)
+                path = os.path.join(directorio, f"part-{self.ingest_id}.parquet.tmp")
+                writer = pq.ParquetWriter(path, parte.schema)
+                self._writers[clave] = writer
+            writer.write_table(parte)
+
+    def sites(self) -> Dict[str, str]:
+        """Sedes escritas: {nombre de directorio: sede original}"""
+        return {_partition_name(sede): sede for sede, _ in self._writers}
+
+    def partitions(self) -> List[str]:
+        """Particiones escritas ("sede|AAAA-MM")"""
+        return sorted(_partition_key(sede, mes) for sede, mes in self._writers)
+
+    def close(self, commit: bool = True):
+        """
+        Cierra los archivos; si commit, los publica (rename) reemplazando los
+        Parquet anteriores de cada partición, y si no los borra
+        """
+        for writer in self._writers.values():
+            writer.close()
+            tmp_path = writer.where
+            if commit:
+                directorio = os.path.dirname(tmp_path)
+                for archivo in os.listdir(directorio):
+                    if archivo.endswith(".parquet"):
+                        os.remove(os.path.join(directorio, archivo))
+                os.replace(tmp_path, tmp_path[:-len(".tmp")])
+            else:
+                os.remove(tmp_path)
+        self._writers.clear()
+
+
+def _in_partitions(conteos: pd.DataFrame, particiones: List[str]) -> pd.Series:
+    """Filas de conteos que caen en las particiones "sede|AAAA-MM" (sede nula o vacía = sin sede)"""
+    sedes = conteos[config.SITE_COLUMN].astype(object).fillna("").astype(str).replace("", NO_SITE)
+    # Mes como entero AAAAMM: strftime sobre cada hora es lo más lento
+    meses = conteos["fecha"].dt.year * 100 + conteos["fecha"].dt.month
+    claves = [
+        (sede, int(mes.replace("-", ""))) for sede, mes in (clave.rsplit("|", 1) for clave in particiones)
+    ]
+    return pd.Series(pd.MultiIndex.from_arrays([sedes, meses]).isin(claves), index=conteos.index)
+
+
+class VisitStore:
+    """Consultas en Parquet por sede/mes y conteos por hora materializados"""
+
+    def __init__(self, store_dir: Optional[str] = None):
+        """
+        Args:
+            store_dir: Directorio del almacén (default: config.VISIT_STORE_DIR)
+        """
+        self.store_dir = store_dir or config.VISIT_STORE_DIR
+        self.visits_dir = os.path.join(self.store_dir, VISITS_DIR)
+        self.counts_path = os.path.join(self.store_dir, COUNTS_FILE)
+        self.manifest_path = os.path.join(self.store_dir, MANIFEST_FILE)
+        os.makedirs(self.visits_dir, exist_ok=True)
+        self._lock = threading.RLock()
+
+    def _read_manifest(self) -> Dict:
+        if not os.path.exists(self.manifest_path):
+            return {"archivos": {}, "particiones": {}, "sedes": {}}
+        with open(self.manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        # Almacenes anteriores sin dueño por partición: se vuelven a ingerir
+        manifest.setdefault("particiones", {})
+        manifest.setdefault("sedes", {})
+        return manifest
+
+    def _site_names(self) -> Dict[str, str]:
+        """{nombre de directorio: sede original} (el directorio pierde espacios y símbolos)"""
+        return self._read_manifest()["sedes"]
+
+    def _write_atomic(self, path: str, write):
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        write(tmp_path)
+        os.replace(tmp_path, path)
+
+    def ingested_files(self) -> Dict[str, Dict]:
+        """Archivos con particiones vigentes: {hash: {nombre, filas, descartadas, fecha, particiones}}"""
+        return self._read_manifest()["archivos"]
+
+    @staticmethod
+    def _is_current(manifest: Dict, digest: str) -> bool:
+        """True si todas las particiones del archivo siguen siendo suyas"""
+        archivo = manifest["archivos"].get(digest)
+        return archivo is not None and all(
+            manifest["particiones"].get(clave) == digest for clave in archivo.get("particiones", [None])
+        )
+
+    def ingest(self, csv_file, chunk_size: Optional[int] = None, nombre: Optional[str] = None) -> Dict:
+        """
+        Agrega las consultas de un CSV al almacén
+
+        Las particiones sede/mes del archivo reemplazan a las que ya existían
+        (se asume que cada exportación trae los meses completos), así que subir
+        enero y luego enero-febrero no cuenta enero dos veces. Un archivo cuyo
+        contenido ya está ingerido y vigente no se vuelve a leer.
+
+        Args:
+            csv_file: Ruta o archivo CSV de consultas
+            chunk_size: Filas por bloque (default: config.HISTORICAL_CSV_CHUNK_ROWS)
+            nombre: Nombre a registrar en el manifiesto
+
+        Returns:
+            Diccionario con hash, nuevo (False si ya estaba ingerido), filas,
+            descartadas y particiones ("sede|AAAA-MM") del archivo
+        """
+        digest = hash_file(csv_file)
+        nombre = nombre or getattr(csv_file, "name", None) or str(csv_file)
+        with self._lock:
+            manifest = self._read_manifest()
+            if self._is_current(manifest, digest):
+                return {"hash": digest, "nuevo": False, **manifest["archivos"][digest]}
+            if manifest["archivos"] and not os.path.exists(self.counts_path):
+                # Antes de publicar las particiones nuevas, que no deben contarse dos veces
+                self.rebuild_counts()
+
+            lector = VisitCSVReader(csv_file, chunk_size=chunk_size)
+            nuevos = VisitCounts("hora")
+            writers = _PartitionWriters(self.visits_dir, f"{datetime.now():%Y%m%d%H%M%S}-{uuid.uuid4().hex[:8]}")
+            try:
+                for chunk in lector:
+                    writers.write(chunk)
+                    nuevos.add(chunk)
+            except Exception:
+                writers.close(commit=False)
+                raise
+            particiones = writers.partitions()
+            manifest["sedes"].update(writers.sites())
+            writers.close()
+
+            self._merge_counts(nuevos.long_counts(), particiones)
+            for clave in particiones:
+                manifest["particiones"][clave] = digest
+            manifest["archivos"][digest] = {
+                "nombre": nombre,
+                "filas": lector.filas_leidas,
+                "descartadas": lector.filas_descartadas,
+                "fecha": datetime.now().isoformat(timespec="seconds"),
+                "particiones": particiones
+            }
+            # Archivos cuyas particiones fueron todas reemplazadas
+            vigentes = set(manifest["particiones"].values())
+            manifest["archivos"] = {h: a for h, a in manifest["archivos"].items() if h in vigentes}
+            self._write_atomic(self.manifest_path, lambda path: _write_json(path, manifest))
+        return {"hash": digest, "nuevo": True, **manifest["archivos"][digest]}
+
+    def ingest_file_counts(self, csv_file, chunk_size: Optional[int] = None) -> Tuple[Dict, VisitCounts]:
+        """
+        Ingiere el CSV y devuelve solo sus conteos por hora, sin los de otros
+        archivos del almacén (bajo el lock: otra ingesta no puede reemplazar
+        sus particiones entre ambos pasos)
+
+        Returns:
+            Tupla (resultado de ingest, conteos del archivo)
+        """
+        with self._lock:
+            ingesta = self.ingest(csv_file, chunk_size=chunk_size)
+            return ingesta, self.load_counts_by_hour(ingesta["particiones"])
+
+    def _merge_counts(self, nuevos: pd.DataFrame, particiones: List[str]):
+        """
+        Reemplaza en los conteos materializados los de las particiones dadas
+        y reescribe el archivo Arrow
+        """
+        actuales = self._read_counts()
+        if not actuales.empty:
+            actuales = actuales[~_in_partitions(actuales, particiones)]
+        partes = [df for df in (actuales, nuevos) if not df.empty]
+        if partes:
+            self._write_counts(pd.concat(partes, ignore_index=True) if len(partes) > 1 else partes[0])
+
+    def _write_counts(self, conteos: pd.DataFrame):
+        import pyarrow as pa
+        import pyarrow.feather as feather
+
+        conteos = (
+            conteos.groupby(["fecha", config.SITE_COLUMN, TRIAGE_COLUMN], sort=True)["pacientes"]
+            .sum()
+            .reset_index()
+        )
+        tabla = pa.Table.from_pandas(conteos, preserve_index=False)
+        # Sin compresión para poder leerlo con memory-map
+        self._write_atomic(self.counts_path, lambda path: feather.write_feather(tabla, path, compression="uncompressed"))
+
+    def load_counts(self) -> pd.DataFrame:
+        """
+        Conteos por hora materializados (lectura con memory-map)
+
+        Si faltan (almacén de una versión anterior) se reconstruyen desde Parquet.
+
+        Returns:
+            DataFrame con fecha, sede, triage_asignado y pacientes (vacío si no hay datos)
+        """
+        if not os.path.exists(self.counts_path) and self.ingested_files():
+            self.rebuild_counts()
+        return self._read_counts()
+
+    def _read_counts(self) -> pd.DataFrame:
+        if not os.path.exists(self.counts_path):
+            return pd.DataFrame()
+        import pyarrow as pa
+
+        with pa.memory_map(self.counts_path, "r") as source:
+            # Sede y nivel como categorías: los agrupamientos posteriores son más rápidos
+            return pa.ipc.open_file(source).read_all().to_pandas(strings_to_categorical=True)
+
+    def load_counts_by_hour(self, particiones: Optional[List[str]] = None) -> VisitCounts:
+        """
+        Acumulador con los conteos por hora materializados (series(), daily()...)
+
+        Args:
+            particiones: Solo estas particiones "sede|AAAA-MM" (por ejemplo las
+                         de un archivo, ver ingest); None = todo el almacén
+        """
+        conteos = self.load_counts()
+        if particiones is not None and not conteos.empty:
+            conteos = conteos[_in_partitions(conteos, particiones)]
+        return VisitCounts.from_counts(conteos, "hora")
+
+    def load_daily(self, particiones: Optional[List[str]] = None) -> VisitCounts:
+        """Acumulador con los conteos por día (daily() y daily_by_site())"""
+        return self.load_counts_by_hour(particiones).rollup("dia")
+
+    def rebuild_counts(self):
+        """Recalcula los conteos materializados leyendo las particiones Parquet"""
+        import pyarrow.dataset as ds
+
+        conteos = VisitCounts("hora")
+        nombres = self._site_names()
+        if os.listdir(self.visits_dir):
+            dataset = ds.dataset(self.visits_dir, format="parquet", partitioning="hive")
+            for batch in dataset.to_batches(columns=[DATETIME_COLUMN, TRIAGE_COLUMN, config.SITE_COLUMN]):
+                chunk = batch.to_pandas()
+                # Sede original, no el nombre del directorio: las claves "sede|AAAA-MM"
+                # del manifiesto deben seguir coincidiendo con los conteos
+                directorios = chunk[config.SITE_COLUMN].astype(str)
+                sedes = directorios.map(nombres).fillna(directorios)
+                chunk[config.SITE_COLUMN] = sedes.where(sedes != NO_SITE).astype("category")
+                chunk[TRIAGE_COLUMN] = chunk[TRIAGE_COLUMN].replace("", None).astype("category")
+                conteos.add(chunk)
+        with self._lock:
+            self._write_counts(conteos.long_counts())
+
+    def read_visits(
+        self,
+        sedes: Optional[List[str]] = None,
+        desde: Optional[str] = None,
+        hasta: Optional[str] = None
+    ) -> pd.DataFrame:
+        """
+        Lee consultas individuales leyendo solo las particiones necesarias
+
+        Args:
+            sedes: Sedes a incluir (default: todas)
+            desde: Mes inicial "AAAA-MM" (inclusive)
+            hasta: Mes final "AAAA-MM" (inclusive)
+
+        Returns:
+            DataFrame con fecha_hora, triage_asignado, sede (nombre original) y mes
+        """
+        import pyarrow.dataset as ds
+
+        if not os.listdir(self.visits_dir):
+            return pd.DataFrame(columns=[DATETIME_COLUMN, TRIAGE_COLUMN, config.SITE_COLUMN, "mes"])
+        dataset = ds.dataset(self.visits_dir, format="parquet", partitioning="hive")
+        filtro = None
+        condiciones = []
+        if sedes:
+            condiciones.append(ds.field(config.SITE_COLUMN).isin([_partition_name(s) for s in sedes]))
+        if desde:
+            condiciones.append(ds.field("mes") >= desde)
+        if hasta:
+            condiciones.append(ds.field("mes") <= hasta)
+        for condicion in condiciones:
+            filtro = condicion if filtro is None else filtro & condicion
+        visitas = dataset.to_table(filter=filtro).to_pandas()
+        directorios = visitas[config.SITE_COLUMN].astype(str)
+        visitas[config.SITE_COLUMN] = directorios.map(self._site_names()).fillna(directorios)
+        return visitas
+
+    def stats(self) -> Dict:
+        """Archivos ingeridos, particiones y rango de fechas materializado"""
+        conteos = self.load_counts()
+        particiones = sum(
+            1 for _, _, archivos in os.walk(self.visits_dir) if any(a.endswith(".parquet") for a in archivos)
+        )
+        return {
+            "archivos": len(self.ingested_files()),
+            "particiones": particiones,
+            "consultas": int(conteos["pacientes"].sum()) if not conteos.empty else 0,
+            "dias": int(conteos["fecha"].dt.normalize().nunique()) if not conteos.empty else 0,
+            "desde": str(conteos["fecha"].min().date()) if not conteos.empty else None,
+            "hasta": str(conteos["fecha"].max().date()) if not conteos.empty else None
+        }
@@ -0,0 +1,154 @@
+"""Detección de signos de alarma: variantes, plurales, negaciones y paridad con el escaneo anterior"""
+import threading
+import pytest
+import config
+from modules.alarm_matcher import AlarmSignMatcher, fold_accents, fold_plural
+
+
+# Lista y escaneo por subcadena anteriores al autómata
+SIGNOS_ANTERIORES = ["palidez", "diaforesis", "náuseas", "nauseas", "vómito", "vomito", "epigastralgia", "disnea"]
+
+CASOS = [
+    "Paciente con vómitos y náuseas",
+    "Paciente con vomitos y nauseas desde ayer",
+    "Dolor torácico, diaforesis y palidez generalizada",
+    "Disnea de medianos esfuerzos, epigastralgia",
+    "Refiere NÁUSEAS, VÓMITO en dos ocasiones",
+    "Mujer de 60 años con epigastralgia y disnea súbita"
+]
+
+
+def _detect_anterior(texto: str) -> set:
+    texto = texto.lower()
+    return {fold_accents(signo) for signo in SIGNOS_ANTERIORES if signo in texto}
+
+
+@pytest.fixture(scope="module")
+def matcher():
+    return AlarmSignMatcher(config.SIGNOS_ALARMA, config.SIGNOS_ALARMA_VARIANTES)
+
+
+@pytest.mark.parametrize("texto", CASOS)
+def test_detecta_al_menos_lo_del_escaneo_anterior(matcher, texto):
+    detectados = {fold_accents(signo) for signo in matcher.detect(texto)}
+    anteriores = {fold_plural(signo) for signo in _detect_anterior(texto)}
+    assert anteriores <= {fold_plural(signo) for signo in detectados}
+
+
+def test_plurales(matcher):
+    assert matcher.detect("Paciente con vómitos y náuseas") == ["Vómito", "Náuseas"]
+    assert matcher.detect("vomitos repetidos") == ["Vómito"]
+
+
+@pytest.mark.parametrize("texto, signo", [
+    ("Paciente disneico", "Disnea"),
+    ("Se observa pálido", "Palidez"),
+    ("Diaforético al ingreso", "Diaforesis"),
+    ("Presenta sudoración profusa", "Diaforesis"),
+    ("Dolores epigástricos", "Epigastralgia")
+])
+def test_variantes_se_reportan_con_el_signo(matcher, texto, signo):
+    assert matcher.detect(texto) == [signo]
+
+
+def test_limites_de_palabra(matcher):
+    assert matcher.detect("Paciente con disneas") == ["Disnea"]
+    assert matcher.detect("Antecedente de palideznia") == []
+
+
+def test_negaciones(matcher):
+    assert matcher.detect("Niega vómitos y disnea") == ["Disnea"]
+    assert matcher.detect("Sin náuseas ni vómito") == []
+    matches = matcher.find("niega diaforesis")
+    assert [(m.signo, m.negado) for m in matches] == [("Diaforesis", True)]
+
+
+@pytest.mark.parametrize("texto", [
+    "No presenta disnea",
+    "Sin datos de disnea",
+    "Niega la disnea",
+    "Sin vómito o disnea"
+])
+def test_negacion_directa_del_signo(matcher, texto):
+    assert "Disnea" not in matcher.detect(texto)
+    assert any(m.negado for m in matcher.find(texto))
+
+
+@pytest.mark.parametrize("texto", [
+    "Sin mejoría de la disnea",
+    "No tiene antecedentes relevantes disnea",
+    "No tolera la vía oral, disnea",
+    "Sin fiebre ni tos, disnea"
+])
+def test_negacion_no_alcanza_al_signo(matcher, texto):
+    assert matcher.detect(texto) == ["Disnea"]
+
+
+def test_signos_del_protocolo_solo_con_su_fuente(matcher):
+    fuente = matcher.register_protocol({"sintoma": "Cefalea", "signos_alarma": ["rigidez de nuca"]})
+    assert matcher.detect("Rigidez de nuca") == []
+    assert matcher.detect("Rigidez de nuca", fuente) == ["Rigidez de nuca"]
+
+
+def test_protocolos_menos_usados_se_descartan():
+    matcher = AlarmSignMatcher(["disnea"], max_protocolos=2)
+    base = matcher.total_terminos
+    fuentes = [
+        matcher.register_protocol({"sintoma": f"P{i}", "signos_alarma": ["rigidez de nuca", "disnea súbita"]})
+        for i in range(3)
+    ]
+
+    assert matcher.registered_protocols() == 2
+    assert matcher.total_terminos == base + 4
+    assert matcher.detect("Rigidez de nuca", fuentes[0]) == []
+    assert matcher.detect("Rigidez de nuca", fuentes[2]) == ["Rigidez de nuca"]
+    # Los signos globales que comparten prefijo con los descartados siguen
+    assert matcher.detect("Disnea") == ["Disnea"]
+
+    # Registrar otra vez el descartado lo vuelve a agregar
+    assert matcher.register_protocol({"sintoma": "P0", "signos_alarma": ["rigidez de nuca", "disnea súbita"]}) == fuentes[0]
+    assert matcher.detect("Disnea súbita", fuentes[0]) == ["Disnea súbita"]
+    assert matcher.detect("Disnea súbita", fuentes[1]) == ["Disnea"]
+
+
+def test_busqueda_concurrente_con_descartes():
+    matcher = AlarmSignMatcher(["disnea"], max_protocolos=1)
+    protocolos = [
+        {"sintoma": f"P{i}", "signos_alarma": [f"rigidez de nuca {i}", "disnea súbita", "dolor torácico opresivo"]}
+        for i in range(4)
+    ]
+    detener = threading.Event()
+    errores = []
+
+    def registrar():
+        while not detener.is_set():
+            for protocolo in protocolos:
+                matcher.register_protocol(protocolo)
+
+    def buscar():
+        try:
+            for _ in range(2000):
+                fuente = matcher.register_protocol(protocolos[0])
+                matcher.detect("Disnea súbita con dolor torácico opresivo y rigidez de nuca 0", fuente)
+        except Exception as e:
+            errores.append(e)
+
+    escritor = threading.Thread(target=registrar)
+    lectores = [threading.Thread(target=buscar) for _ in range(4)]
+    escritor.start()
+    for lector in lectores:
+        lector.start()
+    for lector in lectores:
+        lector.join()
+    detener.set()
+    escritor.join()
+    assert errores == []
+
+
+def test_descartar_no_modifica_el_trie_en_uso():
+    matcher = AlarmSignMatcher(max_protocolos=1)
+    matcher.register_protocol({"sintoma": "P0", "signos_alarma": ["rigidez de nuca"]})
+    # Una búsqueda en curso conserva la raíz que leyó al empezar
+    raiz = matcher._trie
+    matcher.register_protocol({"sintoma": "P1", "signos_alarma": ["disnea"]})
+    assert "rigidez" in raiz and "rigidez" not in matcher._trie
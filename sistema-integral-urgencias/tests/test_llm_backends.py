@@ -0,0 +1,34 @@
+"""Backends de modelos: formato de las solicitudes"""
+from modules.llm_backends import OpenAICompatibleBackend
+
+
+class _Response:
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {"choices": [{"message": {"content": "Nivel de Triage: 03"}}]}
+
+
+class _Session:
+    def __init__(self):
+        self.cuerpos = []
+
+    def post(self, url, json=None, **kwargs):
+        self.cuerpos.append(json)
+        return _Response()
+
+
+def test_openai_sends_the_system_prefix_as_system_message():
+    backend = OpenAICompatibleBackend(base_url="http://localhost:1", api_key="")
+    backend.session = _Session()
+
+    assert backend.generate_content("caso", system="prefijo").text == "Nivel de Triage: 03"
+    backend.generate_content("caso")
+
+    con_sistema, sin_sistema = backend.session.cuerpos
+    assert con_sistema["messages"] == [
+        {"role": "system", "content": "prefijo"},
+        {"role": "user", "content": "caso"}
+    ]
+    assert sin_sistema["messages"] == [{"role": "user", "content": "caso"}]
@@ -0,0 +1,137 @@
+"""Prefijo de sistema y clasificación en batch: orden, timeouts con reintentos, caché y event loop activo"""
+import asyncio
+import re
+import threading
+import time
+import config
+from modules.med_engine import MedEngine
+from modules.prompt_builder import PromptBuilder
+from modules.stub_model import StubModel, StubResponse
+from modules.triage_cache import TriageCache
+
+
+PROTOCOLO = {"sintoma": "Cefalea", "criterios_triage": [], "signos_alarma": []}
+CASOS = [
+    {"caso_clinico": f"Caso {i}: cefalea leve", "sintoma_principal": "Cefalea", "protocolo": PROTOCOLO}
+    for i in range(4)
+]
+
+
+class _CaseModel:
+    """Responde con el número de caso del prompt; los primeros casos tardan más"""
+
+    model_name = "caso"
+
+    def __init__(self, n_casos: int, bloqueo: threading.Event = None):
+        self.n_casos = n_casos
+        self.bloqueo = bloqueo
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        with self._lock:
+            self.calls += 1
+        if self.bloqueo is not None:
+            self.bloqueo.wait()
+        numero = int(re.search(r"Caso (\d+)", prompt).group(1))
+        time.sleep((self.n_casos - numero) * 0.02)
+        return StubResponse(
+            "Nivel de Triage: 02\n"
+            "Signos de Alarma Detectados:\n- Ninguno\n\n"
+            f"Razonamiento: respuesta al caso {numero}"
+        )
+
+
+class _RecordingModel:
+    """Guarda el contenido y la instrucción de sistema de cada llamada"""
+
+    model_name = "registro"
+
+    def __init__(self):
+        self.llamadas = []
+
+    def generate_content(self, prompt, stream=False, system=None, **kwargs):
+        self.llamadas.append((prompt, system))
+        respuesta = StubResponse("Nivel de Triage: 02\nSignos de Alarma Detectados:\n- Ninguno\n\nRazonamiento: ok")
+        return iter([respuesta]) if stream else respuesta
+
+
+def _engine(model=None, cache=None) -> MedEngine:
+    engine = MedEngine(model=StubModel(latency_s=0.0, seed=1), cache=cache or TriageCache(max_entries=0))
+    if model is not None:
+        # Sin ResilientModel: el timeout por intento es el del batch
+        engine.model = model
+    engine.rule_engine = None
+    return engine
+
+
+def test_batch_classify_without_loop():
+    resultados = _engine().batch_classify(CASOS)
+    assert len(resultados) == len(CASOS)
+    assert all(r["nivel_triage"] for r in resultados)
+
+
+def test_results_keep_input_order():
+    # El caso 0 es el que termina último
+    resultados = _engine(_CaseModel(len(CASOS))).batch_classify(CASOS, max_concurrency=len(CASOS))
+    assert [r["razonamiento"] for r in resultados] == [f"respuesta al caso {i}" for i in range(len(CASOS))]
+
+
+def test_timeout_retries_then_falls_back_locally(monkeypatch):
+    monkeypatch.setattr(config, "BATCH_BACKOFF_BASE_S", 0.01)
+    monkeypatch.setattr(config, "TRIAGE_LOCAL_FALLBACK_ENABLED", True)
+    bloqueo = threading.Event()
+    model = _CaseModel(1, bloqueo)
+    try:
+        resultados = _engine(model).batch_classify(CASOS[:1], timeout_s=0.05, max_retries=2)
+    finally:
+        bloqueo.set()
+
+    assert model.calls == 3
+    assert resultados[0]["razonamiento"].startswith("Modelo no disponible (Timeout de 0.05s excedido)")
+    assert resultados[0]["confianza"] <= 0.6
+
+
+def test_second_batch_is_served_from_cache():
+    model = _CaseModel(len(CASOS))
+    engine = _engine(model, cache=TriageCache(max_entries=100))
+
+    primero = engine.batch_classify(CASOS)
+    segundo = engine.batch_classify(CASOS)
+
+    assert model.calls == len(CASOS)
+    assert [r["respuesta_completa"] for r in segundo] == [r["respuesta_completa"] for r in primero]
+    assert engine.cache.get_stats()["hits"] == len(CASOS)
+
+
+def test_batch_classify_inside_running_loop():
+    async def main():
+        return _engine(_CaseModel(len(CASOS))).batch_classify(CASOS)
+
+    resultados = asyncio.run(main())
+    assert [r["razonamiento"] for r in resultados] == [f"respuesta al caso {i}" for i in range(len(CASOS))]
+
+
+def test_abatch_classify_from_async_code():
+    async def main():
+        return await _engine(_CaseModel(len(CASOS))).abatch_classify(CASOS)
+
+    resultados = asyncio.run(main())
+    assert [r["razonamiento"] for r in resultados] == [f"respuesta al caso {i}" for i in range(len(CASOS))]
+
+
+def test_system_prefix_is_sent_apart_from_the_case():
+    model = _RecordingModel()
+    # El modelo queda envuelto en ResilientModel, que debe pasar system
+    engine = MedEngine(model=model, cache=TriageCache(max_entries=0))
+    engine.rule_engine = None
+
+    engine.classify_triage(CASOS[0]["caso_clinico"], "Cefalea", PROTOCOLO)
+    list(engine.classify_triage_stream(CASOS[1]["caso_clinico"], "Cefalea", PROTOCOLO))
+
+    prefijo = PromptBuilder().system_prefix
+    assert len(model.llamadas) == 2
+    for (contenido, sistema), caso in zip(model.llamadas, CASOS):
+        assert sistema == prefijo
+        assert prefijo not in contenido
+        assert caso["caso_clinico"] in contenido
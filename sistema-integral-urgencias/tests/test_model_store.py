@@ -0,0 +1,33 @@
+"""ModelStore: un puntero de warm-start por serie"""
+import logging
+import numpy as np
+import pandas as pd
+import pytest
+from modules.model_store import ModelStore
+
+pytest.importorskip("prophet")
+from modules.forecast_backends import ProphetBackend  # noqa: E402
+
+
+PARAMS = {"yearly_seasonality": False, "weekly_seasonality": True, "daily_seasonality": False}
+
+
+def _serie(semilla: int, dias: int) -> pd.DataFrame:
+    rng = np.random.default_rng(semilla)
+    fechas = pd.date_range("2024-01-01", periods=dias, freq="D")
+    return pd.DataFrame({"ds": fechas, "y": rng.poisson(20 + 10 * semilla, dias).astype(float)})
+
+
+def test_each_level_keeps_its_own_warm_start(tmp_path):
+    logging.getLogger("cmdstanpy").disabled = True
+    store = ModelStore(str(tmp_path))
+    niveles = ["01", "02", "03", "07"]
+    completas = {nivel: _serie(i, 61) for i, nivel in enumerate(niveles)}
+
+    for nivel in niveles:
+        ProphetBackend(store, "y", PARAMS, serie=f"None|{nivel}").fit(completas[nivel].iloc[:60], [])
+    assert len(list(tmp_path.glob("*_latest.json"))) == len(niveles)
+
+    params_key = store.hash_params(PARAMS, [], "y")
+    for nivel in niveles:
+        assert store.find_warm_start(params_key, completas[nivel], f"None|{nivel}") is not None
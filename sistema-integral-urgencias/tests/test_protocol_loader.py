@@ -0,0 +1,14 @@
+"""Caché en disco de protocolos parseados desde Excel"""
+from concurrent.futures import ThreadPoolExecutor
+from modules.protocol_loader import ProtocolLoader
+
+
+def test_concurrent_cache_writes(tmp_path):
+    cache_path = str(tmp_path / "cache" / "libro.pkl")
+    protocolos = {"Cefalea": {"sintoma": "Cefalea", "criterios_triage": ["03 - cefalea leve"] * 1000}}
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(lambda _: ProtocolLoader._save_cache(cache_path, protocolos), range(32)))
+
+    assert ProtocolLoader._load_cache(cache_path) == protocolos
+    assert not list((tmp_path / "cache").glob("*.tmp"))
@@ -0,0 +1,41 @@
+"""Snapshots de protocolos: publicación y carga por versión"""
+from concurrent.futures import ThreadPoolExecutor
+from modules import protocol_store
+
+
+def _snapshot(version: str, criterio: str):
+    protocolos = {
+        "Cefalea": {
+            "sintoma": "Cefalea",
+            "signos_alarma": ["rigidez de nuca"],
+            "criterios_triage": [criterio],
+            "contenido_completo": f"Cefalea\n{criterio}"
+        }
+    }
+    return protocol_store.compile_snapshot(protocolos, version)
+
+
+def test_load_requested_version(tmp_path):
+    protocol_store.publish_snapshot(_snapshot("v1", "03 - cefalea leve"), str(tmp_path))
+    protocol_store.publish_snapshot(_snapshot("v2", "02 - cefalea súbita"), str(tmp_path))
+
+    assert protocol_store.load_snapshot(str(tmp_path))["version"] == "v2"
+    anterior = protocol_store.load_snapshot(str(tmp_path), version="v1")
+    assert anterior["version"] == "v1"
+    assert anterior["protocolos"]["Cefalea"]["criterios_triage"] == ["03 - cefalea leve"]
+
+
+def test_missing_version(tmp_path):
+    assert protocol_store.load_snapshot(str(tmp_path)) is None
+    protocol_store.publish_snapshot(_snapshot("v1", "03 - cefalea leve"), str(tmp_path))
+    assert protocol_store.load_snapshot(str(tmp_path), version="v9") is None
+
+
+def test_concurrent_publishes_leave_a_complete_snapshot(tmp_path):
+    snapshots = [_snapshot(f"v{i}", f"03 - cefalea {i}") for i in range(8)]
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(lambda s: protocol_store.publish_snapshot(s, str(tmp_path)), snapshots))
+
+    actual = protocol_store.load_snapshot(str(tmp_path))
+    assert actual["version"] in {s["version"] for s in snapshots}
+    assert not list(tmp_path.glob("*.tmp"))
@@ -0,0 +1,207 @@
+"""Circuit breaker, plazos y hedging: modelo en proceso y servidor local con latencia y errores inyectados"""
+import threading
+import time
+import pytest
+import requests
+from benchmarks.fake_llm_server import start_server
+from modules.llm_backends import OpenAICompatibleBackend
+from modules.resilience import CircuitBreaker, CircuitOpenError, DeadlineExceededError, ResilientModel
+
+
+class _Chunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class _Model:
+    """Modelo de prueba: falla mientras fallar=True; el stream emite tres fragmentos"""
+
+    def __init__(self):
+        self.fallar = False
+        self.bloqueo = None
+
+    def generate_content(self, prompt, stream=False):
+        if self.bloqueo is not None:
+            self.bloqueo.wait()
+        if self.fallar:
+            raise ConnectionError("caído")
+        if stream:
+            return iter([_Chunk("a"), _Chunk("b"), _Chunk("c")])
+        return _Chunk("ok")
+
+
+@pytest.fixture
+def server():
+    server = start_server(latency_s=0.01)
+    yield server
+    server.shutdown()
+
+
+def _resilient(server, **kwargs) -> ResilientModel:
+    return ResilientModel(OpenAICompatibleBackend(base_url=server.base_url, timeout_s=5), **kwargs)
+
+
+def _open(breaker):
+    for _ in range(breaker.failure_threshold):
+        assert breaker.allow()
+        breaker.record_failure()
+
+
+def test_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout_s=60)
+    for _ in range(2):
+        breaker.allow()
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CERRADO
+
+    breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.ABIERTO
+    assert not breaker.allow()
+
+
+def test_success_resets_failure_count():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout_s=60)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CERRADO
+
+
+def test_half_open_allows_single_trial():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout_s=0)
+    _open(breaker)
+    assert breaker.state == CircuitBreaker.SEMIABIERTO
+
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CERRADO
+    assert breaker.allow() and breaker.allow()
+
+
+def test_failed_trial_reopens():
+    breaker = CircuitBreaker(failure_threshold=5, reset_timeout_s=0.05)
+    _open(breaker)
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert not breaker.allow()
+    assert breaker.state == CircuitBreaker.ABIERTO
+
+
+def test_open_circuit_rejects_calls():
+    model = _Model()
+    model.fallar = True
+    resilient = ResilientModel(model, breaker=CircuitBreaker(failure_threshold=2, reset_timeout_s=60), hedge_enabled=False)
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            resilient.generate_content("p")
+    with pytest.raises(CircuitOpenError):
+        resilient.generate_content("p")
+    assert resilient.get_stats()["rechazadas_circuito"] == 1
+
+
+def test_stream_closed_early_releases_trial():
+    model = _Model()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout_s=0)
+    resilient = ResilientModel(model, breaker=breaker, hedge_enabled=False)
+    _open(breaker)
+
+    stream = resilient.generate_content("p", stream=True)
+    assert next(stream).text == "a"
+    stream.close()
+
+    # La prueba abandonada no cuenta como fallo ni bloquea la siguiente
+    assert breaker.state == CircuitBreaker.SEMIABIERTO
+    assert [c.text for c in resilient.generate_content("p", stream=True)] == ["a", "b", "c"]
+    assert breaker.state == CircuitBreaker.CERRADO
+
+
+def test_deadline_exceeded_counts_as_failure():
+    model = _Model()
+    model.bloqueo = threading.Event()
+    resilient = ResilientModel(
+        model, deadline_s=0.05, breaker=CircuitBreaker(failure_threshold=1, reset_timeout_s=60), hedge_enabled=False
+    )
+    try:
+        with pytest.raises(DeadlineExceededError):
+            resilient.generate_content("p")
+        assert resilient.breaker.state == CircuitBreaker.ABIERTO
+    finally:
+        model.bloqueo.set()
+
+
+def test_abandoned_calls_are_bounded():
+    model = _Model()
+    model.bloqueo = threading.Event()
+    resilient = ResilientModel(
+        model, deadline_s=0.05, breaker=CircuitBreaker(failure_threshold=10, reset_timeout_s=60),
+        hedge_enabled=False, max_workers=2
+    )
+    try:
+        for _ in range(2):
+            with pytest.raises(DeadlineExceededError):
+                resilient.generate_content("p")
+        inicio = time.perf_counter()
+        with pytest.raises(DeadlineExceededError):
+            resilient.generate_content("p")
+        # Sin thread libre falla de inmediato, sin esperar el plazo
+        assert time.perf_counter() - inicio < 0.04
+        assert resilient.get_stats()["saturadas"] == 1
+    finally:
+        model.bloqueo.set()
+
+
+def test_server_deadline(server):
+    server.latency_s = 3.0
+    resilient = _resilient(server, deadline_s=0.3, hedge_enabled=False)
+    inicio = time.perf_counter()
+    with pytest.raises(DeadlineExceededError):
+        resilient.generate_content("Cefalea")
+    assert time.perf_counter() - inicio < 1.0
+    assert resilient.get_stats()["plazos_excedidos"] == 1
+
+
+def test_server_hedged_request_wins(server):
+    # La primera solicitud es lenta y la duplicada rápida
+    comportamientos = iter([(2.0, False), (0.01, False)])
+    server.next_behavior = lambda: next(comportamientos, (0.01, False))
+    resilient = _resilient(server, deadline_s=5, hedge_enabled=True)
+    for _ in range(30):
+        resilient.latencies.record(0.05)
+
+    inicio = time.perf_counter()
+    assert resilient.generate_content("Cefalea").text
+    assert time.perf_counter() - inicio < 1.5
+    stats = resilient.get_stats()
+    assert stats["duplicadas"] == 1 and stats["duplicadas_ganadoras"] == 1
+
+
+def test_server_errors_open_and_trial_closes_the_circuit(server):
+    server.failure_rate = 1.0
+    resilient = _resilient(
+        server, deadline_s=5, hedge_enabled=False, breaker=CircuitBreaker(failure_threshold=3, reset_timeout_s=0.2)
+    )
+    for _ in range(3):
+        with pytest.raises(requests.HTTPError):
+            resilient.generate_content("Cefalea")
+    with pytest.raises(CircuitOpenError):
+        resilient.generate_content("Cefalea")
+    assert server.requests == 3
+
+    server.failure_rate = 0.0
+    time.sleep(0.25)
+    chunks = list(resilient.generate_content("Cefalea", stream=True))
+    assert chunks
+    assert resilient.breaker.state == CircuitBreaker.CERRADO
+
+
+def test_unstarted_stream_does_not_take_the_trial():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout_s=0)
+    resilient = ResilientModel(_Model(), breaker=breaker, hedge_enabled=False)
+    _open(breaker)
+
+    resilient.generate_content("p", stream=True)  # Nunca se itera
+    assert resilient.generate_content("p").text == "ok"
+    assert breaker.state == CircuitBreaker.CERRADO
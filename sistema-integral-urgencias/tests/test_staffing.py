@@ -0,0 +1,41 @@
+"""Erlang C y dimensionamiento de médicos contra valores conocidos"""
+import numpy as np
+import pytest
+from modules.staffing import erlang_c, mean_wait, min_servers, service_level
+
+
+def test_erlang_c_known_values():
+    # a = 2 erlangs, c = 3: C = (8/6 · 3) / (1 + 2 + 2 + 8/6 · 3) = 4/9
+    assert erlang_c(2.0, 3) == pytest.approx(4 / 9)
+    assert erlang_c(1.0, 2) == pytest.approx(1 / 3)
+    assert erlang_c(1.0, 1) == pytest.approx(1.0)
+
+
+def test_erlang_c_limits():
+    # Sin carga nadie espera; con carga >= médicos la cola es inestable
+    np.testing.assert_allclose(erlang_c([0.0, 2.0, 5.0], [3, 2, 4]), [0.0, 1.0, 1.0])
+
+
+def test_mean_wait_and_service_level():
+    assert mean_wait(2.0, 3, 60) == pytest.approx(80 / 3)
+    assert service_level(2.0, 3, 60, 20) == pytest.approx(1 - 4 / 9 * np.exp(-1 / 3))
+    assert np.isinf(mean_wait(3.0, 3, 60))
+    assert service_level(3.0, 3, 60, 20) == pytest.approx(0.0)
+
+
+def test_min_servers_known_values():
+    np.testing.assert_array_equal(min_servers([10, 0, 30], 20, 20, 0.8), [5, 0, 12])
+
+
+def test_min_servers_is_the_smallest_that_meets_the_target():
+    llegadas = np.random.default_rng(7).uniform(0, 40, size=50)
+    medicos = min_servers(llegadas, 25, 30, 0.9)
+    carga = llegadas * 25 / 60
+    assert np.all(service_level(carga, medicos, 25, 30) >= 0.9)
+    assert np.all(service_level(carga, medicos - 1, 25, 30) < 0.9)
+
+
+@pytest.mark.parametrize("nivel", [0, 1, 1.5])
+def test_min_servers_rejects_invalid_service_level(nivel):
+    with pytest.raises(ValueError):
+        min_servers([10], 20, 20, nivel)
@@ -0,0 +1,105 @@
+"""Fast-path de reglas: límites de palabra, negaciones y bloqueo de 03/07"""
+import pytest
+import config
+from modules.alarm_matcher import AlarmSignMatcher
+from modules.triage_rules import TriageRuleEngine
+
+
+CEFALEA = {
+    "sintoma": "Cefalea",
+    "criterios_triage": ["03 - cefalea, estable", "02 - cefalea súbita con vómitos"],
+    "signos_alarma": []
+}
+TORACICO = {
+    "sintoma": "Dolor torácico",
+    "criterios_triage": ["01 - dolor torácico con diaforesis", "03 - dolor torácico, reproducible a la palpación"],
+    "signos_alarma": []
+}
+
+
+@pytest.fixture
+def engine():
+    return TriageRuleEngine(min_confidence=0.9)
+
+
+@pytest.fixture(scope="module")
+def matcher():
+    return AlarmSignMatcher(config.SIGNOS_ALARMA, config.SIGNOS_ALARMA_VARIANTES)
+
+
+def _evaluate(engine, matcher, caso, protocolo, **kwargs):
+    signos = matcher.detect(caso)
+    return engine.evaluate(caso, protocolo["sintoma"], protocolo, signos, **kwargs)
+
+
+def test_inestable_no_cumple_criterio_estable(engine, matcher):
+    caso = "Cefalea súbita intensa, hemodinámicamente inestable, vómitos en proyectil"
+    resultado = _evaluate(engine, matcher, caso, CEFALEA)
+    assert resultado is None or resultado["nivel_triage"] not in ("03", "07")
+
+
+def test_inestable_sin_umbral_tampoco_asigna_03(engine, matcher):
+    caso = "Cefalea intensa, hemodinámicamente inestable"
+    resultado = _evaluate(engine, matcher, caso, CEFALEA, min_confidence=0.0)
+    assert resultado is None
+
+
+def test_criterio_estable_exacto_queda_para_el_llm(engine, matcher):
+    caso = "Cefalea leve, paciente estable"
+    assert _evaluate(engine, matcher, caso, CEFALEA) is None
+    # Solo como respaldo sin umbral, con confianza menor a la del fast-path
+    resultado = _evaluate(engine, matcher, caso, CEFALEA, min_confidence=0.0)
+    assert resultado["nivel_triage"] == "03"
+    assert resultado["confianza"] < config.TRIAGE_FAST_PATH_MIN_CONFIDENCE
+
+
+def test_03_nunca_se_resuelve_sin_llm(matcher):
+    protocolo = {"sintoma": "Dolor", "criterios_triage": ["03 - dolor leve, estable"], "signos_alarma": []}
+    caso = (
+        "Dolor leve en brazo tras golpe, estable; refiere la peor cefalea de su vida, "
+        "pérdida de conciencia"
+    )
+    assert _evaluate(TriageRuleEngine(), matcher, caso, protocolo) is None
+
+
+def test_estable_negado_no_asigna_03(engine, matcher):
+    resultado = _evaluate(engine, matcher, "Cefalea, no estable", CEFALEA, min_confidence=0.0)
+    assert resultado is None
+
+
+def test_termino_negado_no_dispara_criterio(engine, matcher):
+    resultado = _evaluate(engine, matcher, "Dolor torácico, niega diaforesis", TORACICO, min_confidence=0.0)
+    assert resultado is None or resultado["nivel_triage"] != "01"
+
+
+def test_criterio_01_presente(engine, matcher):
+    resultado = _evaluate(engine, matcher, "Dolor torácico opresivo con diaforesis", TORACICO)
+    assert resultado["nivel_triage"] == "01"
+
+
+def test_03_bloqueado_por_signos_de_alarma(engine, matcher):
+    caso = "Dolor torácico reproducible a la palpación, disnea"
+    resultado = _evaluate(engine, matcher, caso, TORACICO, min_confidence=0.0)
+    assert resultado is None or resultado["nivel_triage"] in ("01", "02")
+
+
+def test_alternativas_con_o(engine, matcher):
+    protocolo = {
+        "sintoma": "Dolor torácico",
+        "criterios_triage": ["01 - dolor torácico con diaforesis o palidez"],
+        "signos_alarma": []
+    }
+    for caso in ("Dolor torácico con diaforesis", "Dolor torácico, se observa palidez"):
+        assert _evaluate(engine, matcher, caso, protocolo)["nivel_triage"] == "01"
+    assert _evaluate(engine, matcher, "Dolor torácico aislado", protocolo, min_confidence=0.0) is None
+
+
+def test_plural_del_termino(engine, matcher):
+    resultado = _evaluate(engine, matcher, "Cefalea súbita con vómito", CEFALEA)
+    assert resultado["nivel_triage"] == "02"
+
+
+def test_reglas_compiladas_acotadas():
+    engine = TriageRuleEngine(max_protocolos=1)
+    engine.compile_protocols({"Cefalea": CEFALEA, "Dolor torácico": TORACICO})
+    assert len(engine._compiled) == 1
@@ -0,0 +1,121 @@
+"""Almacén de consultas: reemplazo de particiones sede/mes y conteos por archivo"""
+import pandas as pd
+import pytest
+from modules.visit_store import VisitStore
+
+
+def _write_csv(path, meses, sedes=("norte", "sur"), por_dia=3):
+    """Consultas sintéticas: por_dia consultas por sede en cada día de los meses dados"""
+    filas = []
+    for mes in meses:
+        for dia in pd.date_range(f"{mes}-01", periods=pd.Period(mes).days_in_month, freq="D"):
+            for sede in sedes:
+                for i in range(por_dia):
+                    filas.append({
+                        "fecha_hora": (dia + pd.Timedelta(hours=8 + i)).isoformat(),
+                        "triage_asignado": "03",
+                        "sede": sede
+                    })
+    pd.DataFrame(filas).to_csv(path, index=False)
+    return len(filas)
+
+
+def _total(conteos) -> int:
+    return int(conteos.long_counts()["pacientes"].sum())
+
+
+@pytest.fixture
+def store(tmp_path):
+    return VisitStore(str(tmp_path / "almacen"))
+
+
+def test_overlapping_export_replaces_months(store, tmp_path):
+    enero = tmp_path / "enero.csv"
+    enero_febrero = tmp_path / "enero_febrero.csv"
+    _write_csv(enero, ["2024-01"])
+    total = _write_csv(enero_febrero, ["2024-01", "2024-02"])
+
+    store.ingest(str(enero))
+    ingesta = store.ingest(str(enero_febrero))
+
+    assert ingesta["nuevo"]
+    assert _total(store.load_counts_by_hour()) == total
+    assert len(store.read_visits()) == total
+    # El export de enero quedó reemplazado por completo
+    assert list(store.ingested_files()) == [ingesta["hash"]]
+
+
+def test_same_file_is_not_ingested_twice(store, tmp_path):
+    enero = tmp_path / "enero.csv"
+    total = _write_csv(enero, ["2024-01"])
+
+    assert store.ingest(str(enero))["nuevo"]
+    assert not store.ingest(str(enero))["nuevo"]
+    assert _total(store.load_counts_by_hour()) == total
+
+
+def test_superseded_file_is_ingested_again(store, tmp_path):
+    enero = tmp_path / "enero.csv"
+    enero_corregido = tmp_path / "enero_corregido.csv"
+    _write_csv(enero, ["2024-01"])
+    _write_csv(enero_corregido, ["2024-01"], por_dia=2)
+
+    store.ingest(str(enero))
+    store.ingest(str(enero_corregido))
+    ingesta = store.ingest(str(enero))
+
+    assert ingesta["nuevo"]
+    assert _total(store.load_counts_by_hour()) == 31 * 2 * 3
+
+
+def test_file_counts_exclude_other_files(store, tmp_path):
+    enero = tmp_path / "enero.csv"
+    marzo_norte = tmp_path / "marzo_norte.csv"
+    total_enero = _write_csv(enero, ["2024-01"])
+    total_marzo = _write_csv(marzo_norte, ["2024-03"], sedes=("norte",))
+
+    store.ingest(str(enero))
+    ingesta, conteos = store.ingest_file_counts(str(marzo_norte))
+
+    assert ingesta["particiones"] == ["norte|2024-03"]
+    assert _total(conteos) == total_marzo
+    assert _total(store.load_counts_by_hour()) == total_enero + total_marzo
+    assert _total(store.load_counts_by_hour(["sur|2024-01"])) == total_enero // 2
+
+
+def test_file_without_site_column(store, tmp_path):
+    path = tmp_path / "sin_sede.csv"
+    total = _write_csv(path, ["2024-01"], sedes=("x",))
+    pd.read_csv(path).drop(columns="sede").to_csv(path, index=False)
+
+    ingesta, conteos = store.ingest_file_counts(str(path))
+
+    assert ingesta["particiones"] == ["sin_sede|2024-01"]
+    assert _total(conteos) == total
+
+
+def test_rebuild_keeps_original_site_names(store, tmp_path):
+    enero = tmp_path / "enero.csv"
+    enero_febrero = tmp_path / "enero_febrero.csv"
+    _write_csv(enero, ["2024-01"], sedes=("Sede Norte",))
+    total = _write_csv(enero_febrero, ["2024-01", "2024-02"], sedes=("Sede Norte",))
+
+    store.ingest(str(enero))
+    store.rebuild_counts()
+    assert set(store.load_counts()["sede"]) == {"Sede Norte"}
+
+    store.ingest(str(enero_febrero))
+    assert _total(store.load_counts_by_hour()) == total
+    assert set(store.read_visits(sedes=["Sede Norte"])["sede"]) == {"Sede Norte"}
+
+
+def test_sites_with_the_same_safe_name_do_not_share_partitions(store, tmp_path):
+    path = tmp_path / "dos_sedes.csv"
+    total = _write_csv(path, ["2024-01"], sedes=("Sede Norte", "Sede/Norte"))
+
+    ingesta = store.ingest(str(path))
+    store.rebuild_counts()
+
+    assert ingesta["particiones"] == ["Sede Norte|2024-01", "Sede/Norte|2024-01"]
+    assert len(store.read_visits()) == total
+    assert _total(store.load_counts_by_hour(["Sede/Norte|2024-01"])) == total // 2
@@ -1,10 +1,12 @@
 """
 Funciones auxiliares y utilidades
 """
-import pandas as pd
 import streamlit as st
 from datetime import datetime
-from typing import Dict, List
+from typing import TYPE_CHECKING, Dict, List
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 
 def format_triage_badge(nivel: str, nombre: str, color: str) -> str:
@@ -64,7 +66,7 @@ def format_alarm_signs(signos: List[str]) -> str:
     """
 
 
-def export_to_csv(df: pd.DataFrame, filename: str):
+def export_to_csv(df: "pd.DataFrame", filename: str):
     """
     Exporta DataFrame a CSV descargable
     